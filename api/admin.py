@@ -1,7 +1,20 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import User, Country, City, Hotel, Room, Booking, Review, Discount
+from .pagination import EstimatedCountPaginator
+from .models import (
+    User,
+    Country,
+    City,
+    Hotel,
+    Room,
+    Booking,
+    BookingArchive,
+    Review,
+    Discount,
+    RateRule,
+    Deletion,
+)
 
 
 # Отображение первой старницы создания нового пользователя
@@ -39,11 +52,145 @@ class UserAdmin(BaseUserAdmin):
 # Регистрируем модель с минимальной кастомизацией (только для User)
 admin.site.register(User, UserAdmin)
 
-# Стандартная регистрация остальных моделей
+# Стран немного — стандартная регистрация
 admin.site.register(Country)
-admin.site.register(City)
-admin.site.register(Hotel)
-admin.site.register(Room)
-admin.site.register(Booking)
-admin.site.register(Review)
-admin.site.register(Discount)
+
+
+# Базовый класс для больших таблиц: связанные объекты загружаются
+# JOIN'ом, количество строк без фильтров — оценкой, а не COUNT(*)
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'country')
+    list_select_related = ('country',)
+    search_fields = ('name',)
+
+    def get_queryset(self, request):
+        # __str__ города читает страну, в том числе в автодополнении
+        return super().get_queryset(request).select_related('country')
+
+
+@admin.register(Hotel)
+class HotelAdmin(LargeTableAdmin):
+    list_display = ('name', 'city', 'manager', 'rating')
+    list_select_related = ('city__country', 'manager')
+    search_fields = ('name',)
+    autocomplete_fields = ('city',)
+    raw_id_fields = ('manager',)
+
+
+@admin.register(Room)
+class RoomAdmin(LargeTableAdmin):
+    list_display = ('id', '__str__', 'capacity', 'price')
+    search_fields = ('room_type', 'hotel__name')
+    autocomplete_fields = ('hotel',)
+
+    def get_queryset(self, request):
+        # __str__ номера читает отель
+        return super().get_queryset(request).select_related('hotel')
+
+
+@admin.register(Booking)
+class BookingAdmin(LargeTableAdmin):
+    list_display = (
+        'id',
+        'user',
+        'room',
+        'start_date',
+        'end_date',
+        'status',
+        'total_price',
+        'created_at',
+    )
+    list_select_related = ('user', 'room__hotel')
+    list_filter = ('status',)
+    date_hierarchy = 'start_date'
+    search_fields = ('user__email', 'last_name', 'phone')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('room',)
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ('id', '__str__', 'rating', 'created_at')
+    list_filter = ('rating',)
+    date_hierarchy = 'created_at'
+    search_fields = ('booking__user__email', 'booking__room__hotel__name')
+    raw_id_fields = ('booking',)
+
+    def get_queryset(self, request):
+        # __str__ отзыва читает пользователя и отель брони
+        return super().get_queryset(request).select_related(
+            'booking__user', 'booking__room__hotel'
+        )
+
+
+@admin.register(Discount)
+class DiscountAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'amount', 'expires_at', 'used')
+    list_select_related = ('user',)
+    list_filter = ('used',)
+    date_hierarchy = 'expires_at'
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(RateRule)
+class RateRuleAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'hotel',
+        'room',
+        'name',
+        'start_date',
+        'end_date',
+        'weekdays',
+        'min_nights',
+        'percent',
+    )
+    list_select_related = ('hotel', 'room__hotel')
+    search_fields = ('name', 'hotel__name')
+    autocomplete_fields = ('hotel', 'room')
+
+
+# Архив броней — только просмотр
+@admin.register(BookingArchive)
+class BookingArchiveAdmin(LargeTableAdmin):
+    list_display = (
+        'id',
+        'user',
+        'room',
+        'start_date',
+        'end_date',
+        'status',
+        'total_price',
+        'archived_at',
+    )
+    list_select_related = ('user', 'room__hotel')
+    list_filter = ('status',)
+    date_hierarchy = 'end_date'
+    search_fields = ('user__email', 'last_name', 'phone')
+    raw_id_fields = ('user', 'room')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Deletion)
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'target', 'object_id', 'status', 'requested_by', 'created_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'target')
+    raw_id_fields = ('requested_by',)
+    readonly_fields = ('deleted', 'last_error')
+
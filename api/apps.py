@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Подключаем обработчики сигналов моделей и фоновые задачи
+        from . import signals, tasks  # noqa: F401
+        from .search import setup
+
+        # Индекс полнотекстового поиска зависит от СУБД,
+        # поэтому создаётся не миграцией, а после неё
+        post_migrate.connect(setup, sender=self)
@@ -0,0 +1,90 @@
+"""
+Пакетная проверка доступности номеров.
+
+Вместо отдельного ``Exists``-подзапроса на каждый (отель, даты, гости)
+номера всех отелей пакета и брони, пересекающиеся с датами запроса
+к своему отелю, читаются одним запросом (LEFT JOIN), а каждый запрос
+пакета проверяется в памяти. Запросы с одинаковыми датами дают одно
+условие на все свои отели, поэтому условие растёт с числом разных
+окон дат, а не с размером пакета.
+"""
+from collections import defaultdict
+
+from django.db.models import FilteredRelation, Q
+
+from .models import Room
+
+
+def load_rooms(queries):
+    """
+    Номера отелей из пакета с их бронями, пересекающими даты запросов:
+    {id отеля: [(id номера, вместимость, [(заезд, выезд), ...]), ...]}.
+    """
+    if not queries:
+        return {}
+
+    windows = defaultdict(set)  # {(заезд, выезд): id отелей}
+    for query in queries:
+        windows[query['check_in'], query['check_out']].add(query['hotel'])
+
+    # Брони вне дат запросов к своему отелю не читаются: общее окно
+    # пакета с далёкими датами тянуло бы все брони между ними
+    overlaps = Q()
+    for (check_in, check_out), hotel_ids in windows.items():
+        overlaps |= Q(
+            hotel_id__in=hotel_ids,
+            booking__start_date__lt=check_out,
+            booking__end_date__gt=check_in
+        )
+
+    rows = Room.objects.filter(
+        hotel_id__in={query['hotel'] for query in queries},
+        is_deleting=False,
+        hotel__is_deleting=False
+    ).annotate(
+        overlapping=FilteredRelation('booking', condition=overlaps)
+    ).order_by('hotel_id', 'pk').values_list(
+        'hotel_id',
+        'pk',
+        'capacity',
+        'overlapping__start_date',
+        'overlapping__end_date'
+    )
+
+    rooms = {}
+    bookings = defaultdict(list)
+    for hotel_id, room_id, capacity, start, end in rows:
+        if room_id not in rooms:
+            rooms[room_id] = (hotel_id, capacity)
+        if start is not None:
+            bookings[room_id].append((start, end))
+
+    hotels = defaultdict(list)
+    for room_id, (hotel_id, capacity) in rooms.items():
+        hotels[hotel_id].append((room_id, capacity, bookings[room_id]))
+    return hotels
+
+
+def available_rooms(rooms, check_in, check_out, guests):
+    """Номера без пересекающихся броней и с подходящей вместимостью."""
+    return [
+        room_id
+        for room_id, capacity, bookings in rooms
+        if capacity >= guests and not any(
+            start < check_out and end > check_in for start, end in bookings
+        )
+    ]
+
+
+def check(queries):
+    """Для каждого запроса пакета — список id свободных номеров."""
+    hotels = load_rooms(queries)
+    return [
+        available_rooms(
+            hotels.get(query['hotel'], []),
+            query['check_in'],
+            query['check_out'],
+            query['guests']
+        )
+        for query in queries
+    ]
@@ -0,0 +1,151 @@
+"""
+Справочник городов, стран и отелей в памяти процесса.
+
+Данные меняются редко, а читаются на каждой загрузке списка городов и
+на каждой записи отеля/номера (город и отель передаются по названию).
+Снимок справочника строится тремя запросами и хранится в процессе;
+актуальность проверяется по ключу версии в кэше Django (``CACHES``).
+При изменении города, страны или отеля сигналы меняют версию
+(``bump()``), и следующее обращение берёт новый снимок из общего кэша
+или строит его заново.
+
+С общим кэшем (Redis) новая версия сразу видна всем процессам. С кэшем
+в памяти процесса другие воркеры узнают об изменениях не позже чем
+через ``CATALOG_MAX_AGE`` секунд.
+"""
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import City, Country, Hotel
+
+VERSION_KEY = 'catalog:version'
+DATA_KEY = 'catalog:data:%s'
+
+
+class Ambiguous(Exception):
+    """Под названием несколько объектов."""
+
+
+class Catalog:
+    """Снимок справочника; только простые типы, чтобы класть его в кэш."""
+
+    def __init__(self, countries, cities, hotels):
+        # {id: название}, {id: (название, id страны)}, {id: (название, id города)}
+        self.countries = countries
+        self.cities = cities
+        self.hotels = hotels
+        self.hotel_counts = Counter(city_id for _, city_id in hotels.values())
+
+        self.city_ids = defaultdict(list)
+        for pk, (name, _) in cities.items():
+            self.city_ids[name].append(pk)
+        self.hotel_ids = defaultdict(list)
+        for pk, (name, _) in hotels.items():
+            self.hotel_ids[name].append(pk)
+
+        # Готовый ответ GET /cities/
+        self.city_list = [
+            {
+                'id': pk,
+                'name': name,
+                'country': {'name': countries[country_id]},
+                'hotels_count': self.hotel_counts[pk],
+            }
+            for pk, (name, country_id) in sorted(cities.items())
+        ]
+
+    @classmethod
+    def load(cls):
+        return cls(
+            dict(Country.objects.values_list('pk', 'name')),
+            {
+                pk: (name, country_id)
+                for pk, name, country_id in City.objects.values_list(
+                    'pk', 'name', 'country_id'
+                )
+            },
+            {
+                pk: (name, city_id)
+                for pk, name, city_id in Hotel.objects.filter(
+                    is_deleting=False
+                ).values_list('pk', 'name', 'city_id')
+            },
+        )
+
+    def city(self, name):
+        """Город по названию (без запроса к БД) или None."""
+        pk = self._single(self.city_ids, name)
+        if pk is None:
+            return None
+        name, country_id = self.cities[pk]
+        city = City(pk=pk, name=name, country_id=country_id)
+        city.country = Country(pk=country_id, name=self.countries[country_id])
+        return city
+
+    def hotel(self, name):
+        """Отель по названию (только id, название и город) или None."""
+        pk = self._single(self.hotel_ids, name)
+        if pk is None:
+            return None
+        name, city_id = self.hotels[pk]
+        return Hotel(pk=pk, name=name, city_id=city_id)
+
+    @staticmethod
+    def _single(ids, name):
+        found = ids.get(name, ())
+        if len(found) > 1:
+            raise Ambiguous(name)
+        return found[0] if found else None
+
+
+_local = {'version': None, 'catalog': None, 'loaded_at': 0.0}
+
+
+def get():
+    """Актуальный снимок справочника."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version):
+            version = cache.get(VERSION_KEY, version)
+
+    if (
+        _local['version'] == version
+        and time.monotonic() - _local['loaded_at'] < settings.CATALOG_MAX_AGE
+    ):
+        return _local['catalog']
+
+    catalog = cache.get(DATA_KEY % version)
+    if catalog is None:
+        catalog = Catalog.load()
+        cache.set(DATA_KEY % version, catalog, settings.CATALOG_MAX_AGE)
+
+    _local.update(version=version, catalog=catalog, loaded_at=time.monotonic())
+    return catalog
+
+
+def bump():
+    """Делает текущий снимок устаревшим во всех процессах."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    _local.update(version=None, catalog=None)
+
+
+def invalidate():
+    """
+    Сброс при изменении данных: сразу — чтобы текущий процесс видел свои
+    изменения, и после коммита — чтобы снимок, собранный другим процессом
+    до коммита, не остался под новой версией.
+    """
+    bump()
+    transaction.on_commit(bump)
+
+
+def reset():
+    """Забывает снимок и версию (для тестов)."""
+    cache.delete(VERSION_KEY)
+    _local.update(version=None, catalog=None, loaded_at=0.0)
@@ -0,0 +1,198 @@
+"""
+Счётчики популярности отелей: просмотры карточки, показы в поиске
+и созданные брони.
+
+Увеличивать поле отеля на каждый просмотр — значит превращать чтение
+в запись с блокировкой строки. Поэтому запросы только прибавляют
+счётчики в памяти процесса (``buffer``), а фоновый поток раз
+в ``POPULARITY_FLUSH_INTERVAL`` секунд и при остановке процесса сбрасывает
+их в дневные корзины ``HotelCounter`` пачками: недостающие строки
+вставляются одним INSERT, затем одно UPDATE на пачку прибавляет счётчики.
+При падении процесса несброшенные счётчики теряются — они приблизительные.
+
+В бессерверной функции (Vercel) процесс между запросами заморожен:
+фоновый поток не работает, а обработчик выхода может не вызваться.
+Там ``POPULARITY_FLUSH_ON_REQUEST`` включает сброс в конце запроса
+(``flush_if_due()``), когда накопилось ``POPULARITY_FLUSH_MAX_PENDING``
+корзин или самой старой больше ``POPULARITY_FLUSH_MAX_AGE`` секунд.
+
+Популярность отеля — взвешенная сумма счётчиков (``POPULARITY_WEIGHTS``)
+за последние ``POPULARITY_DAYS`` дней, см. ``popularity()``.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Hotel, HotelCounter
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('views', 'impressions', 'bookings')
+
+
+class CounterBuffer:
+    """Счётчики процесса, ещё не записанные в БД."""
+
+    def __init__(self):
+        self._pending = defaultdict(int)  # {(отель, день, счётчик): число}
+        self._lock = threading.Lock()
+        self._started = False
+        self._oldest = 0.0  # когда добавлен первый несброшенный счётчик
+
+    def add(self, kind, hotel_ids):
+        today = timezone.localdate()
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            for hotel_id in hotel_ids:
+                self._pending[hotel_id, today, kind] += 1
+            if not self._started:
+                self._start()
+
+    def _start(self):
+        # Поток и обработчик выхода создаются в процессе, который считает
+        # (воркер gunicorn после fork), а не при импорте
+        self._started = True
+        atexit.register(self.flush)
+        if settings.POPULARITY_FLUSH_INTERVAL > 0:
+            threading.Thread(
+                target=self._run, name='hotel-counters', daemon=True
+            ).start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.POPULARITY_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            finally:
+                # У потока своё соединение с БД
+                connection.close()
+
+    def take(self):
+        """Забирает накопленное: {(отель, день): {счётчик: число}}."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        rows = defaultdict(dict)
+        for (hotel_id, day, kind), count in pending.items():
+            rows[hotel_id, day][kind] = count
+        return rows
+
+    def flush_if_due(self):
+        """Сбрасывает накопленное, если его много или оно лежит давно."""
+        with self._lock:
+            due = bool(self._pending) and (
+                len(self._pending) >= settings.POPULARITY_FLUSH_MAX_PENDING
+                or time.monotonic() - self._oldest
+                >= settings.POPULARITY_FLUSH_MAX_AGE
+            )
+        return self.flush() if due else 0
+
+    def flush(self):
+        """Записывает накопленное в БД; возвращает число строк-корзин."""
+        rows = self.take()
+        if not rows:
+            return 0
+        try:
+            return write(rows)
+        except Exception:
+            logger.exception('Не удалось записать счётчики популярности')
+            return 0
+
+
+buffer = CounterBuffer()
+
+
+def record(kind, hotel_ids):
+    """Прибавляет счётчик отелям (без записи в БД)."""
+    buffer.add(kind, hotel_ids)
+
+
+def write(rows):
+    """Прибавляет {(отель, день): {счётчик: число}} к корзинам пачками."""
+    # Отель могли удалить, пока счётчики лежали в памяти
+    existing = set(Hotel.objects.filter(
+        pk__in={hotel_id for hotel_id, _ in rows}
+    ).values_list('pk', flat=True))
+    by_day = defaultdict(dict)
+    for (hotel_id, day), counts in rows.items():
+        if hotel_id in existing:
+            by_day[day][hotel_id] = counts
+
+    size = settings.POPULARITY_FLUSH_BATCH_SIZE
+    written = 0
+    with transaction.atomic():
+        HotelCounter.objects.bulk_create(
+            [
+                HotelCounter(hotel_id=hotel_id, date=day)
+                for day, hotels in by_day.items()
+                for hotel_id in hotels
+            ],
+            batch_size=size,
+            ignore_conflicts=True
+        )
+        for day, hotels in by_day.items():
+            # Один порядок строк во всех процессах — без взаимных блокировок
+            ids = sorted(hotels)
+            for start in range(0, len(ids), size):
+                batch = ids[start:start + size]
+                written += HotelCounter.objects.filter(
+                    date=day, hotel_id__in=batch
+                ).update(**{
+                    kind: F(kind) + Case(
+                        *[
+                            When(hotel_id=hotel_id, then=Value(
+                                hotels[hotel_id][kind]
+                            ))
+                            for hotel_id in batch if kind in hotels[hotel_id]
+                        ],
+                        default=Value(0)
+                    )
+                    for kind in KINDS
+                    if any(kind in hotels[hotel_id] for hotel_id in batch)
+                })
+    return written
+
+
+def popularity(kind=None, days=None):
+    """
+    Выражение для аннотации отелей: взвешенная сумма счётчиков
+    (или один счётчик ``kind``) за последние ``days`` дней
+    (по умолчанию ``POPULARITY_DAYS``), включая сегодня.
+    """
+    days = days or settings.POPULARITY_DAYS
+    if kind is None:
+        score = None
+        for name, weight in settings.POPULARITY_WEIGHTS.items():
+            term = F(name) * weight
+            score = term if score is None else score + term
+    else:
+        score = F(kind)
+
+    total = HotelCounter.objects.filter(
+        hotel=OuterRef('pk'),
+        date__gt=timezone.localdate() - timedelta(days=days)
+    ).values('hotel').annotate(total=Sum(score)).values('total')
+    return Coalesce(
+        Subquery(total, output_field=IntegerField()),
+        Value(0),
+        output_field=IntegerField()
+    )
+
+
+def cleanup():
+    """Удаляет корзины старше ``POPULARITY_RETENTION_DAYS``."""
+    deadline = timezone.localdate() - timedelta(
+        days=settings.POPULARITY_RETENTION_DAYS
+    )
+    HotelCounter.objects.filter(date__lt=deadline).delete()
@@ -0,0 +1,202 @@
+"""
+Удаление отелей, номеров и пользователей в фоне частями.
+
+Каскадное удаление Django (``Collector``) загружает все зависимые
+строки в память и удаляет их в одной транзакции — для большого отеля
+это долгие блокировки и таймаут воркера. Вместо этого запрос только
+скрывает объект (``is_deleting`` у отеля и номера, ``is_active=False``
+у пользователя), создаёт ``Deletion`` и ставит задачу. Задача удаляет
+зависимые записи пачками по ``DELETION_BATCH_SIZE`` — каждая пачка
+в своей короткой транзакции, с сигналами (сводки, рейтинги, события) —
+и в конце сам объект. После ``DELETION_BATCHES_PER_JOB`` пачек задача
+ставит продолжение, чтобы не занимать воркер надолго. Прогресс —
+GET /deletions/:id/.
+
+Задача ``run_deletion`` не выполняется в запросе и при ``JOBS_EAGER``
+(Vercel): она всегда ждёт в очереди запуска ``worker``. Если воркер
+упал или задача исчерпала попытки, удаление не продвигается;
+периодическая задача ``resume_deletions`` ставит такие удаления заново
+(``resume_stale()``).
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from . import catalog
+from .jobs import enqueue
+from .models import (
+    Booking,
+    BookingArchive,
+    Deletion,
+    Discount,
+    Hotel,
+    HotelDailyStats,
+    IdempotencyKey,
+    RateRule,
+    Review,
+    Room,
+    User,
+)
+
+MODELS = {
+    'hotel': Hotel,
+    'room': Room,
+    'user': User,
+}
+
+# Большие зависимые таблицы, которые удаляются пачками до самого объекта:
+# (модель, путь до объекта, связи для select_related — их читают
+# обработчики post_delete). Остальное (номера отеля, сводка рейтинга,
+# SET_NULL-ссылки) удалит обычный каскад вместе с объектом.
+STEPS = {
+    'hotel': (
+        (Review, 'booking__room__hotel', ('booking__room',)),
+        (BookingArchive, 'room__hotel', ()),
+        (Booking, 'room__hotel', ('room',)),
+        (HotelDailyStats, 'hotel', ()),
+        (RateRule, 'hotel', ()),
+    ),
+    'room': (
+        (Review, 'booking__room', ('booking__room',)),
+        (BookingArchive, 'room', ()),
+        (Booking, 'room', ('room',)),
+        (RateRule, 'room', ()),
+    ),
+    'user': (
+        (Review, 'booking__user', ('booking__room',)),
+        (BookingArchive, 'user', ()),
+        (Booking, 'user', ('room',)),
+        (Discount, 'user', ()),
+        (IdempotencyKey, 'user', ()),
+    ),
+}
+
+
+def hide(target, object_id):
+    """Скрывает объект из выдачи до окончания удаления."""
+    if target == 'hotel':
+        Hotel.objects.filter(pk=object_id).update(is_deleting=True)
+        catalog.invalidate()
+    elif target == 'room':
+        Room.objects.filter(pk=object_id).update(is_deleting=True)
+    else:
+        User.objects.filter(pk=object_id).update(is_active=False)
+
+
+def schedule(instance, user):
+    """Принимает удаление объекта; повторный запрос вернёт то же удаление."""
+    target = next(name for name, model in MODELS.items()
+                  if isinstance(instance, model))
+    try:
+        with transaction.atomic():
+            deletion = Deletion.objects.create(
+                target=target, object_id=instance.pk, requested_by=user
+            )
+            hide(target, instance.pk)
+            enqueue(
+                'run_deletion',
+                {'deletion_id': deletion.pk},
+                dedup_key=f'deletion:{deletion.pk}'
+            )
+    except IntegrityError:
+        deletion = Deletion.objects.exclude(status=Deletion.DONE).get(
+            target=target, object_id=instance.pk
+        )
+    return deletion
+
+
+def delete_batch(deletion, model, path, related):
+    """Удаляет одну пачку; False — у этой модели строк не осталось."""
+    batch = list(
+        model.objects.filter(**{path: deletion.object_id})
+        .select_related(*related)
+        .order_by('pk')[:settings.DELETION_BATCH_SIZE]
+    )
+    if not batch:
+        return False
+
+    with transaction.atomic():
+        collector = Collector(using=DEFAULT_DB_ALIAS, origin=deletion)
+        collector.collect(batch)
+        _, counts = collector.delete()
+        add_counts(deletion, counts)
+        deletion.save(update_fields=['deleted', 'updated_at'])
+    return True
+
+
+def add_counts(deletion, counts):
+    for label, count in counts.items():
+        deletion.deleted[label] = deletion.deleted.get(label, 0) + count
+
+
+def run(deletion_id):
+    """
+    Выполняет удаление до ``DELETION_BATCHES_PER_JOB`` пачек;
+    True — объект удалён полностью.
+    """
+    deletion = Deletion.objects.get(pk=deletion_id)
+    if deletion.status == Deletion.DONE:
+        return True
+    if deletion.status == Deletion.PENDING:
+        deletion.status = Deletion.RUNNING
+        deletion.save(update_fields=['status', 'updated_at'])
+
+    try:
+        batches = 0
+        for model, path, related in STEPS[deletion.target]:
+            while delete_batch(deletion, model, path, related):
+                batches += 1
+                if batches >= settings.DELETION_BATCHES_PER_JOB:
+                    return False
+
+        # Крупные зависимости удалены — остаток забирает обычный каскад
+        with transaction.atomic():
+            instance = MODELS[deletion.target].objects.filter(
+                pk=deletion.object_id
+            ).first()
+            if instance is not None:
+                _, counts = instance.delete()
+                add_counts(deletion, counts)
+            deletion.status = Deletion.DONE
+            deletion.last_error = ''
+            deletion.finished_at = timezone.now()
+            deletion.save()
+        return True
+    except Exception as error:
+        Deletion.objects.filter(pk=deletion.pk).update(
+            last_error=repr(error), updated_at=timezone.now()
+        )
+        raise
+
+
+def resume_stale():
+    """
+    Ставит задачу для незавершённых удалений, не продвигавшихся дольше
+    ``DELETION_RESUME_AFTER``; возвращает их число.
+    """
+    deadline = timezone.now() - settings.DELETION_RESUME_AFTER
+    stale = list(Deletion.objects.exclude(status=Deletion.DONE).filter(
+        updated_at__lt=deadline
+    ).values_list('pk', flat=True))
+    for deletion_id in stale:
+        enqueue(
+            'run_deletion',
+            {'deletion_id': deletion_id},
+            dedup_key=f'deletion:{deletion_id}'
+        )
+    return len(stale)
+
+
+def as_dict(deletion):
+    return {
+        'id': deletion.pk,
+        'target': deletion.target,
+        'object_id': deletion.object_id,
+        'status': deletion.status,
+        'deleted': deletion.deleted,
+        'last_error': deletion.last_error,
+        'created_at': deletion.created_at,
+        'updated_at': deletion.updated_at,
+        'finished_at': deletion.finished_at,
+    }
@@ -0,0 +1,199 @@
+"""
+События доступности номеров для SSE-подписчиков (GET /hotels/:id/events/).
+
+При создании, изменении и удалении брони (см. api/signals.py) после
+коммита публикуется короткое событие для отеля: номер занят
+(``booked``) или освобождён (``released``) на даты [start, end), либо
+у брони сменился статус (``status``). Проверка доступности учитывает
+брони в любом статусе, поэтому смена статуса не освобождает номер.
+
+Подписчики живут в event loop ASGI-процесса: у каждого своя очередь,
+простаивающий подписчик — это одна корутина. Рассылка внутри процесса —
+``LocalBroker``. Если брони пишут другие процессы (WSGI, воркер),
+``PostgresBroker`` передаёт события через LISTEN/NOTIFY: один поток
+в ASGI-процессе слушает канал и раздаёт события локальным подписчикам.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'booking_events'
+
+
+class Subscription:
+    """Очередь событий одного подписчика в его event loop."""
+
+    def __init__(self, hotel_id, loop, maxsize):
+        self.hotel_id = hotel_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, event):
+        """Можно вызывать из любого потока."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop уже закрыт — подписчик отключился
+
+    def _put(self, event):
+        if self.queue.full():
+            # Клиент не успевает читать: вместо пропусков просим его
+            # перечитать доступность целиком
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'event': 'reset'}
+        self.queue.put_nowait(event)
+
+
+class LocalBroker:
+    """Рассылка событий подписчикам текущего процесса."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, hotel_id):
+        """Подписка на события отеля; вызывать из event loop подписчика."""
+        subscription = Subscription(
+            hotel_id, asyncio.get_running_loop(), settings.EVENTS_QUEUE_SIZE
+        )
+        with self._lock:
+            self._subscribers[hotel_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.hotel_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.hotel_id]
+
+    def publish(self, hotel_id, event):
+        self.dispatch(hotel_id, event)
+
+    def dispatch(self, hotel_id, event):
+        with self._lock:
+            subs = list(self._subscribers.get(hotel_id, ()))
+        for subscription in subs:
+            subscription.put(event)
+
+
+class PostgresBroker(LocalBroker):
+    """Рассылка между процессами через LISTEN/NOTIFY PostgreSQL."""
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, hotel_id):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name='booking-events', daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(hotel_id)
+
+    def publish(self, hotel_id, event):
+        payload = json.dumps({'hotel': hotel_id, **event})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+    def _listen(self):
+        import psycopg2
+
+        while True:
+            try:
+                params = connection.get_connection_params()
+                listener = psycopg2.connect(**params)
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while True:
+                    if select.select([listener], [], [], 60) == ([], [], []):
+                        continue
+                    listener.poll()
+                    while listener.notifies:
+                        event = json.loads(listener.notifies.pop(0).payload)
+                        self.dispatch(event.pop('hotel'), event)
+            except Exception:
+                logger.exception('Слушатель событий бронирований упал')
+                time.sleep(5)
+
+
+BROKERS = {
+    'local': LocalBroker,
+    'postgres': PostgresBroker,
+}
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = BROKERS[settings.EVENTS_BROKER]()
+    return _broker
+
+
+def publish(hotel_id, event):
+    """Публикует событие после коммита текущей транзакции."""
+    transaction.on_commit(partial(get_broker().publish, hotel_id, event))
+
+
+def _period(row):
+    return {
+        'room': row.room_id,
+        'start': row.start_date.isoformat(),
+        'end': row.end_date.isoformat(),
+    }
+
+
+def booking_changed(previous, current):
+    """
+    События по старому и новому состоянию брони (``api.stats.BookingRow``;
+    None — брони не было или она удалена).
+    """
+    if previous == current:
+        return
+
+    moved = previous is None or current is None or (
+        previous.room_id, previous.start_date, previous.end_date
+    ) != (current.room_id, current.start_date, current.end_date)
+
+    if moved:
+        if previous is not None:
+            publish(previous.hotel_id, {'event': 'released', **_period(previous)})
+        if current is not None:
+            publish(current.hotel_id, {
+                'event': 'booked', **_period(current), 'status': current.status
+            })
+    elif previous.status != current.status:
+        publish(current.hotel_id, {
+            'event': 'status', **_period(current), 'status': current.status
+        })
+
+
+def encode(event):
+    """Событие в формате text/event-stream."""
+    data = {key: value for key, value in event.items() if key != 'event'}
+    return (
+        f'event: {event["event"]}\n'
+        f'data: {json.dumps(data, separators=(",", ":"))}\n\n'
+    ).encode()
@@ -0,0 +1,223 @@
+from itertools import chain, islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+# Поля, у которых to_representation() не меняет значение из БД
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.FloatField,
+    serializers.ReadOnlyField,
+)
+
+
+class UnsupportedField(Exception):
+    """Поле нельзя отобразить из строки .values() — нужен обычный путь DRF."""
+
+
+class RowMapper:
+    """
+    Скомпилированное отображение строки ``values_list()`` в словарь ответа.
+
+    Строится один раз по полям сериализатора (с учётом ?fields= / ?omit=)
+    и выдаёт тот же результат, что и ``serializer.data``, но без
+    создания экземпляров моделей и обхода полей DRF на каждую запись.
+    """
+
+    def __init__(self, serializer, model):
+        self.model = model
+        self.columns = []
+        self._indexes = {}
+        self.steps = self._compile(serializer, prefix='')
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def map(self, rows):
+        steps = self.steps
+        return [_apply(steps, row) for row in rows]
+
+    def row(self, row):
+        return _apply(self.steps, row)
+
+    def _column(self, path):
+        if path not in self._indexes:
+            self._indexes[path] = len(self.columns)
+            self.columns.append(path)
+        return self._indexes[path]
+
+    def _compile(self, serializer, prefix):
+        meta = getattr(serializer, 'Meta', None)
+        sources = getattr(meta, 'sparse_sources', {})
+        readers = getattr(meta, 'fast_readers', {})
+
+        # Свой to_representation быстрый путь не вызывает. Сериализатор
+        # явно подтверждает, что fast_readers его повторяют
+        overridden = (
+            type(serializer).to_representation
+            is not serializers.ModelSerializer.to_representation
+        )
+        if overridden and not getattr(meta, 'fast_representation', False):
+            raise UnsupportedField(type(serializer).__name__)
+
+        steps = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if name in readers:
+                indexes = tuple(
+                    self._column(prefix + path) for path in sources[name]
+                )
+                steps.append((name, READER, indexes, readers[name]))
+                continue
+
+            if (
+                isinstance(field, serializers.SerializerMethodField)
+                or field.source == '*'
+            ):
+                raise UnsupportedField(name)
+
+            source = field.source.replace('.', '__')
+            path = prefix + source
+
+            if isinstance(field, serializers.BaseSerializer):
+                if isinstance(field, serializers.ListSerializer):
+                    raise UnsupportedField(name)
+                nested = self._compile(field, prefix=path + '__')
+                # NULL во внешнем ключе — вложенный объект тоже None
+                steps.append((name, NESTED, self._column(path), nested))
+            elif isinstance(field, serializers.SlugRelatedField):
+                index = self._column(f'{path}__{field.slug_field}')
+                steps.append((name, RAW, index, None))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                steps.append((name, RAW, self._column(path), None))
+            elif isinstance(field, serializers.FileField):
+                storage = _model_field(self.model, path).storage
+                steps.append(
+                    (name, CONVERT, self._column(path), _file_url(field, storage))
+                )
+            elif isinstance(field, serializers.RelatedField):
+                raise UnsupportedField(name)
+            elif type(field) in IDENTITY_FIELDS:
+                steps.append((name, RAW, self._column(path), None))
+            else:
+                steps.append(
+                    (name, CONVERT, self._column(path), field.to_representation)
+                )
+
+        return steps
+
+
+RAW, CONVERT, READER, NESTED = range(4)
+
+
+def _apply(steps, row):
+    data = {}
+    for name, kind, index, extra in steps:
+        if kind == READER:
+            data[name] = extra(*[row[i] for i in index])
+            continue
+
+        value = row[index]
+        if value is None:
+            data[name] = None
+        elif kind == RAW:
+            data[name] = value
+        elif kind == CONVERT:
+            data[name] = extra(value)
+        else:
+            data[name] = _apply(extra, row)
+    return data
+
+
+def _model_field(model, path):
+    field = None
+    for part in path.split('__'):
+        if field is not None:
+            model = field.related_model
+        field = model._meta.get_field(part)
+    return field
+
+
+def _file_url(field, storage):
+    """Повторяет FileField.to_representation для имени файла из БД."""
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+    request = field.context.get('request')
+
+    def to_url(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    return to_url
+
+
+class FastListMixin:
+    """
+    Быстрый путь для list(): строки берутся через values_list() и
+    отображаются скомпилированным RowMapper. Если сериализатор содержит
+    неподдерживаемые поля, используется обычная сериализация DRF.
+
+    Большие списки без пагинации отдаются потоком, если рендерер
+    умеет кодировать массив частями (``render_chunks``). Тело и заголовки
+    те же, что у обычного ответа; согласование формата и обработчик
+    исключений DRF срабатывают до начала потока (первая порция читается
+    заранее), а ошибка БД посреди потока уже не может стать ответом 500.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        try:
+            mapper = RowMapper(self.get_serializer(), queryset.model)
+        except UnsupportedField:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.get_list_rows(mapper, queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(mapper.map(page))
+
+        renderer = getattr(request, 'accepted_renderer', None)
+        if not hasattr(renderer, 'render_chunks') or not renderer.is_fast(
+            request.accepted_media_type, self.get_renderer_context()
+        ):
+            return Response(mapper.map(rows))
+
+        # Первая порция решает: маленький список отдаём обычным ответом
+        chunk_size = settings.JSON_STREAM_CHUNK_SIZE
+        rows = rows.iterator(chunk_size=chunk_size)
+        head = list(islice(rows, chunk_size))
+        if len(head) < chunk_size:
+            return Response(mapper.map(head))
+
+        # Заголовки DRF (Allow, Vary) добавит finalize_response, он
+        # принимает любой HttpResponse; Content-Type — как у Response
+        items = (mapper.row(row) for row in chain(head, rows))
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        return StreamingHttpResponse(
+            renderer.render_chunks(items, chunk_size),
+            content_type=content_type
+        )
+
+    def get_list_rows(self, mapper, queryset):
+        """Строки списка; вьюха может добавить свои (например, UNION)."""
+        return mapper.values(queryset)
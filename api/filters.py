@@ -0,0 +1,73 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import SAFE_METHODS
+
+
+class SparseFieldsetFilter(BaseFilterBackend):
+    """
+    Сужает queryset до колонок и связей, которые реально читает сериализатор
+    (с учётом ?fields= / ?omit=). Ненужные JOIN'ы не выполняются.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if request.method not in SAFE_METHODS:
+            return queryset
+        return narrow_queryset(queryset, view.get_serializer())
+
+
+def narrow_queryset(queryset, serializer):
+    """Применяет only()/select_related() по путям из сериализатора."""
+    get_sources = getattr(serializer, 'get_sparse_sources', None)
+    sources = get_sources() if get_sources else None
+    if sources is None:
+        return queryset
+
+    resolved = _resolve_sources(queryset.model, sources)
+    if resolved is None:
+        return queryset
+
+    only, related = resolved
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(only) or ['pk'])
+
+
+def _resolve_sources(model, sources):
+    """Раскладывает пути на колонки для only() и связи для select_related()."""
+    only, related = set(), set()
+
+    for source in sources:
+        parts = source.split('__')
+        current = model
+
+        for i, part in enumerate(parts):
+            try:
+                field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+
+            is_last = i == len(parts) - 1
+            path = '__'.join(parts[:i + 1])
+
+            if not field.is_relation:
+                if not is_last:
+                    return None
+                only.add(path)
+                break
+
+            # Списки (one-to-many, many-to-many) через JOIN не достать
+            if field.one_to_many or field.many_to_many:
+                return None
+
+            if is_last:
+                if not field.concrete:
+                    return None
+                # Нужен только внешний ключ — JOIN не требуется
+                only.add(path)
+                break
+
+            related.add(path)
+            current = field.related_model
+
+    return only, related
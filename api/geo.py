@@ -0,0 +1,180 @@
+"""
+Геохеш и поиск по расстоянию без PostGIS.
+
+Координаты отеля кодируются геохешем (base32-строка, у соседних точек
+общий префикс). Все геохеши внутри ячейки с префиксом ``p`` лежат
+в лексикографическом диапазоне ``[p, next_prefix(p))``, поэтому поиск
+по области сводится к нескольким диапазонным условиям по индексу,
+а точное расстояние (гаверсинус) считается только для кандидатов.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Точность, с которой геохеш хранится в Hotel.geohash (~5 м)
+PRECISION = 9
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        interval, coordinate = (
+            (lon_range, longitude) if even else (lat_range, latitude)
+        )
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(ALPHABET[value])
+            bits, value = 0, 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Размер ячейки геохеша: (высота по широте, ширина по долготе) в градусах."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def next_prefix(prefix):
+    """Наименьшая строка, большая всех геохешей с данным префиксом."""
+    chars = list(prefix)
+    while chars:
+        index = ALPHABET.index(chars[-1])
+        if index + 1 < len(ALPHABET):
+            chars[-1] = ALPHABET[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Прямоугольник (min_lat, min_lon, max_lat, max_lon), содержащий круг.
+    Если круг пересекает антимеридиан (±180°), min_lon > max_lon.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    lon_delta = 180.0 if cos_lat < 1e-6 else radius_km / (KM_PER_DEGREE * cos_lat)
+    if lon_delta >= 180.0:
+        min_lon, max_lon = -180.0, 180.0
+    else:
+        min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+        if min_lon < -180.0:
+            min_lon += 360.0
+        if max_lon > 180.0:
+            max_lon -= 360.0
+    return (
+        max(latitude - lat_delta, -90.0),
+        min_lon,
+        min(latitude + lat_delta, 90.0),
+        max_lon,
+    )
+
+
+def split_box(min_lat, min_lon, max_lat, max_lon):
+    """Прямоугольник через антимеридиан (min_lon > max_lon) — как два."""
+    if min_lon <= max_lon:
+        return [(min_lat, min_lon, max_lat, max_lon)]
+    return [
+        (min_lat, min_lon, max_lat, 180.0),
+        (min_lat, -180.0, max_lat, max_lon),
+    ]
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=16):
+    """
+    Ячейки геохеша, покрывающие прямоугольник. Берётся самая мелкая
+    точность, при которой ячеек не больше ``max_cells``.
+    """
+    cells = set()
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        columns = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * columns > max_cells and precision > 1:
+            continue
+
+        cells = set()
+        for row in range(rows):
+            latitude = min(min_lat + row * height, max_lat)
+            for column in range(columns):
+                longitude = min(min_lon + column * width, max_lon)
+                cells.add(encode(latitude, longitude, precision))
+        # Углы могли не попасть в сетку шагов из-за округлений
+        for latitude in (min_lat, max_lat):
+            for longitude in (min_lon, max_lon):
+                cells.add(encode(latitude, longitude, precision))
+        break
+
+    return sorted(cells)
+
+
+def cells_q(cells, field='geohash'):
+    """Условие «геохеш лежит в одной из ячеек» — диапазоны по индексу."""
+    condition = Q()
+    for cell in cells:
+        upper = next_prefix(cell)
+        cell_q = Q(**{f'{field}__gte': cell})
+        if upper is not None:
+            cell_q &= Q(**{f'{field}__lt': upper})
+        condition |= cell_q
+    return condition
+
+
+def bbox_q(min_lat, min_lon, max_lat, max_lon):
+    """
+    Отели внутри прямоугольника: отсечение по ячейкам + точные границы.
+    Прямоугольник через антимеридиан проверяется двумя частями.
+    """
+    condition = Q()
+    for box in split_box(min_lat, min_lon, max_lat, max_lon):
+        part_min_lat, part_min_lon, part_max_lat, part_max_lon = box
+        condition |= cells_q(covering_cells(*box)) & Q(
+            latitude__gte=part_min_lat,
+            latitude__lte=part_max_lat,
+            longitude__gte=part_min_lon,
+            longitude__lte=part_max_lon,
+        )
+    return condition
+
+
+def distance_expression(latitude, longitude):
+    """Расстояние по гаверсинусу (км) от точки до координат отеля, в SQL."""
+    lat = Value(math.radians(latitude), output_field=FloatField())
+    lon = Value(math.radians(longitude), output_field=FloatField())
+    hotel_lat = Radians(F('latitude'))
+    hotel_lon = Radians(F('longitude'))
+
+    a = (
+        Power(Sin((hotel_lat - lat) / 2), 2)
+        + Cos(lat) * Cos(hotel_lat) * Power(Sin((hotel_lon - lon) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """То же расстояние в Python (км)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
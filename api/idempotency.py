@@ -0,0 +1,121 @@
+"""
+Повтор POST-запросов с заголовком ``Idempotency-Key``.
+
+Первый запрос с ключом выполняется в транзакции вместе с записью ключа
+и сохранением ответа. Повтор с тем же ключом (в течение IDEMPOTENCY_TTL)
+получает сохранённый ответ, бизнес-логика не выполняется. Параллельный
+дубликат ждёт первого запроса на уникальном индексе (user, key) и после
+его коммита тоже получает сохранённый ответ. Ошибочные ответы
+не сохраняются — такой запрос можно повторить с тем же ключом.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import IdempotencyKey
+from .renderers import ORJSONRenderer
+
+HEADER = 'Idempotency-Key'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Ключ идемпотентности уже использован для другого запроса.'
+    default_code = 'idempotency_key_reused'
+
+
+def fingerprint(request):
+    """Отпечаток запроса: тот же ключ с другим телом — ошибка клиента."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = sorted(data.lists())
+    payload = json.dumps(
+        [request.method, request.path, data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def acquire(user, key, request_fingerprint):
+    """
+    Записывает ключ в текущей транзакции. Если ключ уже есть,
+    возвращает сохранённую запись вместо новой: (запись, повтор).
+    """
+    now = timezone.now()
+    # Ключ с истёкшим сроком можно использовать заново
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                fingerprint=request_fingerprint,
+                expires_at=now + settings.IDEMPOTENCY_TTL
+            )
+        return record, False
+    except IntegrityError:
+        # На PostgreSQL вставка ждала коммита первого запроса
+        pass
+
+    record = IdempotencyKey.objects.get(user=user, key=key)
+    if record.fingerprint != request_fingerprint:
+        raise IdempotencyKeyReused()
+    return record, True
+
+
+def replay(record):
+    response = HttpResponse(
+        bytes(record.response_body),
+        status=record.response_status,
+        content_type=record.content_type
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+class IdempotentCreateMixin:
+    """create() вьюсета с поддержкой заголовка Idempotency-Key."""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return super().create(request, *args, **kwargs)
+
+        if not key or len(key) > 255:
+            raise ValidationError({HEADER: 'Ключ должен быть от 1 до 255 символов.'})
+
+        with transaction.atomic():
+            record, replayed = acquire(request.user, key, fingerprint(request))
+            if replayed:
+                return replay(record)
+
+            response = super().create(request, *args, **kwargs)
+
+            if not status.is_success(response.status_code):
+                record.delete()
+                return response
+
+            # Повтор всегда отдаётся JSON: browsable API рендерит HTML
+            # по контексту живого ответа, которого при повторе нет
+            renderer = ORJSONRenderer()
+            record.response_status = response.status_code
+            record.response_body = renderer.render(
+                response.data, renderer.media_type, self.get_renderer_context()
+            )
+            record.content_type = renderer.media_type
+            record.save(update_fields=[
+                'response_status', 'response_body', 'content_type'
+            ])
+
+        return response
+
+
+def cleanup():
+    """Удаляет ключи с истёкшим сроком."""
+    IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
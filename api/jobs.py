@@ -0,0 +1,286 @@
+"""
+Очередь фоновых задач в БД без внешнего брокера.
+
+Задачи регистрируются декоратором ``@task``, ставятся в очередь через
+``enqueue()`` и выполняются командой ``python manage.py worker``.
+На PostgreSQL задачи захватываются ``SELECT ... FOR UPDATE SKIP LOCKED``,
+на SQLite — опросом с атомарным ``UPDATE ... WHERE status='pending'``.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    max_attempts: int = 3
+    # Периодические задачи ставятся в очередь воркером раз в every
+    every: Optional[timedelta] = None
+    # False — задача всегда идёт в очередь, даже при JOBS_EAGER
+    eager: bool = True
+
+
+registry = {}
+
+
+def task(name, max_attempts=3, every=None, eager=True):
+    """Регистрирует функцию как фоновую задачу."""
+    def decorator(func):
+        registry[name] = Task(name, func, max_attempts, every, eager)
+        return func
+    return decorator
+
+
+def enqueue(name, kwargs=None, dedup_key=None, delay=None, replace=False):
+    """
+    Ставит задачу в очередь (в текущей транзакции).
+
+    Если ожидающая задача с тем же ``dedup_key`` уже есть, новая не создаётся;
+    с ``replace=True`` у существующей обновляются аргументы.
+    При ``JOBS_EAGER`` задача выполняется сразу после коммита транзакции:
+    одинаковые ``dedup_key`` в транзакции схлопываются, ошибка задачи
+    логируется, как у воркера. Задачи с ``eager=False`` и в этом режиме
+    ставятся в очередь и ждут запуска ``worker``.
+    """
+    definition = registry[name]
+    kwargs = kwargs or {}
+
+    if settings.JOBS_EAGER and definition.eager:
+        _enqueue_eager(definition, kwargs, dedup_key, replace)
+        return None
+
+    run_at = timezone.now() + (delay or timedelta())
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                kwargs=kwargs,
+                dedup_key=dedup_key,
+                max_attempts=definition.max_attempts,
+                run_at=run_at,
+            )
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+
+    pending = Job.objects.filter(dedup_key=dedup_key, status=Job.PENDING)
+    if replace:
+        pending.update(kwargs=kwargs)
+    return pending.first()
+
+
+class EagerCall:
+    """Задача, отложенная до коммита транзакции в режиме ``JOBS_EAGER``."""
+
+    def __init__(self, definition, kwargs, dedup_key):
+        self.definition = definition
+        self.kwargs = kwargs
+        self.dedup_key = dedup_key
+        self.started = False
+
+    def __call__(self):
+        self.started = True
+        # Данные уже закоммичены: ошибка задачи не должна стать ответом 500
+        try:
+            self.definition.func(**self.kwargs)
+        except Exception:
+            logger.exception('Задача %s завершилась ошибкой', self.definition.name)
+
+
+def _enqueue_eager(definition, kwargs, dedup_key, replace):
+    if dedup_key is not None:
+        # Такая же задача уже ждёт коммита этой транзакции и ещё не начата —
+        # как и в очереди, вторая не ставится. Откат точки сохранения убирает задачу из
+        # run_on_commit, поэтому искать нужно там
+        for _, func, _ in connection.run_on_commit:
+            if (
+                isinstance(func, EagerCall)
+                and func.dedup_key == dedup_key
+                and not func.started
+            ):
+                if replace:
+                    func.kwargs = kwargs
+                return
+    transaction.on_commit(EagerCall(definition, kwargs, dedup_key))
+
+
+def claim(worker_id, limit=1):
+    """Атомарно захватывает до ``limit`` готовых к запуску задач."""
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.PENDING, run_at__lte=now
+    ).order_by('run_at', 'pk')
+    lock = {
+        'status': Job.RUNNING,
+        'locked_at': now,
+        'locked_by': worker_id,
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                ready.select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:limit]
+            )
+            Job.objects.filter(pk__in=ids).update(**lock)
+    else:
+        # Без SKIP LOCKED: берём кандидатов и захватываем по одному,
+        # UPDATE сработает только у того воркера, кто успел первым
+        ids = []
+        for pk in list(ready.values_list('pk', flat=True)[:limit * 4]):
+            if Job.objects.filter(pk=pk, status=Job.PENDING).update(**lock):
+                ids.append(pk)
+                if len(ids) >= limit:
+                    break
+
+    return list(Job.objects.filter(pk__in=ids).order_by('run_at', 'pk'))
+
+
+def execute(job):
+    """Выполняет захваченную задачу и фиксирует результат."""
+    definition = registry.get(job.name)
+
+    try:
+        if definition is None:
+            raise LookupError(f'Неизвестная задача: {job.name}')
+        definition.func(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s #%s завершилась ошибкой', job.name, job.pk)
+        _retry_or_fail(job, error)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, locked_at=None, last_error=''
+    )
+    return True
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка повтора: base, 2*base, 4*base, …"""
+    base = settings.JOBS_RETRY_BACKOFF
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def _retry_or_fail(job, error):
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, locked_at=None, last_error=error
+        )
+        return
+
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.PENDING,
+                locked_at=None,
+                locked_by='',
+                run_at=timezone.now() + retry_delay(job.attempts),
+                last_error=error,
+            )
+    except IntegrityError:
+        # Пока задача выполнялась, такую же уже поставили в очередь заново
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, locked_at=None, last_error=error
+        )
+
+
+def release_stale(timeout=None):
+    """Возвращает в очередь задачи упавших воркеров."""
+    timeout = timeout or settings.JOBS_LOCK_TIMEOUT
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=deadline)
+
+    for job in stale:
+        _retry_or_fail(job, job.last_error or 'Истёк таймаут блокировки воркера')
+
+
+def schedule_periodic(now=None):
+    """Ставит в очередь периодические задачи, чей интервал наступил."""
+    now = now or timezone.now()
+    for definition in registry.values():
+        if definition.every is None:
+            continue
+        period = int(definition.every.total_seconds())
+        key = f'periodic:{definition.name}:{int(now.timestamp()) // period}'
+        if not Job.objects.filter(dedup_key=key).exists():
+            enqueue(definition.name, dedup_key=key)
+
+
+class Worker:
+    """Выполняет задачи из очереди в ``concurrency`` потоках."""
+
+    def __init__(self, concurrency=1, poll_interval=None, name=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def run(self, burst=False):
+        """Запускает потоки; с ``burst`` завершается, когда очередь пуста."""
+        threads = [
+            threading.Thread(
+                target=self._loop,
+                args=(f'{self.name}:{i}', burst),
+                daemon=True
+            )
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run_pending(self, worker_id=None):
+        """Выполняет все готовые задачи в текущем потоке, возвращает их число."""
+        worker_id = worker_id or self.name
+        processed = 0
+        while not self.stopping.is_set():
+            jobs = claim(worker_id)
+            if not jobs:
+                break
+            for job in jobs:
+                execute(job)
+                processed += 1
+        return processed
+
+    def _loop(self, worker_id, burst):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                release_stale()
+                schedule_periodic()
+                processed = self.run_pending(worker_id)
+                if burst and not processed:
+                    break
+                if not processed:
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connection.close()
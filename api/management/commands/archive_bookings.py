@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import BookingArchive
+
+
+class Command(BaseCommand):
+    help = 'Переносит прошедшие бронирования в архивную таблицу.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+            help='Архивировать брони, закончившиеся больше N дней назад.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько броней переносить в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.localdate() - timedelta(days=options['days'])
+        moved = BookingArchive.archive(before, options['batch_size'])
+        self.stdout.write(f'Перенесено в архив: {moved}')
@@ -0,0 +1,130 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Выполняется в отдельном процессе: «холодный» интерпретатор,
+# как при первом запросе к бессерверной функции
+PROBE = '''
+import json, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+ready = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+from django.conf import settings
+print(json.dumps({
+    'ready_ms': (ready - start) * 1000,
+    'urls_ms': (urls - ready) * 1000,
+    'budget_ms': settings.COLD_START_BUDGET_MS,
+}))
+'''
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)')
+
+
+def parse_importtime(output, by_module=False):
+    """
+    Собственное время импорта (мкс) по модулям или, по умолчанию,
+    суммированное по пакетам верхнего уровня.
+    """
+    timings = Counter()
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            name = match.group(3)
+            if not by_module:
+                name = name.split('.')[0]
+            timings[name] += int(match.group(1))
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет холодный старт: время импорта по пакетам, '
+        'django.setup() и загрузку URLconf.'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', default=os.environ.get('DJANGO_SETTINGS_MODULE'),
+            help='Модуль настроек, например checkmate.settings_serverless.'
+        )
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Сколько запусков; берётся медиана.'
+        )
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Сколько самых медленных пакетов показать.'
+        )
+        parser.add_argument(
+            '--modules', action='store_true',
+            help='Показывать отдельные модули, а не пакеты.'
+        )
+        parser.add_argument(
+            '--budget', type=float, default=None,
+            help='Бюджет в мс (по умолчанию COLD_START_BUDGET_MS профиля).'
+        )
+
+    def handle(self, *args, **options):
+        runs = [
+            self.probe(options['profile'], options['modules'])
+            for _ in range(options['runs'])
+        ]
+        runs.sort(key=lambda run: run[0]['ready_ms'] + run[0]['urls_ms'])
+        timings, packages = runs[len(runs) // 2]
+
+        total = timings['ready_ms'] + timings['urls_ms']
+        budget = options['budget'] or timings['budget_ms']
+
+        self.stdout.write(
+            f"Профиль: {options['profile']}, запусков: {len(runs)} (медиана)"
+        )
+        self.stdout.write(f"Импорт и django.setup(): {timings['ready_ms']:.0f} мс")
+        self.stdout.write(f"Загрузка URLconf: {timings['urls_ms']:.0f} мс")
+        self.stdout.write(f'Итого: {total:.0f} мс (бюджет {budget:.0f} мс)')
+        if len(runs) > 1:
+            spread = [run[0]['ready_ms'] + run[0]['urls_ms'] for run in runs]
+            self.stdout.write(
+                f'Разброс: {min(spread):.0f}–{max(spread):.0f} мс, '
+                f'σ {statistics.pstdev(spread):.0f} мс'
+            )
+
+        self.stdout.write('')
+        title = 'Модуль' if options['modules'] else 'Пакет'
+        self.stdout.write(f"{title:<48}{'мс':>8}")
+        for name, micros in packages.most_common(options['top']):
+            self.stdout.write(f'{name:<48}{micros / 1000:>8.1f}')
+
+        if total > budget:
+            raise CommandError(
+                f'Холодный старт {total:.0f} мс превышает бюджет {budget:.0f} мс'
+            )
+
+    def probe(self, profile, by_module=False):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': profile}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        return (
+            json.loads(result.stdout.strip().splitlines()[-1]),
+            parse_importtime(result.stderr, by_module),
+        )
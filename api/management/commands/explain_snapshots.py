@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import catalog, plans
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает EXPLAIN запросов основных эндпоинтов и сравнивает '
+        'со снимками; ошибка при изменении плана или полном скане '
+        'большой таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help='Только эти сценарии (по умолчанию все).'
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Перезаписать снимки текущими планами.'
+        )
+        parser.add_argument(
+            '--no-seed', action='store_true',
+            help='Не создавать синтетические данные, взять данные из БД.'
+        )
+        parser.add_argument(
+            '--hotels', type=int, default=500,
+            help='Сколько отелей создать для планов (без --no-seed).'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [
+            scenario for scenario in plans.SCENARIOS
+            if not options['scenarios'] or scenario.name in options['scenarios']
+        ]
+        unknown = set(options['scenarios']) - {s.name for s in scenarios}
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+
+        # Данные для планов живут только в этой транзакции
+        try:
+            with transaction.atomic():
+                if not options['no_seed']:
+                    plans.seed(hotels=options['hotels'])
+                ids = plans.context()
+                captured = [
+                    (scenario, plans.capture(scenario, ids))
+                    for scenario in scenarios
+                ]
+                transaction.set_rollback(True)
+        finally:
+            catalog.reset()
+
+        directory = plans.snapshot_dir()
+        problems = []
+
+        for scenario, queries in captured:
+            if queries is None:
+                self.stdout.write(f'{scenario.name}: нет данных, пропущен')
+                continue
+
+            scans = plans.full_scans(queries, scenario.allow_scans)
+            if scans:
+                problems.append(
+                    f'{scenario.name}: полный скан {", ".join(scans)}'
+                )
+
+            path = directory / f'{scenario.name}.txt'
+            actual = plans.render(queries)
+            if options['update']:
+                directory.mkdir(parents=True, exist_ok=True)
+                path.write_text(actual, encoding='utf-8')
+                self.stdout.write(f'{scenario.name}: снимок записан')
+                continue
+
+            if not path.exists():
+                problems.append(
+                    f'{scenario.name}: нет снимка {path} '
+                    f'(создайте его с --update)'
+                )
+                continue
+
+            expected = path.read_text(encoding='utf-8')
+            if expected != actual:
+                problems.append(
+                    f'{scenario.name}: план изменился\n'
+                    + plans.diff(expected, actual, scenario.name)
+                )
+            else:
+                self.stdout.write(f'{scenario.name}: OK')
+
+        if problems:
+            raise CommandError('\n\n'.join(problems))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Hotel, HotelRating
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает агрегаты рейтинга отелей (HotelRating) по отзывам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hotel', type=int, action='append', dest='hotels',
+            help='Пересобрать только этот отель (можно несколько раз).'
+        )
+
+    def handle(self, *args, **options):
+        hotels = Hotel.objects.order_by('pk')
+        if options['hotels']:
+            hotels = hotels.filter(pk__in=options['hotels'])
+
+        count = 0
+        for hotel_id in hotels.values_list('pk', flat=True).iterator():
+            HotelRating.rebuild(hotel_id)
+            count += 1
+        self.stdout.write(f'Пересчитано отелей: {count}')
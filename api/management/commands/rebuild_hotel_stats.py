@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает дневную сводку отелей по броням и архиву.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hotel', type=int, action='append', dest='hotels',
+            help='Пересобрать только этот отель (можно несколько раз).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк сводки вставлять за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        days = stats.rebuild(options['hotels'], options['batch_size'])
+        self.stdout.write(f'Строк сводки: {days}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api import search
+from api.models import Hotel
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает индекс полнотекстового поиска по отелям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько отелей переиндексировать за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        search.setup()
+
+        ids = list(Hotel.objects.order_by('pk').values_list('pk', flat=True))
+        batch = options['batch_size']
+        for start in range(0, len(ids), batch):
+            search.reindex(ids[start:start + batch])
+
+        self.stdout.write(f'Проиндексировано отелей: {len(ids)}')
@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - без brotli остаётся только gzip
+    brotli = None
+
+
+# Уже сжатые форматы и потоки, которые нельзя буферизовать
+SKIP_CONTENT_TYPES = (
+    'image/',
+    'video/',
+    'audio/',
+    'font/woff',
+    'application/zip',
+    'application/gzip',
+    'application/x-gzip',
+    'application/x-bzip2',
+    'application/x-7z-compressed',
+    'application/pdf',
+    'application/octet-stream',
+    'text/event-stream',
+)
+
+
+def parse_accept_encoding(header):
+    """Accept-Encoding → {кодировка: q}; кодировки с q=0 не включаются."""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(header, available):
+    """Выбирает кодировку по q-значениям; при равенстве — в порядке available."""
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов API с согласованием Brotli/gzip по Accept-Encoding.
+
+    Короткие ответы (меньше COMPRESSION_MIN_SIZE), уже сжатые форматы и
+    ответы с Content-Encoding не трогаем. Потоковые ответы сжимаются
+    по частям, без сборки всего тела в памяти.
+    """
+    # Как и в GZipMiddleware: случайный заголовок против BREACH
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY
+        self.available = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.available
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                encoding, response.streaming_content, response.is_async
+            )
+            # Размер сжатого потока заранее неизвестен
+            del response.headers['Content-Length']
+        else:
+            compressed = self.compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if response.status_code in (204, 206, 304):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(SKIP_CONTENT_TYPES):
+            return False
+
+        return response.streaming or len(response.content) >= self.min_size
+
+    def compress(self, encoding, content):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return compress_string(content, max_random_bytes=self.max_random_bytes)
+
+    def compress_stream(self, encoding, content, is_async):
+        if is_async:
+            return self._compress_async(encoding, content)
+        if encoding == 'br':
+            return self._brotli_sequence(content)
+        return compress_sequence(content, max_random_bytes=self.max_random_bytes)
+
+    def _brotli_sequence(self, content):
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        for chunk in content:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    async def _compress_async(self, encoding, content):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            async for chunk in content:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+        else:
+            # Каждая часть — отдельный gzip-член, как в GZipMiddleware
+            async for chunk in content:
+                yield compress_string(
+                    chunk, max_random_bytes=self.max_random_bytes
+                )
@@ -1,9 +1,15 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 
+from . import geo
+
 
 # Пользователь
 # Добавляем/редактируем поля в AbstractUser 
@@ -48,6 +54,26 @@ class Hotel(models.Model):
     description = models.TextField()
     image = models.ImageField(upload_to='hotels/')
     rating = models.FloatField(default=0.0)
+    latitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Геохеш координат для поиска по области (см. api/geo.py)
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        db_index=True,
+        editable=False
+    )
+    # Документ полнотекстового поиска на PostgreSQL (см. api/search.py);
+    # GIN-индекс создаётся после migrate, на SQLite колонка не используется
+    search_vector = SearchVectorField(null=True, editable=False)
 
     manager = models.ForeignKey(
             settings.AUTH_USER_MODEL,
@@ -56,23 +82,30 @@ class Hotel(models.Model):
             blank=True,
             related_name='managed_hotels'
         )
+    # Отель удаляется в фоне (см. api/deletion.py) и скрыт из выдачи
+    is_deleting = models.BooleanField(default=False)
 
     def __str__(self):
         return self.name
 
-    def update_rating(self):
-        # reviews = self.reviews.all()
-
-        reviews = Review.objects.filter(booking__room__hotel=self)
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
 
-        # if reviews.exists():
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and (
+            {'latitude', 'longitude'} & set(update_fields)
+        ):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
 
-        avg_rating = reviews.aggregate(
-            models.Avg('rating')
-        )['rating__avg'] or 0
+        super().save(*args, **kwargs)
 
-        self.rating = round(avg_rating, 2)
-        self.save()
+    def update_rating(self):
+        """Полный пересчёт рейтинга и гистограммы по всем отзывам отеля."""
+        HotelRating.rebuild(self.pk)
+        self.refresh_from_db(fields=['rating'])
 
 
 # Номер в отеле
@@ -83,6 +116,18 @@ class Room(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=8, decimal_places=2)
     image = models.ImageField(upload_to='rooms/')
+    # Номер удаляется в фоне (см. api/deletion.py) и скрыт из выдачи
+    is_deleting = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Самый дешёвый номер отеля в поиске: номера отеля уже
+            # упорядочены по цене, первый подходящий и есть ответ
+            models.Index(
+                fields=['hotel', 'price'],
+                name='room_hotel_price_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.hotel.name} - {self.room_type}"
@@ -92,7 +137,7 @@ class Room(models.Model):
 class Discount(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.PositiveIntegerField()  # Процент
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
     used = models.BooleanField(default=False)
 
     def is_valid(self):
@@ -105,6 +150,44 @@ class Discount(models.Model):
         )
 
 
+# Правило цены номера (см. api/pricing.py). Без min_nights — наценка
+# или скидка на каждую ночь сезона [start_date, end_date) и выбранных
+# дней недели; с min_nights > 1 — скидка на всё проживание от стольких
+# ночей с заездом в сезон. Без room — для всех номеров отеля.
+class RateRule(models.Model):
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.CASCADE,
+        related_name='rate_rules'
+    )
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='rate_rules'
+    )
+    name = models.CharField(max_length=100, blank=True)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)  # не включительно
+    # Дни недели цифрами, 0 — понедельник ('56' — выходные); пусто — все
+    weekdays = models.CharField(max_length=7, blank=True)
+    min_nights = models.PositiveIntegerField(default=1)
+    percent = models.DecimalField(max_digits=5, decimal_places=2)  # + / −
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(percent__gte=-100),
+                name='rate_rule_percent_gte_minus_100'
+            ),
+        ]
+
+    def __str__(self):
+        target = self.room or self.hotel
+        return f"{target}: {self.percent:+}% {self.name}".rstrip()
+
+
 # Бронирование
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -131,10 +214,93 @@ class Booking(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Проверка пересечений: room = X AND end_date > заезд
+            # AND start_date < выезд — диапазонный скан по индексу
+            models.Index(
+                fields=['room', 'end_date', 'start_date'],
+                name='booking_room_dates_idx'
+            ),
+            # Фильтр по статусу и иерархия дат в админке
+            models.Index(
+                fields=['status', 'start_date'],
+                name='booking_status_start_idx'
+            ),
+            models.Index(fields=['start_date'], name='booking_start_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.email} - {self.room.hotel.name} ({self.status})"
 
 
+# Архив прошедших бронирований. Горячая таблица Booking содержит только
+# текущие и будущие проживания, поэтому проверки доступности не трогают
+# историю. Поля повторяют Booking, id сохраняется.
+class BookingArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings'
+    )
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings'
+    )
+    start_date = models.DateField()
+    end_date = models.DateField(db_index=True)
+    guests = models.PositiveIntegerField()
+    first_name = models.CharField(max_length=255)
+    last_name = models.CharField(max_length=255)
+    phone = models.CharField(max_length=30)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_applied = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20,
+        choices=Booking.STATUS_CHOICES,
+        default='pending'
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.email} - {self.room.hotel.name} ({self.status})"
+
+    @classmethod
+    def archive(cls, before, batch_size=500):
+        """
+        Переносит брони, закончившиеся раньше ``before``, в архив пачками.
+        Брони с отзывами остаются в Booking: на них ссылается Review.
+        """
+        columns = [field.attname for field in Booking._meta.concrete_fields]
+        moved = 0
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    Booking.objects.select_for_update(of=('self',))
+                    .filter(end_date__lt=before, review__isnull=True)
+                    .order_by('pk')
+                    .values(*columns)[:batch_size]
+                )
+                if not rows:
+                    break
+
+                cls.objects.bulk_create(
+                    [cls(**row) for row in rows], ignore_conflicts=True
+                )
+                # Перенос — не удаление брони: сигналы и каскад не нужны
+                Booking.objects.filter(
+                    pk__in=[row['id'] for row in rows]
+                )._raw_delete(Booking.objects.db)
+
+            moved += len(rows)
+
+        return moved
+
+
 # Отзыв о отеле
 class Review(models.Model):
     # user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -162,9 +328,10 @@ class Review(models.Model):
     text = models.TextField()
     rating = models.PositiveSmallIntegerField(
         default=1,
-        choices=[(i, i) for i in range(1, 6)]
+        choices=[(i, i) for i in range(1, 6)],
+        db_index=True
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def clean(self):
@@ -174,9 +341,11 @@ class Review(models.Model):
             )
 
     def save(self, *args, **kwargs):
+        # booking проверяется вместе с остальными полями: второй отзыв
+        # на ту же бронь — ошибка валидации, а не IntegrityError
         self.full_clean()
         super().save(*args, **kwargs)
-        self.booking.room.hotel.update_rating()
+        # Рейтинг отеля пересчитывается фоновой задачей (см. api/signals.py)
 
     def __str__(self):
         return (
@@ -191,3 +360,277 @@ class Review(models.Model):
     @property
     def hotel(self):
         return self.booking.room.hotel
+
+
+# Агрегат рейтинга отеля: количество, сумма и гистограмма оценок.
+# Сводку читают без сканирования отзывов, но поддерживается она не
+# приращениями, а пересчётом: задача после изменения отзывов делает один
+# сгруппированный запрос по отзывам отеля (rebuild). Задачи одного отеля
+# схлопываются, поэтому пачка отзывов — один пересчёт, а повтор или
+# потерянная задача не накапливают ошибку, как накопила бы дельта.
+# Цена — скан отзывов одного отеля вне запроса пользователя.
+class HotelRating(models.Model):
+    STARS = range(1, 6)
+
+    hotel = models.OneToOneField(
+        Hotel,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rating_summary'
+    )
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hotel_id}: {self.average} ({self.count})"
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 2) if self.count else 0.0
+
+    @property
+    def histogram(self):
+        return {str(i): getattr(self, f'stars_{i}') for i in self.STARS}
+
+    @classmethod
+    def rebuild(cls, hotel_id):
+        """Пересчитывает агрегат по отзывам одним сгруппированным запросом."""
+        if not Hotel.objects.filter(pk=hotel_id).exists():
+            return
+
+        counts = dict(
+            Review.objects.filter(booking__room__hotel_id=hotel_id)
+            .values_list('rating')
+            .annotate(n=models.Count('id'))
+        )
+        values = {f'stars_{i}': counts.get(i, 0) for i in cls.STARS}
+        values['count'] = sum(counts.values())
+        values['total'] = sum(rating * n for rating, n in counts.items())
+
+        summary, _ = cls.objects.update_or_create(
+            hotel_id=hotel_id, defaults=values
+        )
+        Hotel.objects.filter(pk=hotel_id).update(rating=summary.average)
+
+
+# Сводка отеля за день: сколько номеров занято в эту ночь и выручка
+# за неё. Обновляется при изменении броней (см. api/stats.py), поэтому
+# аналитика читает O(дней), а не все бронирования.
+class HotelDailyStats(models.Model):
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.CASCADE,
+        related_name='daily_stats'
+    )
+    date = models.DateField()
+    rooms_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hotel', 'date'],
+                name='unique_hotel_daily_stats'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} {self.date}: {self.rooms_sold}, {self.revenue}"
+
+
+# Счётчики популярности отеля за день (см. api/counters.py)
+class HotelCounter(models.Model):
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.CASCADE,
+        related_name='counters'
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)  # просмотры карточки
+    impressions = models.PositiveIntegerField(default=0)  # показы в поиске
+    bookings = models.PositiveIntegerField(default=0)  # созданные брони
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hotel', 'date'],
+                name='unique_hotel_counter'
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.hotel_id} {self.date}: {self.views}, "
+            f"{self.impressions}, {self.bookings}"
+        )
+
+
+# Фоновая задача (см. api/jobs.py)
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Одинаковые ключи среди ожидающих задач схлопываются в одну
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_job_dedup_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# Счётчики ограничения частоты запросов по клиентам для подбора лимитов.
+# Сами корзины токенов лежат в кеше (см. api/throttling.py).
+class RateLimitBucket(models.Model):
+    # 'anon:<sha1 от ip>' или 'user:<id>'
+    key = models.CharField(max_length=100, primary_key=True)
+    kind = models.CharField(max_length=10)
+    # Время последнего запроса, секунды Unix
+    updated_at = models.FloatField(db_index=True)
+    allowed = models.PositiveBigIntegerField(default=0)
+    throttled = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}: {self.allowed}/{self.throttled}"
+
+
+# Ключ идемпотентности (заголовок Idempotency-Key) и сохранённый ответ
+# на первый запрос с ним (см. api/idempotency.py)
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    key = models.CharField(max_length=255)
+    # sha256 метода, пути и тела запроса
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.BinaryField(default=b'')
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='unique_idempotency_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key} ({self.response_status})"
+
+
+# Профиль запроса, снятый по заголовку X-Profile (см. api/profiling.py)
+class RequestProfile(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    sql_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    # Топ функций cProfile, SQL с местом вызова, EXPLAIN медленных запросов
+    report = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+# Фоновое удаление отеля, номера или пользователя со всеми зависимыми
+# записями частями (см. api/deletion.py)
+class Deletion(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+    ]
+    TARGET_CHOICES = [
+        ('hotel', 'Отель'),
+        ('room', 'Номер'),
+        ('user', 'Пользователь'),
+    ]
+
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    # Сколько строк удалено: {'api.Booking': 1500, ...}
+    deleted = models.JSONField(default=dict, blank=True)
+    # Последняя ошибка; задача будет повторена (см. api/jobs.py)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['target', 'object_id'],
+                condition=~models.Q(status='done'),
+                name='unique_active_deletion'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.target} #{self.object_id} ({self.status})"
+
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+class SearchPagination(PageNumberPagination):
+    """Страницы результатов поиска: ?page=2&page_size=50."""
+    page_size = settings.SEARCH_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ManagedBookingPagination(PageNumberPagination):
+    """Страницы броней отелей менеджера: ?page=2&page_size=100."""
+    page_size = settings.MANAGED_BOOKINGS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки для больших таблиц. Без фильтров на PostgreSQL
+    количество берётся из статистики планировщика (pg_class.reltuples),
+    а не точным COUNT(*) по всей таблице. Маленькие таблицы, отфильтрованные
+    списки и другие СУБД считаются как обычно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[getattr(queryset, 'db', 'default')]
+
+        if (
+            connection.vendor == 'postgresql'
+            and hasattr(queryset, 'query')
+            and not queryset.query.where
+        ):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # До первого ANALYZE reltuples равно -1 (или 0)
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+
+        return super().count
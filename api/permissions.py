@@ -15,6 +15,16 @@ class IsStaff(permissions.BasePermission):
         return request.user.is_authenticated and request.user.is_staff
 
 
+class IsHotelManager(permissions.BasePermission):
+    """Менеджер отеля (Hotel.manager) или суперпользователь."""
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.is_staff
+
+    def has_object_permission(self, request, view, obj):
+        return obj.manager == request.user or request.user.is_superuser
+
+
 class IsAdmin(permissions.BasePermission):
 
     def has_permission(self, request, view):
@@ -45,9 +55,11 @@ class IsStaffOwnerOrAdminOrReadOnly(permissions.BasePermission):
                 )
 
     def has_object_permission(self, request, view, obj):
+        # Номером распоряжается менеджер его отеля
+        hotel = getattr(obj, 'hotel', obj)
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.manager == request.user
+            or hotel.manager == request.user
             or request.user.is_superuser
         )
 
@@ -0,0 +1,304 @@
+"""
+Снимки планов запросов API (python manage.py explain_snapshots).
+
+Для каждого сценария (эндпоинт с типичными параметрами) запрос
+выполняется через тестовый клиент, все его SELECT записываются
+и для каждого снимается ``EXPLAIN`` (на SQLite — ``EXPLAIN QUERY PLAN``).
+SQL и планы нормализуются (параметры, длина списков IN, стоимости)
+и сравниваются со снимками в ``PLAN_SNAPSHOT_DIR/<СУБД>/<сценарий>.txt``.
+Отдельно ищутся полные сканы больших таблиц.
+"""
+import difflib
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import catalog, geo
+from .models import (
+    Booking,
+    BookingArchive,
+    City,
+    Country,
+    Hotel,
+    HotelCounter,
+    HotelDailyStats,
+    Review,
+    Room,
+    User,
+)
+from .profiling import QueryLog
+
+# Таблицы, полный скан которых считается регрессией
+LARGE_TABLES = frozenset(
+    model._meta.db_table
+    for model in (
+        Hotel, Room, Booking, BookingArchive, Review, HotelDailyStats,
+        HotelCounter,
+    )
+)
+
+CHECK_IN = date(2030, 1, 10)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    path: str
+    params: dict = field(default_factory=dict)
+    # None — аноним, 'user' — гость с бронями, 'manager' — менеджер
+    # отелей, 'admin' — суперпользователь
+    user: str = None
+    # Большие таблицы, которые сценарий читает целиком намеренно
+    allow_scans: frozenset = frozenset()
+
+
+SCENARIOS = (
+    Scenario('search_city', '/search/', {
+        'city_id': '{city}', 'check_in': '2030-01-10',
+        'check_out': '2030-01-12', 'guests': 2,
+    }),
+    Scenario('search_point', '/search/', {
+        'lat': 55.75, 'lon': 37.62, 'radius': 3, 'check_in': '2030-01-10',
+        'check_out': '2030-01-12', 'guests': 2, 'sort': 'distance',
+    }),
+    Scenario('search_text', '/search/', {'q': 'отель центр'}),
+    Scenario('search_price', '/search/', {
+        'city_id': '{city}', 'check_in': '2030-01-10',
+        'check_out': '2030-01-12', 'guests': 2, 'sort': 'price', 'limit': 10,
+    }),
+    Scenario('search_popularity', '/search/', {
+        'lat': 55.75, 'lon': 37.62, 'radius': 3, 'check_in': '2030-01-10',
+        'check_out': '2030-01-12', 'guests': 2, 'sort': 'popularity',
+        'limit': 10,
+    }),
+    Scenario('search_rooms', '/search/rooms/', {
+        'city_id': '{city}', 'check_in': '2030-01-10',
+        'check_out': '2030-01-12', 'guests': 2, 'max_price': 130,
+    }),
+    # Рейтинг по популярности сортирует весь список отелей
+    Scenario('hotels_popular', '/hotels/', {'sort': 'popularity'},
+             allow_scans=frozenset({'api_hotel'})),
+    Scenario('rooms', '/hotels/{hotel}/rooms/'),
+    Scenario('rooms_available', '/hotels/{hotel}/rooms/', {
+        'check_in': '2030-01-10', 'check_out': '2030-01-12', 'guests': 2,
+    }),
+    Scenario('bookings', '/bookings/', user='user'),
+    Scenario('bookings_managed', '/bookings/managed/', {
+        'start': '2030-01-10', 'end': '2030-01-20', 'status': 'confirmed',
+    }, user='manager'),
+    # Администратор видит все брони: полный проход по ним неизбежен
+    Scenario('bookings_admin', '/bookings/', user='admin', allow_scans=frozenset(
+        {'api_booking', 'api_bookingarchive', 'api_room'}
+    )),
+    Scenario('reviews', '/hotels/{hotel}/reviews/'),
+    Scenario('cities', '/cities/', {'fields': 'id,name,country,hotels_count'},
+             allow_scans=frozenset({'api_hotel'})),
+    # Загрузка справочника в память читает отели целиком намеренно
+    Scenario('cities_catalog', '/cities/', allow_scans=frozenset({'api_hotel'})),
+)
+
+
+def seed(hotels=500, rooms_per_hotel=5, bookings_per_room=4):
+    """Синтетические данные для планов (вызывать в откатываемой транзакции)."""
+    countries = Country.objects.bulk_create(
+        [Country(name=f'Страна {i}') for i in range(5)]
+    )
+    cities = City.objects.bulk_create(
+        [City(name=f'Город {i}', country=countries[i % 5]) for i in range(20)]
+    )
+    users = User.objects.bulk_create([
+        User(email=f'plans{i}@example.com', username=f'plans{i}', password='!')
+        for i in range(50)
+    ])
+    User.objects.create(
+        email='plans-admin@example.com', username='plans-admin', password='!',
+        is_staff=True, is_superuser=True
+    )
+    managers = User.objects.bulk_create([
+        User(email=f'plans-manager{i}@example.com',
+             username=f'plans-manager{i}', password='!', is_staff=True)
+        for i in range(hotels // 10 or 1)
+    ])
+
+    hotel_objects = []
+    for i in range(hotels):
+        latitude = 55.5 + (i % 50) * 0.01
+        longitude = 37.3 + (i // 50) * 0.01
+        hotel_objects.append(Hotel(
+            name=f'Отель {i}', city=cities[i % len(cities)],
+            address=f'Улица {i}', description='Отель в центре города',
+            image='hotels/temp.jpeg', latitude=latitude, longitude=longitude,
+            geohash=geo.encode(latitude, longitude),
+            manager=managers[i % len(managers)]
+        ))
+    hotel_objects = Hotel.objects.bulk_create(hotel_objects)
+
+    rooms = Room.objects.bulk_create([
+        Room(
+            hotel=hotel, room_type=f'Тип {j}', capacity=1 + j % 4,
+            description='Номер', price=Decimal(100 + 10 * j),
+            image='rooms/temp.jpeg'
+        )
+        for hotel in hotel_objects
+        for j in range(rooms_per_hotel)
+    ])
+
+    bookings = Booking.objects.bulk_create([
+        Booking(
+            user=users[(i * bookings_per_room + k) % len(users)], room=room,
+            start_date=CHECK_IN + timedelta(days=7 * k + i % 5),
+            end_date=CHECK_IN + timedelta(days=7 * k + i % 5 + 2),
+            guests=1, first_name='Иван', last_name='Иванов',
+            phone='+70000000000', total_price=room.price * 2,
+            status='confirmed'
+        )
+        for i, room in enumerate(rooms)
+        for k in range(bookings_per_room)
+    ])
+
+    Review.objects.bulk_create([
+        Review(booking=booking, text='Хорошо', rating=1 + i % 5)
+        for i, booking in enumerate(bookings[::4])
+    ])
+
+    today = timezone.localdate()
+    HotelCounter.objects.bulk_create([
+        HotelCounter(
+            hotel=hotel, date=today - timedelta(days=day),
+            views=i % 7, impressions=i % 30, bookings=i % 3
+        )
+        for i, hotel in enumerate(hotel_objects)
+        for day in range(14)
+    ])
+
+    # Статистика для планировщика (на SQLite — sqlite_stat1)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def context():
+    """Идентификаторы для подстановки в сценарии из текущих данных."""
+    hotel = Hotel.objects.filter(rooms__isnull=False).order_by('pk').first()
+    return {
+        'hotel': hotel.pk if hotel else None,
+        'city': hotel.city_id if hotel else None,
+        'user': User.objects.filter(booking__isnull=False).order_by('pk').first(),
+        'manager': User.objects.filter(
+            managed_hotels__isnull=False
+        ).order_by('pk').first(),
+        'admin': User.objects.filter(is_superuser=True).order_by('pk').first(),
+    }
+
+
+def plan_lines(sql, params):
+    """Нормализованный план одного запроса."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            depth = {0: -1}
+            lines = []
+            for node, parent, _, detail in cursor.fetchall():
+                depth[node] = depth.get(parent, -1) + 1
+                lines.append('  ' * depth[node] + detail)
+        else:
+            cursor.execute('EXPLAIN (COSTS OFF) ' + sql, params)
+            lines = [row[0] for row in cursor.fetchall()]
+    return [normalize(line) for line in lines]
+
+
+def normalize(text):
+    """Убирает то, что зависит от данных: литералы и длину списков IN."""
+    text = re.sub(r"'(?:[^']|'')*'(::[\w ]+)?", '?', text)
+    text = re.sub(r'(?<![\w.])-?\d+(\.\d+)?(?![\w.])', '?', text)
+    text = re.sub(r'\((?:%s|\?)(?:, (?:%s|\?))+\)', '(?, ...)', text)
+    return text.replace('%s', '?').rstrip()
+
+
+def capture(scenario, ids):
+    """[(SQL, план), ...] для всех SELECT сценария."""
+    client = APIClient()
+    if scenario.user is not None:
+        user = ids[scenario.user]
+        if user is None:
+            return None
+        client.force_authenticate(user)
+
+    path = scenario.path.format(**ids)
+    params = {
+        key: value.format(**ids) if isinstance(value, str) else value
+        for key, value in scenario.params.items()
+    }
+
+    catalog.reset()
+    log = QueryLog()
+    with override_settings(
+        ALLOWED_HOSTS=['testserver'], RATE_LIMIT_ENABLED=False
+    ), connection.execute_wrapper(log):
+        response = client.get(path, params)
+        if response.streaming:
+            # Поток дочитывается сразу: недочитанный курсор держит
+            # блокировку таблиц SQLite до сборки мусора
+            b''.join(response.streaming_content)
+    if response.status_code != 200:
+        raise RuntimeError(
+            f'{scenario.name}: GET {path} вернул {response.status_code}'
+        )
+
+    return [
+        (normalize(query['sql']), plan_lines(query['sql'], query['params']))
+        for query in log.queries
+        if not query['many']
+        and query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+    ]
+
+
+def render(queries):
+    lines = []
+    for i, (sql, plan) in enumerate(queries, 1):
+        lines.append(f'-- {i}: {sql}')
+        lines.extend(plan)
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def full_scans(queries, allowed=frozenset()):
+    """Большие таблицы, которые план читает целиком."""
+    if connection.vendor == 'sqlite':
+        pattern = re.compile(r'^\s*SCAN (\w+)(?! USING)')
+    else:
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    found = set()
+    for sql, plan in queries:
+        # В планах SQLite подзапросы названы псевдонимами Django (U0, V0)
+        aliases = dict(
+            (alias, table)
+            for table, alias in re.findall(r'"(\w+)" ([A-Z]\d+)\b', sql)
+        )
+        for line in plan:
+            match = pattern.search(line)
+            if not match:
+                continue
+            table = aliases.get(match.group(1), match.group(1))
+            if table in LARGE_TABLES - allowed:
+                found.add(table)
+    return sorted(found)
+
+
+def diff(expected, actual, name):
+    return ''.join(difflib.unified_diff(
+        expected.splitlines(keepends=True),
+        actual.splitlines(keepends=True),
+        fromfile=f'{name} (снимок)',
+        tofile=f'{name} (сейчас)',
+    ))
+
+
+def snapshot_dir():
+    return settings.PLAN_SNAPSHOT_DIR / connection.vendor
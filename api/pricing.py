@@ -0,0 +1,152 @@
+"""
+Цена проживания по правилам ``RateRule``.
+
+Цена ночи — базовая цена номера с суммой процентов ночных правил,
+действующих в эту ночь (сезон и день недели), округлённая до копеек.
+К сумме ночей применяются скидка за длительность (лучшая из подходящих)
+и персональная скидка рулетки. Котировка (GET /quote/) и создание брони
+считают цену одной функцией, поэтому показанная и списанная цены
+совпадают.
+
+Для многих номеров сразу правила читаются одним запросом, проценты
+по ночам считаются один раз на набор правил (номера без своих правил
+делят набор отеля), а ночи с одинаковым процентом сворачиваются
+в ставки: цена номера — сумма по нескольким ставкам, а не цикл
+по каждой ночи.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Discount, RateRule
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal(100)
+
+
+class Quote(NamedTuple):
+    room_id: int
+    nights: int
+    # [(цена ночи, число ночей), ...] по возрастанию цены
+    rates: list
+    subtotal: Decimal
+    stay_discount: Decimal  # процент скидки за длительность
+    discount: int  # процент персональной скидки
+    total: Decimal
+
+
+def matches(rule, day):
+    """Действует ли правило в эту дату (сезон и день недели)."""
+    return (
+        (rule.start_date is None or rule.start_date <= day)
+        and (rule.end_date is None or day < rule.end_date)
+        and (not rule.weekdays or str(day.weekday()) in rule.weekdays)
+    )
+
+
+def night_rates(rules, check_in, nights):
+    """{процент наценки: число ночей} по ночным правилам."""
+    nightly = [rule for rule in rules if rule.min_nights <= 1]
+    rates = Counter()
+    for offset in range(nights):
+        day = check_in + timedelta(days=offset)
+        percent = sum(
+            (rule.percent for rule in nightly if matches(rule, day)),
+            Decimal(0)
+        )
+        rates[max(percent, -HUNDRED)] += 1
+    return rates
+
+
+def stay_discount(rules, check_in, nights):
+    """Лучшая скидка за длительность (в процентах, >= 0)."""
+    return max(
+        (
+            -rule.percent for rule in rules
+            if 1 < rule.min_nights <= nights and matches(rule, check_in)
+        ),
+        default=Decimal(0)
+    )
+
+
+def apply_percent(amount, percent):
+    return (amount * (HUNDRED + percent) / HUNDRED).quantize(
+        CENT, ROUND_HALF_UP
+    )
+
+
+def load_rules(hotel_ids, check_in, check_out):
+    """Правила, пересекающиеся с проживанием: {(отель, номер или None): [...]}."""
+    rules = defaultdict(list)
+    queryset = RateRule.objects.filter(
+        Q(start_date__isnull=True) | Q(start_date__lt=check_out),
+        Q(end_date__isnull=True) | Q(end_date__gt=check_in),
+        hotel_id__in=hotel_ids,
+    ).order_by('pk')
+    for rule in queryset:
+        rules[rule.hotel_id, rule.room_id].append(rule)
+    return rules
+
+
+def quote_many(rooms, check_in, check_out, discount=0):
+    """Котировки номеров (нужны pk, hotel_id и price) в их порядке."""
+    nights = (check_out - check_in).days
+    rules = load_rules({room.hotel_id for room in rooms}, check_in, check_out)
+
+    computed = {}
+    quotes = []
+    for room in rooms:
+        applicable = rules[room.hotel_id, None] + rules[room.hotel_id, room.pk]
+        key = tuple(rule.pk for rule in applicable)
+        if key not in computed:
+            computed[key] = (
+                night_rates(applicable, check_in, nights),
+                stay_discount(applicable, check_in, nights),
+            )
+        percents, stay = computed[key]
+
+        rates = sorted(
+            (apply_percent(room.price, percent), count)
+            for percent, count in percents.items()
+        )
+        subtotal = sum((price * count for price, count in rates), Decimal(0))
+        total = apply_percent(subtotal, -stay)
+        if discount:
+            total = apply_percent(total, -Decimal(discount))
+        quotes.append(Quote(
+            room.pk, nights, rates, subtotal, stay, discount, total
+        ))
+    return quotes
+
+
+def active_discount(user):
+    """Неиспользованная скидка рулетки пользователя или None."""
+    if not user.is_authenticated:
+        return None
+    return Discount.objects.filter(
+        user=user,
+        used=False,
+        expires_at__gt=timezone.now()
+    ).first()
+
+
+def quote(room, check_in, check_out, discount=0):
+    return quote_many([room], check_in, check_out, discount)[0]
+
+
+def as_dict(quote):
+    return {
+        'room': quote.room_id,
+        'nights': quote.nights,
+        'rates': [
+            {'price': price, 'nights': count} for price, count in quote.rates
+        ],
+        'subtotal': quote.subtotal,
+        'stay_discount': quote.stay_discount,
+        'discount': quote.discount,
+        'total_price': quote.total,
+    }
@@ -0,0 +1,217 @@
+"""
+Профилирование отдельных запросов по требованию персонала.
+
+Включается настройкой ``PROFILING_ENABLED``; без неё middleware
+удаляется из цепочки при старте и ничего не стоит. Запрос сотрудника
+с заголовком ``X-Profile: 1`` выполняется под cProfile, все SQL-запросы
+записываются с временем и стеком вызова (только кадры из api/), для
+самых медленных SELECT снимается EXPLAIN. Отчёт сохраняется
+в ``RequestProfile``: ответ получает заголовки ``X-Profile-Id``
+(отчёт — GET /profiles/:id/) и ``Server-Timing``.
+"""
+import os
+import sys
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import RequestProfile
+
+HEADER = 'HTTP_X_PROFILE'
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def staff_user(request):
+    """
+    Сотрудник, сделавший запрос, или None. Middleware работает до DRF,
+    поэтому JWT проверяем теми же классами аутентификации, что и API.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        user = None
+        drf_request = Request(request)
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            try:
+                result = authenticator().authenticate(drf_request)
+            except APIException:
+                return None
+            if result is not None:
+                user = result[0]
+                break
+    if user is not None and user.is_authenticated and user.is_staff:
+        return user
+    return None
+
+
+def api_stack():
+    """Стек вызова без кадров Django и библиотек: 'api/views.py:10 in get'."""
+    return [
+        f'{os.path.relpath(frame.filename, os.path.dirname(API_DIR))}'
+        f':{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(API_DIR) and frame.filename != __file__
+    ]
+
+
+def short_path(filename):
+    """Путь относительно проекта или site-packages."""
+    prefixes = sorted({str(settings.BASE_DIR), *sys.path}, key=len, reverse=True)
+    for prefix in prefixes:
+        if prefix and filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+class QueryLog:
+    """execute_wrapper: каждый SQL с параметрами, временем и стеком."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': None if many else params,
+                'many': many,
+                'time_ms': (time.perf_counter() - start) * 1000,
+                'stack': api_stack(),
+            })
+
+
+def explain(query):
+    """План запроса (SQLite — EXPLAIN QUERY PLAN) или None."""
+    if query['many'] or not query['sql'].lstrip().upper().startswith(
+        ('SELECT', 'WITH')
+    ):
+        return None
+    connection = connections[query['alias']]
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + query['sql'], query['params'])
+            rows = cursor.fetchall()
+    except Exception as error:
+        return [f'EXPLAIN не выполнился: {error}']
+    return [str(row[-1]) for row in rows]
+
+
+def top_functions(profiler, limit):
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    stats.sort_stats('cumulative')
+    result = []
+    for func in stats.fcn_list[:limit]:
+        _, calls, own, cumulative, _ = stats.stats[func]
+        filename, line, name = func
+        result.append({
+            'function': f'{short_path(filename)}:{line}({name})',
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        })
+    return result
+
+
+def build_report(profiler, log):
+    queries = [
+        {
+            'sql': query['sql'],
+            'params': (
+                None if query['params'] is None
+                else [repr(value)[:200] for value in query['params']]
+            ),
+            'time_ms': round(query['time_ms'], 3),
+            'stack': query['stack'],
+        }
+        for query in log.queries
+    ]
+
+    slowest = sorted(
+        range(len(log.queries)),
+        key=lambda i: log.queries[i]['time_ms'],
+        reverse=True
+    )
+    plans = []
+    for index in slowest:
+        if len(plans) >= settings.PROFILING_EXPLAIN:
+            break
+        plan = explain(log.queries[index])
+        if plan is not None:
+            plans.append({'query': index, 'plan': plan})
+
+    return {
+        'functions': top_functions(profiler, settings.PROFILING_TOP),
+        'queries': queries,
+        'explain': plans,
+    }
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get(HEADER) != '1':
+            return self.get_response(request)
+        user = staff_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        # cProfile и pstats нужны только профилируемому запросу, а модуль
+        # импортируется при каждом старте (задачи, middleware)
+        import cProfile
+
+        log = QueryLog()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = (time.perf_counter() - start) * 1000
+
+        sql_ms = sum(query['time_ms'] for query in log.queries)
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status_code=response.status_code,
+            duration_ms=duration,
+            sql_ms=sql_ms,
+            query_count=len(log.queries),
+            report=build_report(profiler, log),
+        )
+        response['X-Profile-Id'] = str(profile.pk)
+        response['Server-Timing'] = (
+            f'total;dur={duration:.1f}, '
+            f'sql;dur={sql_ms:.1f};desc="{len(log.queries)} queries"'
+        )
+        return response
+
+
+def cleanup():
+    """Удаляет старые отчёты."""
+    deadline = timezone.now() - settings.PROFILING_RETENTION
+    RequestProfile.objects.filter(created_at__lt=deadline).delete()
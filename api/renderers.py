@@ -0,0 +1,100 @@
+import datetime
+import decimal
+import uuid
+
+from django.conf import settings
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - без orjson работает обычный JSONRenderer
+    orjson = None
+
+
+def default(obj):
+    """Типы, которые orjson не кодирует сам — так же, как JSONEncoder DRF."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except (TypeError, ValueError):
+            return list(obj)
+    if hasattr(obj, '__iter__'):
+        return tuple(obj)
+    raise TypeError(f'Type is not JSON serializable: {type(obj).__name__}')
+
+
+def _escape(content):
+    # Как и JSONRenderer, экранируем U+2028 и U+2029 (строгое подмножество JS)
+    return (
+        content
+        .replace('\u2028'.encode(), b'\\u2028')
+        .replace('\u2029'.encode(), b'\\u2029')
+    )
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson с тем же форматом вывода, что и JSONRenderer:
+    компактные разделители, UTF-8 без экранирования, ``Z`` для UTC.
+    Отступы (browsable API, ``; indent=4``) отдаются стандартному рендереру.
+    """
+    if orjson is not None:
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not self.is_fast(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+        return _escape(orjson.dumps(data, default=default, option=self.options))
+
+    def is_fast(self, accepted_media_type=None, renderer_context=None):
+        return (
+            orjson is not None
+            and not self.ensure_ascii
+            and self.compact
+            and self.get_indent(accepted_media_type, renderer_context or {}) is None
+        )
+
+    def render_chunks(self, items, chunk_size=None):
+        """
+        Кодирует большой массив по частям: в памяти одновременно находится
+        не больше ``chunk_size`` элементов, а не весь ответ целиком.
+        """
+        chunk_size = chunk_size or settings.JSON_STREAM_CHUNK_SIZE
+        chunk = []
+        separator = b'['
+
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield separator + self._dump_items(chunk)
+                separator = b','
+                chunk = []
+
+        if chunk:
+            yield separator + self._dump_items(chunk)
+            separator = b','
+
+        yield b'[]' if separator == b'[' else b']'
+
+    def _dump_items(self, items):
+        # Кодируем список и отрезаем скобки, чтобы не склеивать элементы в Python
+        return _escape(
+            orjson.dumps(items, default=default, option=self.options)
+        )[1:-1]
@@ -0,0 +1,163 @@
+"""
+Полнотекстовый поиск по названиям и описаниям отелей и их номеров.
+
+На PostgreSQL документ отеля хранится в колонке ``Hotel.search_vector``
+(tsvector с GIN-индексом), на SQLite — в отдельной FTS5-таблице, где
+rowid совпадает с id отеля. Документ пересобирается при сохранении
+отеля или номера (см. api/signals.py); для уже существующих данных —
+командой ``python manage.py rebuild_search_index``.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Hotel, Room
+
+FTS_TABLE = 'api_hotel_fts'
+GIN_INDEX = 'api_hotel_search_vector_gin'
+
+# Колонки документа и их вес: название важнее типа номера,
+# тип номера важнее описаний
+COLUMNS = (
+    ('name', 'A', 10.0),
+    ('room_types', 'B', 5.0),
+    ('description', 'C', 2.0),
+    ('room_descriptions', 'D', 1.0),
+)
+
+
+def setup(sender=None, using='default', **kwargs):
+    """Создаёт индекс/таблицу поиска (обработчик post_migrate)."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} '
+                f'ON {Hotel._meta.db_table} USING gin (search_vector)'
+            )
+        elif connection.vendor == 'sqlite':
+            columns = ', '.join(name for name, _, _ in COLUMNS)
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f'USING fts5({columns}, tokenize="unicode61 remove_diacritics 2")'
+            )
+
+
+def documents(hotel_ids):
+    """Тексты документов {id отеля: {колонка: текст}} двумя запросами."""
+    docs = {
+        pk: {
+            'name': name,
+            'room_types': [],
+            'description': description,
+            'room_descriptions': [],
+        }
+        for pk, name, description in Hotel.objects.filter(
+            pk__in=hotel_ids
+        ).values_list('pk', 'name', 'description')
+    }
+
+    rooms = Room.objects.filter(hotel_id__in=list(docs)).order_by('pk')
+    for hotel_id, room_type, description in rooms.values_list(
+        'hotel_id', 'room_type', 'description'
+    ):
+        docs[hotel_id]['room_types'].append(room_type)
+        docs[hotel_id]['room_descriptions'].append(description)
+
+    for doc in docs.values():
+        doc['room_types'] = '\n'.join(doc['room_types'])
+        doc['room_descriptions'] = '\n'.join(doc['room_descriptions'])
+    return docs
+
+
+def reindex(hotel_ids, using='default'):
+    """Пересобирает документы отелей; удалённые отели убираются из индекса."""
+    hotel_ids = set(hotel_ids)
+    docs = documents(hotel_ids)
+    connection = connections[using]
+
+    if connection.vendor == 'postgresql':
+        for pk, doc in docs.items():
+            Hotel.objects.filter(pk=pk).update(search_vector=_vector(doc))
+    elif connection.vendor == 'sqlite':
+        columns = [name for name, _, _ in COLUMNS]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in hotel_ids]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(columns)}) '
+                f'VALUES (%s{", %s" * len(columns)})',
+                [
+                    (pk, *(doc[name] for name in columns))
+                    for pk, doc in docs.items()
+                ]
+            )
+
+
+def _vector(doc):
+    vector = None
+    for name, weight, _ in COLUMNS:
+        part = SearchVector(
+            Value(doc[name], output_field=TextField()),
+            weight=weight,
+            config=settings.SEARCH_CONFIG
+        )
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search(queryset, query, using='default'):
+    """
+    Отели, подходящие под запрос, с аннотацией ``search_rank``
+    (чем больше, тем релевантнее).
+    """
+    vendor = connections[using].vendor
+
+    if vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, search_type='websearch', config=settings.SEARCH_CONFIG
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        )
+
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+
+    if vendor != 'sqlite':
+        # Запасной вариант без индекса: все слова должны встретиться
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term)
+                | Q(description__icontains=term)
+                | Q(rooms__room_type__icontains=term)
+                | Q(rooms__description__icontains=term)
+            )
+        return queryset.distinct().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    # Каждое слово в кавычках: спецсимволы FTS5 в запросе не работают
+    match = ' '.join('"%s"' % term for term in terms)
+    weights = ', '.join(str(weight) for _, _, weight in COLUMNS)
+    matched = RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)
+    )
+    # bm25() тем меньше, чем документ релевантнее
+    rank = RawSQL(
+        f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s '
+        f'AND rowid = "{Hotel._meta.db_table}"."id"',
+        (match,),
+        output_field=FloatField()
+    )
+    return queryset.filter(pk__in=matched).annotate(search_rank=rank)
@@ -1,28 +1,133 @@
 import base64
+import io
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from django.conf import settings
 from django.core.files.base import ContentFile
 from djoser.serializers import (
     UserCreateSerializer as BaseUserCreateSerializer,
     UserSerializer as BaseUserSerializer
 )
+from . import catalog
+from .jobs import enqueue
 from .models import User, Hotel, Room, Booking, Review, Discount, Country, City
 
 
+class SparseFieldsetMixin:
+    """
+    Разрежённые наборы полей для чтения: ``?fields=id,name`` оставляет только
+    перечисленные поля, ``?omit=description`` исключает указанные.
+
+    Действует только на корневой сериализатор (вложенные отдаются целиком)
+    и только для безопасных методов — при записи набор полей не меняется.
+    Пути ORM, которые читают методы и нестандартные поля, перечисляются
+    в ``Meta.sparse_sources``; по ним фильтр ``SparseFieldsetFilter``
+    сужает queryset через ``only()``/``select_related()``.
+    """
+    fields_param = 'fields'
+    omit_param = 'omit'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        params = self.get_fieldset_params()
+
+        if params is None or not self._is_root_serializer():
+            return fields
+
+        requested = _split_param(params.get(self.fields_param))
+        omitted = _split_param(params.get(self.omit_param))
+
+        if requested:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in requested
+            }
+        if omitted:
+            fields = {
+                name: field for name, field in fields.items()
+                if name not in omitted
+            }
+        return fields
+
+    def get_fieldset_params(self):
+        # Явно переданные параметры (для APIView без request в контексте)
+        params = self.context.get('fieldset_params')
+        if params is not None:
+            return params
+
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        return request.query_params
+
+    def _is_root_serializer(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_sparse_sources(self):
+        """
+        Пути ORM (через ``__``), которые нужны выбранным полям.
+        None — если это нельзя определить и queryset сужать нельзя.
+        """
+        declared = getattr(getattr(self, 'Meta', None), 'sparse_sources', {})
+        sources = []
+
+        for name, field in self.fields.items():
+            if name in declared:
+                sources.extend(declared[name])
+                continue
+
+            if (
+                isinstance(field, serializers.SerializerMethodField)
+                or field.source == '*'
+            ):
+                return None
+
+            source = field.source.replace('.', '__')
+
+            if isinstance(field, serializers.BaseSerializer):
+                nested = getattr(field, 'get_sparse_sources', lambda: None)()
+                if nested is None:
+                    return None
+                sources.extend(f'{source}__{path}' for path in nested)
+            elif isinstance(field, serializers.SlugRelatedField):
+                sources.append(f'{source}__{field.slug_field}')
+            else:
+                sources.append(source)
+
+        return sources
+
+
+def _split_param(value):
+    if not value:
+        return set()
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def field_requested(params, name):
+    """Нужно ли дополнительное поле ответа с учётом ?fields= / ?omit=."""
+    requested = _split_param(params.get(SparseFieldsetMixin.fields_param))
+    omitted = _split_param(params.get(SparseFieldsetMixin.omit_param))
+    return (not requested or name in requested) and name not in omitted
+
+
 # Для регистрации нового пользователя
-class UserCreateSerializer(BaseUserCreateSerializer):
+class UserCreateSerializer(SparseFieldsetMixin, BaseUserCreateSerializer):
     class Meta(BaseUserCreateSerializer.Meta):
         model = User
         fields = ('id', 'email', 'username', 'password')
 
 
 # Для получения данных о пользователе
-class UserSerializer(BaseUserSerializer):
+class UserSerializer(SparseFieldsetMixin, BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         model = User
         fields = ('id', 'email', 'username', 'is_blocked')
 
 
-class UserAdminSerializer(BaseUserSerializer):
+class UserAdminSerializer(SparseFieldsetMixin, BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         model = User
         fields = (
@@ -38,7 +143,7 @@ class UserAdminSerializer(BaseUserSerializer):
 
 
 # Сериализатор для страны
-class CountrySerializer(serializers.ModelSerializer):
+class CountrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Country
         fields = ('name',)
@@ -46,35 +151,152 @@ class CountrySerializer(serializers.ModelSerializer):
 
 
 # Сериализатор для города
-class CitySerializer(serializers.ModelSerializer):
+class CitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     country = CountrySerializer()
+    hotels_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = City
-        fields = ('id', 'name', 'country')
+        fields = ('id', 'name', 'country', 'hotels_count')
         read_only_fields = ('id',)
 
 
+class PendingImage:
+    """Base64-картинка, прошедшая быструю проверку; декодирует задача."""
+
+    def __init__(self, data):
+        self.data = data
+
+
+# Столько символов base64 (кратно 4) декодируется в запросе, чтобы
+# по заголовку файла определить формат картинки
+IMAGE_HEAD_CHARS = 4096
+
+
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Картинка больше {max_size} байт.',
+    }
+
+    def __init__(self, *args, placeholder=None, **kwargs):
+        # С заглушкой декодирование и запись файла уходят в фоновую задачу
+        self.placeholder = placeholder
+        super().__init__(*args, **kwargs)
+
     def to_internal_value(self, data):
         # Если полученный объект строка, и эта строка
         # начинается с 'data:image'...
         if isinstance(data, str) and data.startswith('data:image'):
+            if ';base64,' not in data:
+                self.fail('invalid_image')
             # ...начинаем декодировать изображение из base64.
             # Сначала нужно разделить строку на части.
-            format, imgstr = data.split(';base64,')  
+            format, imgstr = data.split(';base64,')
+            # Размер известен по длине строки, без декодирования
+            size = len(imgstr) * 3 // 4 - imgstr[-2:].count('=')
+            if size > settings.IMAGE_MAX_SIZE:
+                self.fail('too_large', max_size=settings.IMAGE_MAX_SIZE)
+
+            if self.placeholder:
+                # В запросе — только заголовок файла: битая или не картинка
+                # даёт 400. Полное декодирование, проверку и запись
+                # делает задача store_image. Pillow импортируется здесь,
+                # а не при старте: картинки приходят в редких запросах
+                from PIL import Image
+
+                try:
+                    head = base64.b64decode(
+                        imgstr[:IMAGE_HEAD_CHARS], validate=True
+                    )
+                    Image.open(io.BytesIO(head))
+                except (ValueError, OSError):
+                    self.fail('invalid_image')
+                return PendingImage(data)
+
             # И извлечь расширение файла.
             ext = format.split('/')[-1]
             # Затем декодировать сами данные и поместить результат в файл,
             # которому дать название по шаблону.
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            try:
+                decoded = base64.b64decode(imgstr, validate=True)
+            except ValueError:
+                self.fail('invalid_image')
+            data = ContentFile(decoded, name='temp.' + ext)
 
         return super().to_internal_value(data)
 
 
+class DeferredImageMixin:
+    """
+    Сохраняет модель с заглушкой вместо base64-картинки и ставит в очередь
+    задачу store_image, которая декодирует, проверит и запишет файл.
+    Задача ставится только при сохранении, поэтому ошибка в другом поле
+    не оставляет ни задачи, ни файлов.
+    """
+
+    def create(self, validated_data):
+        pending = self._take_pending_images(validated_data)
+        instance = super().create(validated_data)
+        self._schedule_images(instance, pending)
+        return instance
+
+    def update(self, instance, validated_data):
+        pending = self._take_pending_images(validated_data)
+        instance = super().update(instance, validated_data)
+        self._schedule_images(instance, pending)
+        return instance
+
+    def _take_pending_images(self, validated_data):
+        pending = {}
+        for field in self.fields.values():
+            value = validated_data.get(field.source)
+            if isinstance(value, PendingImage):
+                pending[field.source] = value.data
+                validated_data[field.source] = field.placeholder
+        return pending
+
+    def _schedule_images(self, instance, pending):
+        label = instance._meta.label
+        for field, data in pending.items():
+            enqueue(
+                'store_image',
+                {'model': label, 'pk': instance.pk, 'field': field, 'data': data},
+                dedup_key=f'image:{label}:{instance.pk}:{field}',
+                replace=True
+            )
+
+
+class CatalogSlugRelatedField(serializers.SlugRelatedField):
+    """
+    Связь по названию через справочник в памяти (api/catalog.py):
+    ``lookup`` — метод Catalog. Снимок процесса может отставать
+    на ``CATALOG_MAX_AGE``, поэтому найденный id подтверждается
+    по первичному ключу в ``queryset`` (объект могли переименовать,
+    удалить или начать удалять). Если в снимке названия нет или id
+    не подтвердился, ищем в БД как обычно.
+    """
+
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            instance = getattr(catalog.get(), self.lookup)(str(data))
+        except catalog.Ambiguous:
+            self.fail('invalid')
+        if instance is None or not self.get_queryset().filter(
+            pk=instance.pk, **{self.slug_field: data}
+        ).exists():
+            return super().to_internal_value(data)
+        return instance
+
+
 # Сериализатор для отеля
-class HotelSerializer(serializers.ModelSerializer):
-    city = serializers.SlugRelatedField(
+class HotelSerializer(
+        DeferredImageMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    city = CatalogSlugRelatedField(
+        lookup='city',
         queryset=City.objects.all(),
         slug_field='name',  # Связь по названию города
         help_text="Название города (например, 'Санкт-Петербург')",
@@ -83,16 +305,28 @@ class HotelSerializer(serializers.ModelSerializer):
             'Проверьте название или создайте город.'
         }
     )
-    image = Base64ImageField()  # required=False, allow_null=True)
+    image = Base64ImageField(
+        placeholder='placeholders/hotel_ph.jpg'
+    )  # required=False, allow_null=True)
 
     class Meta:
         model = Hotel
-        fields = ('id', 'name', 'city', 'address', 'description', 'image', 'rating')
+        fields = ('id', 'name', 'city', 'address', 'latitude', 'longitude',
+                  'description', 'image', 'rating')
         read_only_fields = ('id', 'rating')  # Эти поля нельзя изменять напрямую
+        sparse_sources = {'city': ('city__name', 'city__country__name')}
+        # Быстрый путь списков (api.fastpath): значения по путям sparse_sources
+        fast_readers = {
+            'city': lambda name, country: {'name': name, 'country': country},
+        }
+        # fast_readers повторяют to_representation ниже
+        fast_representation = True
 
     def to_representation(self, instance):
         """При GET-запросе отображаем город как объект с деталями"""
         data = super().to_representation(instance)
+        if 'city' not in self.fields:
+            return data
         data['city'] = {
             # 'id': instance.city.id,
             'name': instance.city.name,
@@ -102,9 +336,11 @@ class HotelSerializer(serializers.ModelSerializer):
 
 
 # Сериализатор для номера отеля
-class RoomSerializer(serializers.ModelSerializer):
-    hotel = serializers.SlugRelatedField(
-        queryset=Hotel.objects.all(),
+class RoomSerializer(
+        DeferredImageMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    hotel = CatalogSlugRelatedField(
+        lookup='hotel',
+        queryset=Hotel.objects.filter(is_deleting=False),
         slug_field='name',  # Связь по названию города
         help_text="Название Отеля",
         error_messages={
@@ -112,7 +348,7 @@ class RoomSerializer(serializers.ModelSerializer):
             'Проверьте название или создайте отель.'
         }
     )
-    image = Base64ImageField()
+    image = Base64ImageField(placeholder='placeholders/room_ph.jpg')
 
     class Meta:
         model = Room
@@ -121,7 +357,7 @@ class RoomSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)  # Эти поля нельзя изменять напрямую
 
 
-class RoomShortSerializer(serializers.ModelSerializer):
+class RoomShortSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     hotel = serializers.PrimaryKeyRelatedField(read_only=True)
     image = serializers.ImageField(read_only=True)  # добавляем поле image
     room_type = serializers.CharField(read_only=True)
@@ -132,7 +368,7 @@ class RoomShortSerializer(serializers.ModelSerializer):
 
 
 # для чтения
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.all())
     room = RoomShortSerializer(read_only=True)
 
@@ -161,6 +397,14 @@ class BookingSerializer(serializers.ModelSerializer):
             'has_review',
         ]
         read_only_fields = ['created_at']
+        sparse_sources = {
+            'email': ('user__email',),
+            'has_review': ('review__id',),
+        }
+        fast_readers = {
+            'email': lambda email: email,
+            'has_review': lambda review_id: review_id is not None,
+        }
 
     # Поле email не хранится в модели, берется из связанного пользователя
     def get_email(self, obj):
@@ -174,8 +418,10 @@ class BookingSerializer(serializers.ModelSerializer):
 
 
 # для создания бронирования
-class BookingCreateSerializer(serializers.ModelSerializer):
-    room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.all())
+class BookingCreateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    room = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.filter(is_deleting=False, hotel__is_deleting=False)
+    )
 
     discount_applied = serializers.BooleanField(read_only=True)
 
@@ -208,6 +454,10 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             'created_at',
         ]
         read_only_fields = ['created_at']
+        sparse_sources = {
+            'email': ('user__email',),
+            'total_price': ('total_price',),
+        }
 
     def validate(self, data):
         request = self.context.get('request')
@@ -244,11 +494,13 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.SerializerMethodField(read_only=True)
     hotel = serializers.SerializerMethodField(read_only=True)
 
-    booking = serializers.PrimaryKeyRelatedField(queryset=Booking.objects.all())
+    booking = serializers.PrimaryKeyRelatedField(
+        queryset=Booking.objects.select_related('user', 'room')
+    )
 
     class Meta:
         model = Review
@@ -263,6 +515,14 @@ class ReviewSerializer(serializers.ModelSerializer):
             'updated_at'
         ]
         read_only_fields = ['user', 'hotel', 'created_at', 'updated_at']
+        sparse_sources = {
+            'user': ('booking__user__username',),
+            'hotel': ('booking__room__hotel__name',),
+        }
+        fast_readers = {
+            'user': lambda username: username,
+            'hotel': lambda name: name,
+        }
 
     def get_user(self, obj):
         return obj.booking.user.username
@@ -298,9 +558,93 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 
 # Сериализатор для скидки
-class DiscountSerializer(serializers.ModelSerializer):
+class DiscountSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
 
     class Meta:
         model = Discount
         fields = ('id', 'user', 'amount', 'expires_at', 'used')
+
+
+# Один запрос пакетной проверки доступности (POST /availability/)
+class AvailabilityQuerySerializer(serializers.Serializer):
+    hotel = serializers.IntegerField(min_value=1)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError(
+                "Дата заезда должна быть раньше даты выезда."
+            )
+        return data
+
+
+class QuoteQuerySerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    hotel = serializers.IntegerField(min_value=1, required=False)
+    room = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=100
+    )
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError(
+                "Дата заезда должна быть раньше даты выезда."
+            )
+        if (data['check_out'] - data['check_in']).days > (
+            settings.PRICING_MAX_NIGHTS
+        ):
+            raise serializers.ValidationError(
+                f"Не больше {settings.PRICING_MAX_NIGHTS} ночей."
+            )
+        if not data.get('hotel') and not data.get('room'):
+            raise serializers.ValidationError("Укажите hotel или room.")
+        return data
+
+
+
+class RoomSearchQuerySerializer(serializers.Serializer):
+    SORTS = ('price', '-price', 'capacity', '-capacity')
+
+    city_id = serializers.IntegerField(min_value=1)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1)
+    min_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    max_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    max_capacity = serializers.IntegerField(min_value=1, required=False)
+    sort = serializers.ChoiceField(choices=SORTS, default='price')
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError(
+                "Дата заезда должна быть раньше даты выезда."
+            )
+        if (data['check_out'] - data['check_in']).days > (
+            settings.PRICING_MAX_NIGHTS
+        ):
+            raise serializers.ValidationError(
+                f"Не больше {settings.PRICING_MAX_NIGHTS} ночей."
+            )
+        if data.get('max_capacity') and data['max_capacity'] < data['guests']:
+            raise serializers.ValidationError(
+                "max_capacity не может быть меньше guests."
+            )
+        if (
+            data.get('min_price') is not None
+            and data.get('max_price') is not None
+            and data['min_price'] > data['max_price']
+        ):
+            raise serializers.ValidationError(
+                "min_price не может быть больше max_price."
+            )
+        return data
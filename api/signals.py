@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from . import catalog, counters, events, search, stats, throttling
+from .jobs import enqueue
+from .models import Booking, City, Country, Hotel, Review, Room
+
+
+# Отзыв может удаляться и напрямую, и каскадом (вместе с бронированием),
+# поэтому пересчёт рейтинга запускаем по сигналам. Задачи одного отеля
+# схлопываются по dedup_key: 50 отзывов — один пересчёт.
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    hotel_id = instance.booking.room.hotel_id
+    enqueue(
+        'recompute_hotel_rating',
+        {'hotel_id': hotel_id},
+        dedup_key=f'hotel-rating:{hotel_id}'
+    )
+
+
+# Поисковый документ отеля включает тексты его номеров
+@receiver(post_save, sender=Hotel)
+def hotel_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'name', 'description'} & set(
+        update_fields
+    ):
+        return
+    search.reindex([instance.pk], using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Hotel)
+def hotel_deleted(sender, instance, **kwargs):
+    search.reindex([instance.pk], using=kwargs['using'])
+
+
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, **kwargs):
+    search.reindex([instance.hotel_id], using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted(sender, instance, origin=None, **kwargs):
+    # Номера, удалённые каскадом вместе с отелем, не переиндексируем:
+    # документ отеля уберёт hotel_deleted
+    if getattr(origin, 'model', type(origin)) is not Room:
+        return
+    search.reindex([instance.hotel_id], using=kwargs['using'])
+
+
+# Справочник городов (api/catalog.py) включает отели: названия и счётчики
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def catalog_changed(sender, update_fields=None, **kwargs):
+    if update_fields is not None and not {'name', 'city', 'country'} & set(
+        update_fields
+    ):
+        return
+    catalog.invalidate()
+
+
+# Дневная сводка отеля (api/stats.py) обновляется по дельте между
+# сохранённой и новой бронью; по той же дельте подписчикам уходят
+# события доступности (api/events.py). Сохранённое состояние берётся
+# из снимка, сделанного при загрузке брони, без лишнего SELECT.
+BOOKING_FIELDS = {'room', 'start_date', 'end_date', 'total_price', 'status'}
+
+
+@receiver(post_init, sender=Booking)
+def booking_loaded(sender, instance, **kwargs):
+    instance._loaded_row = stats.loaded_row(instance)
+
+
+@receiver(pre_save, sender=Booking)
+def booking_saving(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not BOOKING_FIELDS & set(update_fields):
+        instance._previous_row = False
+        return
+    if instance._state.adding:
+        instance._previous_row = None
+    else:
+        # Без снимка (поля отложены) — состояние из БД
+        instance._previous_row = (
+            instance.__dict__.get('_loaded_row')
+            or stats.stored_row(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_previous_row', False)
+    if previous is False:
+        return
+    current = stats.booking_row(instance)
+    previous = stats.with_hotel(previous, current)
+    instance._loaded_row = current
+    stats.update(previous, current)
+    events.booking_changed(previous, current)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    row = stats.booking_row(instance)
+    stats.update(row, None)
+    events.booking_changed(row, None)
+
+
+# Без фонового потока (бессерверная функция) счётчики популярности
+# сбрасываются в конце запроса, когда их накопилось достаточно.
+# Счётчики лимита запросов сбрасываются так всегда.
+@receiver(request_finished)
+def request_done(sender, **kwargs):
+    if settings.POPULARITY_FLUSH_ON_REQUEST:
+        counters.buffer.flush_if_due()
+    throttling.stats.flush_if_due()
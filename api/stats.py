@@ -0,0 +1,315 @@
+"""
+Аналитика отелей: загрузка (occupancy), средняя цена за ночь (ADR)
+и выручка по дням и месяцам.
+
+Метрики читаются из дневной сводки ``HotelDailyStats``, а не из броней.
+Каждая бронь вносит в сводку +1 проданный номер и свою долю цены за
+каждую ночь проживания; при создании, изменении и удалении брони вклад
+пересчитывается по дельте (см. api/signals.py). Перенос в архив сводку
+не меняет. Сводку по всей истории (брони и архив) пересобирает команда
+``python manage.py rebuild_hotel_stats``.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import ROUND_DOWN, Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Booking, BookingArchive, HotelDailyStats, Room
+
+# Отменённые брони номер не занимают и выручки не дают
+COUNTED_STATUSES = ('pending', 'confirmed')
+CENT = Decimal('0.01')
+
+
+def split(total, nights):
+    """Цена брони по ночам: (первая ночь, остальные); сумма равна total."""
+    rest = (total / nights).quantize(CENT, rounding=ROUND_DOWN)
+    return total - rest * (nights - 1), rest
+
+
+class BookingRow(NamedTuple):
+    """Поля брони, от которых зависят сводка и события доступности."""
+    room_id: int
+    hotel_id: int
+    start_date: date
+    end_date: date
+    total_price: Decimal
+    status: str
+
+
+def booking_row(booking):
+    if Booking.room.is_cached(booking):
+        hotel_id = booking.room.hotel_id
+    else:
+        hotel_id = Room.objects.values_list('hotel_id', flat=True).get(
+            pk=booking.room_id
+        )
+    return BookingRow(
+        booking.room_id,
+        hotel_id,
+        booking.start_date,
+        booking.end_date,
+        booking.total_price,
+        booking.status,
+    )
+
+
+LOADED_FIELDS = ('room_id', 'start_date', 'end_date', 'total_price', 'status')
+
+
+def loaded_row(booking):
+    """
+    Снимок полей брони из экземпляра (после загрузки или сохранения)
+    без hotel_id, или None, если часть полей отложена (only/defer).
+    """
+    values = booking.__dict__
+    if not all(name in values for name in LOADED_FIELDS):
+        return None
+    return BookingRow(
+        values['room_id'],
+        None,
+        values['start_date'],
+        values['end_date'],
+        values['total_price'],
+        values['status'],
+    )
+
+
+def with_hotel(row, current):
+    """Дополняет снимок hotel_id: берётся из current, если номер тот же."""
+    if row is None or row.hotel_id is not None:
+        return row
+    if row.room_id == current.room_id:
+        hotel_id = current.hotel_id
+    else:
+        hotel_id = Room.objects.values_list('hotel_id', flat=True).get(
+            pk=row.room_id
+        )
+    return row._replace(hotel_id=hotel_id)
+
+
+def stored_row(booking_id):
+    """Бронь в том виде, в каком она сейчас сохранена в БД, или None."""
+    row = Booking.objects.filter(pk=booking_id).values_list(
+        'room_id', 'room__hotel_id', 'start_date', 'end_date',
+        'total_price', 'status'
+    ).first()
+    return BookingRow(*row) if row is not None else None
+
+
+def contribution(row):
+    """Вклад брони в сводку: (id отеля, заезд, выезд, цена) или None."""
+    # Отменённые брони и брони без ночей в сводку не входят
+    if row is None or row.status not in COUNTED_STATUSES:
+        return None
+    if row.end_date <= row.start_date:
+        return None
+    return (
+        row.hotel_id,
+        row.start_date,
+        row.end_date,
+        Decimal(row.total_price).quantize(CENT),
+    )
+
+
+def update(previous, current):
+    """Переносит вклад брони из старого состояния в новое (None — нет брони)."""
+    previous, current = contribution(previous), contribution(current)
+    if previous == current:
+        return
+    with transaction.atomic():
+        apply(previous, -1)
+        apply(current, 1)
+
+
+def apply(item, sign):
+    """Добавляет (sign=1) или вычитает (sign=-1) вклад брони — 2–3 запроса."""
+    if item is None:
+        return
+    hotel_id, start, end, total = item
+    nights = (end - start).days
+    first, rest = split(total, nights)
+    rows = HotelDailyStats.objects.filter(
+        hotel_id=hotel_id, date__gte=start, date__lt=end
+    )
+
+    with transaction.atomic():
+        # Строки создаются только при добавлении: вычитать можно лишь
+        # из уже учтённых дней (а отель может удаляться вместе с бронью)
+        if sign > 0:
+            HotelDailyStats.objects.bulk_create(
+                [
+                    HotelDailyStats(hotel_id=hotel_id, date=start + timedelta(i))
+                    for i in range(nights)
+                ],
+                ignore_conflicts=True
+            )
+        rows.update(
+            rooms_sold=F('rooms_sold') + sign,
+            revenue=F('revenue') + sign * rest
+        )
+        if first != rest:
+            rows.filter(date=start).update(
+                revenue=F('revenue') + sign * (first - rest)
+            )
+
+
+def rebuild(hotel_ids=None, batch_size=1000):
+    """
+    Пересобирает сводку по броням и архиву. Брони сгруппированы
+    по (отель, даты, цена), так что запросов два, а строк — по числу
+    разных групп, а не броней.
+    """
+    days = defaultdict(lambda: [0, Decimal(0)])
+
+    for model in (Booking, BookingArchive):
+        bookings = model.objects.filter(
+            status__in=COUNTED_STATUSES, end_date__gt=F('start_date')
+        )
+        if hotel_ids is not None:
+            bookings = bookings.filter(room__hotel_id__in=hotel_ids)
+        groups = bookings.values_list(
+            'room__hotel_id', 'start_date', 'end_date', 'total_price'
+        ).annotate(count=Count('pk')).order_by()
+
+        for hotel_id, start, end, total, count in groups:
+            nights = (end - start).days
+            first, rest = split(total.quantize(CENT), nights)
+            for i in range(nights):
+                day = days[hotel_id, start + timedelta(i)]
+                day[0] += count
+                day[1] += (first if i == 0 else rest) * count
+
+    stale = HotelDailyStats.objects.all()
+    if hotel_ids is not None:
+        stale = stale.filter(hotel_id__in=hotel_ids)
+
+    with transaction.atomic():
+        stale.delete()
+        HotelDailyStats.objects.bulk_create(
+            [
+                HotelDailyStats(
+                    hotel_id=hotel_id, date=date, rooms_sold=sold, revenue=revenue
+                )
+                for (hotel_id, date), (sold, revenue) in sorted(days.items())
+            ],
+            batch_size=batch_size
+        )
+    return len(days)
+
+
+def parse_range(params):
+    """Диапазон дат из ?start=&end= (включительно), по умолчанию 30 дней."""
+    end = params.get('end')
+    end = (
+        datetime.strptime(end, '%Y-%m-%d').date() if end
+        else timezone.localdate()
+    )
+    start = params.get('start')
+    start = (
+        datetime.strptime(start, '%Y-%m-%d').date() if start
+        else end - timedelta(days=29)
+    )
+    if start > end:
+        raise ValueError('start после end')
+    if (end - start).days >= settings.ANALYTICS_MAX_DAYS:
+        raise ValueError('Слишком длинный период')
+    return start, end
+
+
+def metrics(rooms_sold, revenue, room_nights):
+    """Метрики периода; room_nights — сколько номеро-ночей было в продаже."""
+    return {
+        'rooms_sold': rooms_sold,
+        'revenue': str(revenue.quantize(CENT)),
+        'occupancy': (
+            round(rooms_sold / room_nights, 4) if room_nights else None
+        ),
+        'adr': (
+            str((revenue / rooms_sold).quantize(CENT)) if rooms_sold else None
+        ),
+    }
+
+
+def daily(hotel_id, start, end):
+    """Метрики отеля по дням, дни без броней — с нулями."""
+    rooms = Room.objects.filter(hotel_id=hotel_id, is_deleting=False).count()
+    stored = {
+        date: (sold, revenue)
+        for date, sold, revenue in HotelDailyStats.objects.filter(
+            hotel_id=hotel_id, date__range=(start, end)
+        ).values_list('date', 'rooms_sold', 'revenue')
+    }
+
+    result = []
+    for i in range((end - start).days + 1):
+        date = start + timedelta(i)
+        sold, revenue = stored.get(date, (0, Decimal(0)))
+        result.append({'date': date, **metrics(sold, revenue, rooms)})
+    return result
+
+
+def monthly(hotel_id, start, end):
+    """Метрики отеля по месяцам (агрегация сводки в БД)."""
+    rooms = Room.objects.filter(hotel_id=hotel_id, is_deleting=False).count()
+    stored = {
+        month: (sold, revenue)
+        for month, sold, revenue in HotelDailyStats.objects.filter(
+            hotel_id=hotel_id, date__range=(start, end)
+        ).annotate(month=TruncMonth('date')).values_list('month').annotate(
+            sold=Sum('rooms_sold'), total=Sum('revenue')
+        ).order_by()
+    }
+
+    result = []
+    month = start.replace(day=1)
+    while month <= end:
+        last = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+        # Крайние месяцы учитываются только в пределах диапазона
+        days = (min(last, end) - max(month, start)).days + 1
+        sold, revenue = stored.get(month, (0, Decimal(0)))
+        result.append({
+            'month': month.strftime('%Y-%m'),
+            **metrics(sold, revenue, rooms * days),
+        })
+        month = last + timedelta(days=1)
+    return result
+
+
+def totals(hotels, start, end):
+    """Метрики за период по каждому отелю: [(отель, метрики), ...]."""
+    hotel_ids = [hotel.pk for hotel in hotels]
+    # Удаляемые номера в продаже уже не участвуют
+    rooms = dict(
+        Room.objects.filter(
+            hotel_id__in=hotel_ids, is_deleting=False
+        ).values_list('hotel_id')
+        .annotate(count=Count('pk')).order_by()
+    )
+    stored = {
+        hotel_id: (sold, revenue)
+        for hotel_id, sold, revenue in HotelDailyStats.objects.filter(
+            hotel_id__in=hotel_ids, date__range=(start, end)
+        ).values_list('hotel_id').annotate(
+            sold=Sum('rooms_sold'), total=Sum('revenue')
+        ).order_by()
+    }
+
+    days = (end - start).days + 1
+    return [
+        (
+            hotel,
+            metrics(
+                *stored.get(hotel.pk, (0, Decimal(0))),
+                rooms.get(hotel.pk, 0) * days
+            ),
+        )
+        for hotel in hotels
+    ]
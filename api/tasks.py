@@ -0,0 +1,112 @@
+import base64
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import counters, deletion, idempotency, profiling, throttling
+from .jobs import enqueue, task
+from .models import HotelRating, Discount, Job, BookingArchive
+
+
+@task('recompute_hotel_rating')
+def recompute_hotel_rating(hotel_id):
+    """Пересчёт рейтинга и гистограммы отеля по его отзывам."""
+    HotelRating.rebuild(hotel_id)
+
+
+# Повтор не поможет: битая картинка останется битой
+@task('store_image', max_attempts=1)
+def store_image(model, pk, field, data):
+    """
+    Декодирует base64-картинку, проверяет её и сохраняет в поле модели
+    (в запросе проверен только заголовок файла, см. Base64ImageField).
+    """
+    Model = apps.get_model(model)
+    instance = Model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+
+    format, imgstr = data.split(';base64,')
+    ext = format.split('/')[-1]
+    content = ContentFile(
+        base64.b64decode(imgstr, validate=True), name='temp.' + ext
+    )
+    # Полная проверка, как у ImageField сериализатора
+    serializers.ImageField().to_internal_value(content)
+
+    file = getattr(instance, field)
+    file.save(content.name, content, save=False)
+    Model.objects.filter(pk=pk).update(**{field: file.name})
+
+
+@task('expire_discounts', every=timedelta(hours=1))
+def expire_discounts():
+    """Удаляет давно истёкшие скидки рулетки."""
+    deadline = timezone.now() - timedelta(days=settings.DISCOUNT_RETENTION_DAYS)
+    Discount.objects.filter(expires_at__lt=deadline).delete()
+
+
+@task('archive_bookings', every=timedelta(days=1))
+def archive_bookings():
+    """Переносит прошедшие брони в архив."""
+    before = timezone.localdate() - timedelta(
+        days=settings.BOOKING_ARCHIVE_AFTER_DAYS
+    )
+    BookingArchive.archive(before)
+
+
+@task('cleanup_jobs', every=timedelta(hours=6))
+def cleanup_jobs():
+    """Удаляет старые завершённые задачи из очереди."""
+    deadline = timezone.now() - timedelta(days=settings.JOBS_RETENTION_DAYS)
+    Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED],
+        updated_at__lt=deadline
+    ).delete()
+
+
+@task('cleanup_rate_limits', every=timedelta(hours=1))
+def cleanup_rate_limits():
+    """Удаляет корзины токенов давно не появлявшихся клиентов."""
+    throttling.cleanup(settings.RATE_LIMIT_RETENTION)
+
+
+@task('cleanup_idempotency_keys', every=timedelta(hours=1))
+def cleanup_idempotency_keys():
+    """Удаляет истёкшие ключи идемпотентности и сохранённые ответы."""
+    idempotency.cleanup()
+
+
+@task('cleanup_profiles', every=timedelta(hours=6))
+def cleanup_profiles():
+    """Удаляет старые отчёты профилирования запросов."""
+    profiling.cleanup()
+
+
+@task('cleanup_hotel_counters', every=timedelta(days=1))
+def cleanup_hotel_counters():
+    """Удаляет старые дневные корзины счётчиков популярности."""
+    counters.cleanup()
+
+
+# Удаление не выполняется в запросе даже при JOBS_EAGER: каскад большого
+# отеля не уложился бы в таймаут функции. Его выполняет worker
+@task('run_deletion', eager=False)
+def run_deletion(deletion_id):
+    """Очередная часть фонового удаления (api/deletion.py)."""
+    if not deletion.run(deletion_id):
+        enqueue(
+            'run_deletion',
+            {'deletion_id': deletion_id},
+            dedup_key=f'deletion:{deletion_id}'
+        )
+
+
+@task('resume_deletions', every=timedelta(minutes=15))
+def resume_deletions():
+    """Возобновляет прерванные фоновые удаления."""
+    deletion.resume_stale()
@@ -0,0 +1,208 @@
+"""
+Ограничение частоты запросов корзиной токенов.
+
+У каждого клиента (пользователя или IP для анонимов) одна корзина
+ёмкостью ``capacity`` токенов, пополняемая со скоростью ``refill_rate``
+токенов в секунду. Запрос к эндпоинту списывает его стоимость из
+``RATE_LIMIT_COSTS``; если токенов не хватает, клиент получает 429
+с ``Retry-After``.
+
+Ограничение защищает БД, поэтому само в неё на каждый запрос не ходит:
+корзины лежат в кеше Django (Redis при ``REDIS_URL`` — общий для всех
+воркеров, как и справочник). Запись истекает, когда корзина успела бы
+наполниться, так что отсутствие записи и есть полная корзина. Чтение
+и запись корзины не атомарны: параллельные запросы одного клиента
+изредка проходят сверх лимита, для защиты от перебора это допустимо.
+
+Счётчики пропущенных и отклонённых запросов (``RateLimitBucket``,
+их показывает ``/ratelimits/``) копятся в памяти процесса (``stats``)
+и сбрасываются в БД в конце запроса, когда накопилось
+``RATE_LIMIT_STATS_FLUSH_MAX_PENDING`` клиентов или самой старой записи
+больше ``RATE_LIMIT_STATS_FLUSH_MAX_AGE`` секунд.
+
+IP анонима берётся из ``X-Forwarded-For`` только за доверенными прокси
+(``NUM_PROXIES`` в ``REST_FRAMEWORK``), иначе клиент подставлял бы
+в заголовок новый адрес и получал новую корзину на каждый запрос.
+"""
+import atexit
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from rest_framework.throttling import BaseThrottle
+
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'ratelimit:%s'
+BATCH_SIZE = 500
+
+
+class StatsBuffer:
+    """Счётчики запросов по клиентам, ещё не записанные в БД."""
+
+    def __init__(self):
+        # {ключ: [вид, пропущено, отклонено, время последнего запроса]}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._registered = False
+        self._oldest = 0.0
+
+    def add(self, key, kind, allowed, now):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            row = self._pending.setdefault(key, [kind, 0, 0, now])
+            row[1 if allowed else 2] += 1
+            row[3] = max(row[3], now)
+            if not self._registered:
+                self._registered = True
+                atexit.register(self.flush)
+
+    def take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def flush_if_due(self):
+        """Сбрасывает накопленное, если его много или оно лежит давно."""
+        limit = settings.RATE_LIMIT_STATS_FLUSH_MAX_PENDING
+        with self._lock:
+            due = bool(self._pending) and (
+                len(self._pending) >= limit
+                or time.monotonic() - self._oldest
+                >= settings.RATE_LIMIT_STATS_FLUSH_MAX_AGE
+            )
+        return self.flush() if due else 0
+
+    def flush(self):
+        """Записывает накопленное в БД; возвращает число клиентов."""
+        rows = self.take()
+        if not rows:
+            return 0
+        try:
+            return write(rows)
+        except Exception:
+            logger.exception('Не удалось записать счётчики лимита запросов')
+            return 0
+
+
+stats = StatsBuffer()
+
+
+def write(rows):
+    """Прибавляет {ключ: [вид, пропущено, отклонено, время]} к счётчикам."""
+    written = 0
+    with transaction.atomic():
+        RateLimitBucket.objects.bulk_create(
+            [
+                RateLimitBucket(key=key, kind=kind, updated_at=seen)
+                for key, (kind, _, _, seen) in rows.items()
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        # Один порядок строк во всех процессах — без взаимных блокировок
+        keys = sorted(rows)
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            written += RateLimitBucket.objects.filter(key__in=batch).update(
+                allowed=F('allowed') + _by_key(rows, batch, 1),
+                throttled=F('throttled') + _by_key(rows, batch, 2),
+                updated_at=Greatest(
+                    'updated_at', _by_key(rows, batch, 3, default=0.0)
+                )
+            )
+    return written
+
+
+def _by_key(rows, keys, index, default=0):
+    return Case(
+        *[When(key=key, then=Value(rows[key][index])) for key in keys],
+        default=Value(default)
+    )
+
+
+def level(state, capacity, refill_rate, now):
+    """Токенов в корзине к моменту now; state — (токены, время) из кеша."""
+    if state is None:
+        return float(capacity)
+    tokens, updated_at = state
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+def consume(key, kind, cost, capacity, refill_rate, now=None):
+    """Списывает cost токенов; возвращает 0 или сколько секунд ждать."""
+    now = time.time() if now is None else float(now)
+    tokens = level(cache.get(CACHE_KEY % key), capacity, refill_rate, now)
+    if tokens < cost:
+        stats.add(key, kind, False, now)
+        return (cost - tokens) / refill_rate
+
+    tokens -= cost
+    # После этого срока корзина полная и запись не нужна
+    timeout = math.ceil((capacity - tokens) / refill_rate) + 1
+    cache.set(CACHE_KEY % key, (tokens, now), timeout)
+    stats.add(key, kind, True, now)
+    return 0
+
+
+def levels(keys, now=None):
+    """Текущий уровень корзин {ключ: токены} по ключам вида 'kind:...'."""
+    now = time.time() if now is None else now
+    states = cache.get_many([CACHE_KEY % key for key in keys])
+    result = {}
+    for key in keys:
+        bucket = settings.RATE_LIMIT_BUCKETS[key.split(':', 1)[0]]
+        result[key] = level(states.get(CACHE_KEY % key), now=now, **bucket)
+    return result
+
+
+def bucket_key(kind, ident):
+    """Ключ корзины; адрес анонима хешируется до фиксированной длины."""
+    if kind == 'anon':
+        ident = hashlib.sha1(str(ident).encode()).hexdigest()
+    return f'{kind}:{ident}'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle DRF: стоимость запроса берётся по ``throttle_scope`` вьюхи,
+    как у ScopedRateThrottle. Вьюхи без стоимости не ограничиваются.
+    """
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = getattr(view, 'throttle_scope', None)
+        cost = settings.RATE_LIMIT_COSTS.get(scope)
+        if not settings.RATE_LIMIT_ENABLED or not cost:
+            return True
+
+        if request.user and request.user.is_authenticated:
+            kind, ident = 'user', request.user.pk
+        else:
+            kind, ident = 'anon', self.get_ident(request)
+        bucket = settings.RATE_LIMIT_BUCKETS[kind]
+
+        wait = consume(bucket_key(kind, ident), kind, cost, **bucket)
+        if wait:
+            logger.info('Лимит запросов: %s:%s, %s', kind, ident, scope)
+            self.wait_seconds = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def cleanup(max_idle):
+    """Удаляет счётчики клиентов без запросов дольше max_idle секунд."""
+    RateLimitBucket.objects.filter(updated_at__lt=time.time() - max_idle).delete()
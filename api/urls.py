@@ -4,6 +4,7 @@ from rest_framework_nested import routers
 from .views import (
     HotelViewSet,
     SearchHotelsView,
+    SearchRoomsView,
     RoomViewSet,
     CityListView,
     BookingViewSet,
@@ -11,6 +12,14 @@ from .views import (
     RouletteView,
     APIRootView,
     UserAdminViewSet,
+    RateLimitStatsView,
+    AvailabilityBatchView,
+    QuoteView,
+    DeletionDetailView,
+    HotelAnalyticsView,
+    HotelEventsView,
+    RequestProfileListView,
+    RequestProfileDetailView,
 )
 
 router = DefaultRouter()
@@ -31,16 +40,31 @@ urlpatterns = [
     path('', include(hotel_router.urls)),  # Вложенные роутеры
 
     path('cities/', CityListView.as_view(), name='city-list'),
+    path(
+        'hotels/<int:hotel_pk>/events/',
+        HotelEventsView.as_view(),
+        name='hotel-events'
+    ),
     path(
         'search/',
         SearchHotelsView.as_view(),
         name='search-hotels'
     ),
-    # path(
-    #     'search/rooms',
-    #     SearchRoomsView.as_view(),
-    #     name='search-rooms'
-    # ),
+    path(
+        'availability/',
+        AvailabilityBatchView.as_view(),
+        name='availability-batch'
+    ),
+    path(
+        'quote/',
+        QuoteView.as_view(),
+        name='quote'
+    ),
+    path(
+        'search/rooms/',
+        SearchRoomsView.as_view(),
+        name='search-rooms'
+    ),
     # path('hotels/', views.HotelListView.as_view(), name='hotel-list'),
     # path('hotels/<int:pk>/', views.HotelDetailView.as_view(), name='hotel-detail'),
     # path('hotels/<int:hotel_id>/rooms/', views.RoomListView.as_view(), name='room-list'),
@@ -55,4 +79,29 @@ urlpatterns = [
         RouletteView.as_view(),
         name='roulette-discount'
     ),
+    path(
+        'analytics/',
+        HotelAnalyticsView.as_view(),
+        name='hotel-analytics'
+    ),
+    path(
+        'deletions/<int:pk>/',
+        DeletionDetailView.as_view(),
+        name='deletion-detail'
+    ),
+    path(
+        'profiles/',
+        RequestProfileListView.as_view(),
+        name='request-profile-list'
+    ),
+    path(
+        'profiles/<uuid:pk>/',
+        RequestProfileDetailView.as_view(),
+        name='request-profile-detail'
+    ),
+    path(
+        'ratelimits/',
+        RateLimitStatsView.as_view(),
+        name='rate-limit-stats'
+    ),
 ]
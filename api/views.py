@@ -7,7 +7,12 @@ from .models import (
     Booking,
     Review,
     Discount,
-    User
+    User,
+    HotelRating,
+    BookingArchive,
+    Deletion,
+    RateLimitBucket,
+    RequestProfile,
 )
 from .serializers import (
     HotelSerializer,
@@ -17,11 +22,24 @@ from .serializers import (
     ReviewSerializer,
     UserAdminSerializer,
     BookingCreateSerializer,
+    AvailabilityQuerySerializer,
+    QuoteQuerySerializer,
+    RoomSearchQuerySerializer,
+    field_requested,
 )
 from rest_framework.response import Response
+from . import (
+    availability, catalog, counters, deletion, events, geo, pricing, search,
+    stats, throttling
+)
+from .fastpath import FastListMixin
+from .filters import narrow_queryset
+from .idempotency import IdempotentCreateMixin
+from .pagination import ManagedBookingPagination, SearchPagination
 from .permissions import (
     IsNotBlocked,
     IsStaff,
+    IsHotelManager,
     IsAdmin,
     IsStaffOwnerOrAdminOrReadOnly,
     OwnerOrReadOnly,
@@ -29,141 +47,459 @@ from .permissions import (
     IsOwnerOrAdminForBooking,
     IsOwner
 )
+from django.conf import settings
 from django.utils import timezone
 from random import randint
 from datetime import timedelta, datetime
 from django.urls import reverse
+from django.shortcuts import get_object_or_404
+import asyncio
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
-from decimal import Decimal
-from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.settings import api_settings
 from rest_framework import filters
-from django.db.models import OuterRef, Exists, Q
+from django.db import transaction
+from django.db.models import (
+    OuterRef, Exists, F, Q, Count, IntegerField, Subquery, Sum, Value
+)
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 
 # class HotelViewSet(viewsets.ReadOnlyModelViewSet):
-class HotelViewSet(viewsets.ModelViewSet):
-    queryset = Hotel.objects.select_related('city', 'city__country').all()
+class HotelViewSet(FastListMixin, viewsets.ModelViewSet):
+    queryset = Hotel.objects.select_related('city', 'city__country').filter(
+        is_deleting=False
+    )
     serializer_class = HotelSerializer
     permission_classes = [IsStaffOwnerOrAdminOrReadOnly]
-    filter_backends = (DjangoFilterBackend,)
+    # Фильтры по умолчанию: DjangoFilterBackend и SparseFieldsetFilter
     filterset_fields = ('city__name',)
+    # ?sort=: popularity — взвешенный рейтинг, views и bookings — самые
+    # просматриваемые и бронируемые за POPULARITY_DAYS (api/counters.py)
+    sorts = ('popularity', 'views', 'bookings')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sort = self.request.query_params.get('sort')
+        if self.action != 'list' or not sort:
+            return queryset
+        if sort not in self.sorts:
+            raise ValidationError(
+                {"sort": f"sort must be one of: {', '.join(self.sorts)}"}
+            )
+        kind = None if sort == 'popularity' else sort
+        return queryset.annotate(
+            score=counters.popularity(kind)
+        ).order_by('-score', 'pk')
+
+    def retrieve(self, request, *args, **kwargs):
+        hotel = self.get_object()
+        # Просмотр только копится в памяти — чтение не становится записью
+        counters.record('views', [hotel.pk])
+        return Response(self.get_serializer(hotel).data)
 
     def perform_create(self, serializer):
         serializer.save(manager=self.request.user)
 
+    def destroy(self, request, *args, **kwargs):
+        # Отель с бронями удаляется в фоне частями (api/deletion.py)
+        hotel = self.get_object()
+        return deletion_response(deletion.schedule(hotel, request.user))
+
+    @action(detail=True, methods=['get'], permission_classes=[IsHotelManager])
+    def analytics(self, request, pk=None):
+        """Загрузка, ADR и выручка по дням (?period=month — по месяцам)."""
+        hotel = get_object_or_404(Hotel, pk=pk)
+        self.check_object_permissions(request, hotel)
+
+        period = request.query_params.get('period', 'day')
+        if period not in ('day', 'month'):
+            return Response({"error": "Invalid period"}, status=400)
+        try:
+            start, end = stats.parse_range(request.query_params)
+        except ValueError:
+            return Response({"error": "Invalid date range"}, status=400)
+
+        build = stats.daily if period == 'day' else stats.monthly
+        return Response({
+            "hotel": hotel.pk,
+            "start": start,
+            "end": end,
+            "period": period,
+            "results": build(hotel.pk, start, end),
+        })
+
+
+class HotelAnalyticsView(views.APIView):
+    """Итоги за период по отелям менеджера (суперпользователю — по всем)."""
+    permission_classes = [IsHotelManager]
+
+    def get(self, request):
+        try:
+            start, end = stats.parse_range(request.query_params)
+        except ValueError:
+            return Response({"error": "Invalid date range"}, status=400)
+
+        hotels = Hotel.objects.only('pk', 'name').order_by('pk')
+        if not request.user.is_superuser:
+            hotels = hotels.filter(manager=request.user)
+
+        return Response({
+            "start": start,
+            "end": end,
+            "results": [
+                {"hotel": hotel.pk, "name": hotel.name, **values}
+                for hotel, values in stats.totals(list(hotels), start, end)
+            ],
+        })
+
+
+# Поиск сортирует и выбирает cheapest_room по базовой цене ночи
+# (Room.price); total_price считается по правилам цен и может
+# не совпадать с этим порядком. Заголовок сообщает об этом клиенту
+PRICE_BASIS_HEADER = 'Price-Order-Basis'
+
 
 class SearchHotelsView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'search'
+    sorts = ('price', 'rating', 'distance', 'popularity')
 
     def get(self, request):
         city_id = request.query_params.get('city_id')
         check_in = request.query_params.get('check_in')
         check_out = request.query_params.get('check_out')
         guests = request.query_params.get('guests')
+        query = request.query_params.get('q', '').strip()
+
+        # Область поиска: город, точка с радиусом (lat, lon, radius в км)
+        # или прямоугольник bbox=min_lat,min_lon,max_lat,max_lon
+        has_area = any(
+            request.query_params.get(name)
+            for name in ('city_id', 'lat', 'lon', 'bbox')
+        )
+        dates = [check_in, check_out, guests]
+
+        # С текстовым запросом (q) даты и область необязательны,
+        # но даты, если переданы, нужны полностью
+        if query:
+            missing = any(dates) and not all(dates)
+        else:
+            missing = not all(dates) or not has_area
 
-        if not all([city_id, check_in, check_out, guests]):
+        if missing:
             return Response(
                 {"error": "Missing required parameters"},
                 status=400
             )
 
+        if all(dates):
+            try:
+                check_in = datetime.strptime(check_in, "%Y-%m-%d").date()
+                check_out = datetime.strptime(check_out, "%Y-%m-%d").date()
+                guests = int(guests)
+            except ValueError:
+                return Response(
+                    {"error": "Invalid date or guests format"},
+                    status=400
+                )
+
+            if check_in >= check_out:
+                return Response(
+                    {"error": "Check-in must be before check-out"},
+                    status=400
+                )
+
         try:
-            check_in = datetime.strptime(check_in, "%Y-%m-%d").date()
-            check_out = datetime.strptime(check_out, "%Y-%m-%d").date()
-            guests = int(guests)
+            point, radius, bbox = self.parse_geo(request.query_params)
         except ValueError:
             return Response(
-                {"error": "Invalid date or guests format"},
+                {"error": "Invalid coordinates"},
                 status=400
             )
 
-        if check_in >= check_out:
+        sort = request.query_params.get('sort') or None
+        if sort is not None and sort not in self.sorts:
+            return Response(
+                {"error": f"sort must be one of: {', '.join(self.sorts)}"},
+                status=400
+            )
+        if sort == 'distance' and point is None:
             return Response(
-                {"error": "Check-in must be before check-out"},
+                {"error": "Sorting by distance requires lat and lon"},
                 status=400
             )
 
-        # Комнаты, у которых нет пересекающихся бронирований
-        overlapping_bookings = Booking.objects.filter(
-            room=OuterRef('pk'),
-            start_date__lt=check_out,
-            end_date__gt=check_in
-        )
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            limit = int(limit) if limit.isdigit() else 0
+            if not 1 <= limit <= settings.SEARCH_MAX_LIMIT:
+                return Response(
+                    {"error": "limit must be between 1 and "
+                              f"{settings.SEARCH_MAX_LIMIT}"},
+                    status=400
+                )
 
-        available_rooms = Room.objects.annotate(
-            is_booked=Exists(overlapping_bookings)
-        ).filter(
-            is_booked=False,
-            capacity__gte=guests
+        if city_id:
+            try:
+                city_id = int(city_id)
+            except ValueError:
+                return Response({"error": "Invalid city_id"}, status=400)
+
+        hotels = Hotel.objects.filter(is_deleting=False)
+
+        # Номера отеля-кандидата, подходящие под запрос (по индексу hotel_id)
+        rooms = Room.objects.filter(hotel=OuterRef('pk'), is_deleting=False)
+
+        if all(dates):
+            # Комнаты, у которых нет пересекающихся бронирований
+            overlapping_bookings = Booking.objects.filter(
+                room=OuterRef('pk'),
+                start_date__lt=check_out,
+                end_date__gt=check_in
+            )
+            rooms = rooms.filter(
+                ~Exists(overlapping_bookings),
+                capacity__gte=guests
+            )
+            hotels = hotels.filter(Exists(rooms))
+
+        # Самый дешёвый подходящий номер отдаётся вместе с отелем
+        cheapest = rooms.order_by('price', 'pk')
+        hotels = hotels.annotate(
+            cheapest_room_id=Subquery(cheapest.values('pk')[:1])
         )
 
-        hotels = Hotel.objects.filter(
-            city__id__iexact=city_id,
-            rooms__in=available_rooms
-        ).distinct()
+        if city_id:
+            hotels = hotels.filter(city_id=city_id)
+
+        if bbox is not None:
+            hotels = hotels.filter(geo.bbox_q(*bbox))
+
+        if point is not None:
+            # Индекс по геохешу отсекает всё вне ячеек вокруг круга,
+            # точное расстояние считается только для оставшихся отелей
+            hotels = hotels.filter(
+                geo.bbox_q(*geo.bounding_box(*point, radius))
+            ).annotate(
+                distance=geo.distance_expression(*point)
+            ).filter(distance__lte=radius)
+
+        if query:
+            hotels = search.search(hotels, query)
+
+        if sort == 'price':
+            hotels = hotels.annotate(
+                min_price=Subquery(cheapest.values('price')[:1])
+            ).order_by(F('min_price').asc(nulls_last=True), 'pk')
+        elif sort == 'rating':
+            hotels = hotels.order_by('-rating', 'pk')
+        elif sort == 'popularity':
+            hotels = hotels.annotate(
+                popularity=counters.popularity()
+            ).order_by('-popularity', 'pk')
+        elif sort == 'distance':
+            hotels = hotels.order_by('distance', 'pk')
+        elif query:
+            hotels = hotels.order_by('-search_rank', 'pk')
+
+        # request в контекст не передаём, чтобы не менять формат URL картинок
+        context = {'fieldset_params': request.query_params}
+        hotels = narrow_queryset(hotels, HotelSerializer(context=context))
+
+        # limit — первые k отелей (LIMIT в запросе). Иначе постранично —
+        # поиск по тексту или по явному запросу страницы; прежний поиск
+        # по датам без них отдаёт весь список
+        paginator = None
+        if limit is not None:
+            hotels = hotels[:limit]
+        elif query or {'page', 'page_size'} & set(request.query_params):
+            paginator = SearchPagination()
+            hotels = paginator.paginate_queryset(hotels, request, view=self)
+        hotels = list(hotels)
+        counters.record('impressions', [hotel.pk for hotel in hotels])
+
+        serializer = HotelSerializer(hotels, many=True, context=context)
+        data = serializer.data
+
+        cheapest_rooms = None
+        if field_requested(request.query_params, 'cheapest_room'):
+            cheapest_rooms = self.cheapest_rooms(
+                request, hotels, check_in, check_out, all(dates)
+            )
+        for item, hotel in zip(data, hotels):
+            if cheapest_rooms is not None:
+                item['cheapest_room'] = cheapest_rooms.get(
+                    hotel.cheapest_room_id
+                )
+            if point is not None:
+                item['distance'] = round(hotel.distance, 3)
+            if sort == 'popularity':
+                item['popularity'] = hotel.popularity
 
-        serializer = HotelSerializer(hotels, many=True)
-        return Response(serializer.data)
+        if paginator is not None:
+            response = paginator.get_paginated_response(data)
+        else:
+            response = Response(data)
+        if sort == 'price' or cheapest_rooms is not None:
+            response[PRICE_BASIS_HEADER] = 'nightly'
+        return response
+
+    def cheapest_rooms(self, request, hotels, check_in, check_out, dated):
+        """
+        Самые дешёвые номера страницы одним запросом: {id: данные};
+        с датами — и цена проживания по правилам (api/pricing.py).
+        """
+        rooms = Room.objects.only(
+            'pk', 'hotel_id', 'room_type', 'capacity', 'price'
+        ).in_bulk([
+            hotel.cheapest_room_id for hotel in hotels
+            if hotel.cheapest_room_id is not None
+        ])
+        result = {
+            room.pk: {
+                'id': room.pk,
+                'room_type': room.room_type,
+                'capacity': room.capacity,
+                'price': room.price,
+            }
+            for room in rooms.values()
+        }
+        if dated and rooms:
+            discount = pricing.active_discount(request.user)
+            for quote in pricing.quote_many(
+                list(rooms.values()), check_in, check_out,
+                discount.amount if discount else 0
+            ):
+                result[quote.room_id]['total_price'] = quote.total
+        return result
+
+    def parse_geo(self, params):
+        """Разбирает lat/lon/radius и bbox; ValueError при ошибке."""
+        point = radius = bbox = None
+
+        if params.get('lat') or params.get('lon'):
+            if not (params.get('lat') and params.get('lon')):
+                raise ValueError('lat/lon')
+            point = (float(params['lat']), float(params['lon']))
+            radius = float(
+                params.get('radius', settings.GEO_DEFAULT_RADIUS_KM)
+            )
+            if not 0 < radius <= settings.GEO_MAX_RADIUS_KM:
+                raise ValueError('radius')
+            self.check_coordinates(*point)
+
+        if params.get('bbox'):
+            bbox = tuple(float(value) for value in params['bbox'].split(','))
+            if len(bbox) != 4:
+                raise ValueError('bbox')
+            min_lat, min_lon, max_lat, max_lon = bbox
+            self.check_coordinates(min_lat, min_lon)
+            self.check_coordinates(max_lat, max_lon)
+            # min_lon > max_lon — прямоугольник через антимеридиан
+            if min_lat > max_lat:
+                raise ValueError('bbox')
+
+        return point, radius, bbox
+
+    @staticmethod
+    def check_coordinates(latitude, longitude):
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('coordinates')
+
+
+class SearchRoomsView(views.APIView):
+    """
+    Свободные номера города на даты с кратким описанием отеля и ценой
+    проживания (api/pricing.py, со скидкой рулетки вошедшего
+    пользователя). Фильтры по цене ночи и вместимости, сортировка
+    sort=price|-price|capacity|-capacity (по цене ночи, не по total_price),
+    постранично.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_scope = 'search'
+    orderings = {
+        'price': ('price', 'pk'),
+        '-price': ('-price', 'pk'),
+        'capacity': ('capacity', 'price', 'pk'),
+        '-capacity': ('-capacity', 'price', 'pk'),
+    }
 
+    def get(self, request):
+        serializer = RoomSearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
 
-# class SearchRoomsView(views.APIView):
-#     permission_classes = [permissions.AllowAny]
-
-#     def get(self, request, hotel_id):
-#         check_in = request.query_params.get('check_in')
-#         check_out = request.query_params.get('check_out')
-#         guests = request.query_params.get('guests')
-
-#         if not all([check_in, check_out, guests]):
-#             return Response(
-#                 {"error": "Missing required parameters"},
-#                 status=400
-#             )
-
-#         try:
-#             check_in = datetime.strptime(check_in, "%Y-%m-%d").date()
-#             check_out = datetime.strptime(check_out, "%Y-%m-%d").date()
-#             guests = int(guests)
-#         except ValueError:
-#             return Response(
-#                 {"error": "Invalid date or guests format"},
-#                 status=400
-#             )
-
-#         if check_in >= check_out:
-#             return Response(
-#                 {"error": "Check-in must be before check-out"},
-#                 status=400
-#             )
-
-#         overlapping_bookings = Booking.objects.filter(
-#             room=OuterRef('pk'),
-#             start_date__lt=check_out,
-#             end_date__gt=check_in
-#         )
-
-#         available_rooms = Room.objects.annotate(
-#             is_booked=Exists(overlapping_bookings)
-#         ).filter(
-#             is_booked=False,
-#             capacity__gte=guests,
-#             hotel_id=hotel_id  # фильтрация по отелю
-#         )
-
-#         serializer = RoomSerializer(available_rooms, many=True)
-#         return Response(serializer.data)
+        overlapping_bookings = Booking.objects.filter(
+            room=OuterRef('pk'),
+            start_date__lt=data['check_out'],
+            end_date__gt=data['check_in']
+        )
+        # Номера и их отели — одним запросом (JOIN), без запроса на отель
+        rooms = Room.objects.filter(
+            ~Exists(overlapping_bookings),
+            hotel__city_id=data['city_id'],
+            hotel__is_deleting=False,
+            is_deleting=False,
+            capacity__gte=data['guests'],
+        ).select_related('hotel').only(
+            'pk', 'hotel_id', 'room_type', 'capacity', 'price',
+            'hotel__name', 'hotel__address', 'hotel__rating',
+        ).order_by(*self.orderings[data['sort']])
+
+        if data.get('min_price') is not None:
+            rooms = rooms.filter(price__gte=data['min_price'])
+        if data.get('max_price') is not None:
+            rooms = rooms.filter(price__lte=data['max_price'])
+        if data.get('max_capacity'):
+            rooms = rooms.filter(capacity__lte=data['max_capacity'])
+
+        paginator = SearchPagination()
+        rooms = paginator.paginate_queryset(rooms, request, view=self)
+        counters.record('impressions', {room.hotel_id for room in rooms})
+
+        # Цена проживания — по правилам отелей страницы (один запрос)
+        discount = pricing.active_discount(request.user)
+        quotes = pricing.quote_many(
+            rooms, data['check_in'], data['check_out'],
+            discount.amount if discount else 0
+        )
+        response = paginator.get_paginated_response([
+            {
+                'id': room.pk,
+                'room_type': room.room_type,
+                'capacity': room.capacity,
+                'price': room.price,
+                'nights': quote.nights,
+                'discount': quote.discount,
+                'total_price': quote.total,
+                'hotel': {
+                    'id': room.hotel_id,
+                    'name': room.hotel.name,
+                    'address': room.hotel.address,
+                    'rating': room.hotel.rating,
+                },
+            }
+            for room, quote in zip(rooms, quotes)
+        ])
+        response[PRICE_BASIS_HEADER] = 'nightly'
+        return response
 
 
 # class RoomViewSet(viewsets.ReadOnlyModelViewSet):
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Room.objects.select_related('hotel', 'hotel__city').all()
     serializer_class = RoomSerializer
     permission_classes = [IsStaffOwnerOrAdminOrReadOnly]
 
     def get_queryset(self):
         hotel_id = self.kwargs['hotel_pk']
-        queryset = Room.objects.filter(hotel__id=hotel_id)
+        queryset = Room.objects.filter(
+            hotel__id=hotel_id, is_deleting=False, hotel__is_deleting=False
+        )
 
         # Читаем параметры запроса
         check_in = self.request.query_params.get('check_in')
@@ -200,15 +536,133 @@ class RoomViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def destroy(self, request, *args, **kwargs):
+        room = self.get_object()
+        return deletion_response(deletion.schedule(room, request.user))
+
+
+class AvailabilityBatchView(views.APIView):
+    """
+    Пакетная проверка доступности: список запросов
+    {hotel, check_in, check_out, guests} — один запрос к БД на весь пакет.
+    Ответ в том же порядке; ошибки валидации — у каждого элемента свои.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_scope = 'availability'
+
+    def post(self, request):
+        queries = request.data.get('queries') if isinstance(
+            request.data, dict
+        ) else None
+
+        if not isinstance(queries, list):
+            return Response(
+                {"error": "Expected a list in 'queries'"},
+                status=400
+            )
+
+        if len(queries) > settings.AVAILABILITY_BATCH_LIMIT:
+            return Response(
+                {"error": "Too many queries, "
+                          f"limit is {settings.AVAILABILITY_BATCH_LIMIT}"},
+                status=400
+            )
+
+        results = [None] * len(queries)
+        valid = []
+        for index, query in enumerate(queries):
+            serializer = AvailabilityQuerySerializer(data=query)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'errors': serializer.errors}
+
+        found = availability.check([query for _, query in valid])
+        for (index, query), rooms in zip(valid, found):
+            results[index] = {
+                'hotel': query['hotel'],
+                'check_in': query['check_in'],
+                'check_out': query['check_out'],
+                'guests': query['guests'],
+                'available': bool(rooms),
+                'rooms': rooms,
+            }
+
+        return Response({'results': results})
 
-class CityListView(ListAPIView):
-    queryset = City.objects.select_related('country').all()
+
+class QuoteView(views.APIView):
+    """
+    Цена проживания без бронирования: номера отеля (?hotel=) или
+    перечисленные (?room=1&room=2) на даты check_in–check_out.
+    Для вошедшего пользователя учитывается его скидка рулетки.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        serializer = QuoteQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        rooms = Room.objects.filter(
+            is_deleting=False, hotel__is_deleting=False
+        ).only('pk', 'hotel_id', 'price').order_by('pk')
+        if data.get('hotel'):
+            rooms = rooms.filter(hotel_id=data['hotel'])
+        if data.get('room'):
+            rooms = rooms.filter(pk__in=data['room'])
+
+        discount = pricing.active_discount(request.user)
+        quotes = pricing.quote_many(
+            list(rooms),
+            data['check_in'],
+            data['check_out'],
+            discount.amount if discount else 0
+        )
+        return Response({
+            "check_in": data['check_in'],
+            "check_out": data['check_out'],
+            "results": [pricing.as_dict(quote) for quote in quotes],
+        })
+
+
+class CityListView(FastListMixin, ListAPIView):
+    queryset = City.objects.select_related('country').annotate(
+        hotels_count=Count('hotel', filter=Q(hotel__is_deleting=False))
+    )
     serializer_class = CitySerializer
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (
+        filters.SearchFilter, *api_settings.DEFAULT_FILTER_BACKENDS
+    )
     search_fields = ('name', "country__name")
 
+    def list(self, request, *args, **kwargs):
+        # Список и поиск — из справочника в памяти (api/catalog.py),
+        # в БД идём только за разрежённым набором полей
+        params = request.query_params
+        if 'fields' in params or 'omit' in params:
+            return super().list(request, *args, **kwargs)
+
+        cities = catalog.get().city_list
+        terms = [
+            term.casefold()
+            for term in filters.SearchFilter().get_search_terms(request)
+        ]
+        if terms:
+            cities = [
+                city for city in cities
+                if all(
+                    term in city['name'].casefold()
+                    or term in city['country']['name'].casefold()
+                    for term in terms
+                )
+            ]
+        return Response(cities)
+
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(
+    IdempotentCreateMixin, FastListMixin, viewsets.ModelViewSet
+):
     queryset = Booking.objects.all()
 
     # permission_classes = [
@@ -238,34 +692,167 @@ class BookingViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Booking.objects.none()
 
+        if self.action == 'managed':
+            return self.get_managed_queryset()
+
         # Админ видит всё
         if user.is_superuser:
             return Booking.objects.all()
         # Пользователь — только свои брони
         return Booking.objects.filter(user=user)
 
+    def get_managed_queryset(self):
+        """Брони номеров отелей менеджера (суперпользователю — все)."""
+        user = self.request.user
+        queryset = Booking.objects.all()
+        if not user.is_superuser:
+            # Номера отелей менеджера — подзапросом, чтобы брони читались
+            # по индексу (room, end_date, start_date) для каждого номера
+            queryset = queryset.filter(room__in=Room.objects.filter(
+                hotel__manager=user
+            ).values('pk'))
+
+        start, end, booking_status = self.managed_filters
+        if start is not None:
+            queryset = queryset.filter(end_date__gt=start)
+        if end is not None:
+            queryset = queryset.filter(start_date__lt=end)
+        if booking_status is not None:
+            queryset = queryset.filter(status=booking_status)
+        return queryset.order_by('start_date', 'pk')
+
+    def get_archive_queryset(self):
+        """Архивные брони с той же областью видимости (?archived=false — без них)."""
+        user = self.request.user
+
+        if (
+            not user.is_authenticated
+            or self.request.query_params.get('archived') == 'false'
+        ):
+            return BookingArchive.objects.none()
+
+        queryset = BookingArchive.objects.select_related('user', 'room')
+        if user.is_superuser:
+            return queryset
+        return queryset.filter(user=user)
+
+    def include_archive(self):
+        return (
+            self.action == 'list'
+            and self.request.user.is_authenticated
+            and self.request.query_params.get('archived') != 'false'
+        )
+
+    def get_list_rows(self, mapper, queryset):
+        """
+        История целиком: текущие и архивные брони одним UNION ALL
+        с сортировкой и пагинацией в БД.
+        """
+        rows = super().get_list_rows(mapper, queryset)
+        if not self.include_archive():
+            return rows
+
+        # Для сортировки нужен id, даже если ?fields= его не выбрал
+        extra = [] if 'id' in mapper.columns else ['id']
+        # У архивных броней нет отзывов: брони с отзывами не архивируются
+        archived = self.get_archive_queryset().values_list(*[
+            Value(None, output_field=IntegerField()) if path == 'review__id'
+            else path
+            for path in mapper.columns
+        ], *extra)
+        return queryset.values_list(*mapper.columns, *extra).union(
+            archived, all=True
+        ).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        if settings.FAST_LIST_SERIALIZATION or not self.include_archive():
+            return super().list(request, *args, **kwargs)
+
+        # Без быстрого пути: UNION только ключей, объекты — для страницы
+        keys = self.filter_queryset(self.get_queryset()).values_list(
+            'pk', Value(False)
+        ).union(
+            self.get_archive_queryset().values_list('pk', Value(True)),
+            all=True
+        ).order_by('pk')
+        page = self.paginate_queryset(keys)
+        keys = list(keys) if page is None else page
+
+        current = Booking.objects.select_related('user', 'room').in_bulk(
+            [pk for pk, is_archived in keys if not is_archived]
+        )
+        archived = self.get_archive_queryset().in_bulk(
+            [pk for pk, is_archived in keys if is_archived]
+        )
+        bookings = [
+            (archived if is_archived else current)[pk]
+            for pk, is_archived in keys
+        ]
+        serializer = self.get_serializer(bookings, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsHotelManager],
+        pagination_class=ManagedBookingPagination
+    )
+    def managed(self, request):
+        """
+        Брони отелей менеджера постранично. ?start=&end= — пересекающиеся
+        с периодом [start, end), ?status= — только в этом статусе.
+        Архивные брони сюда не попадают.
+        """
+        params = request.query_params
+        try:
+            start, end = (
+                datetime.strptime(params[name], "%Y-%m-%d").date()
+                if params.get(name) else None
+                for name in ('start', 'end')
+            )
+        except ValueError:
+            return Response({"error": "Invalid date range"}, status=400)
+        if start is not None and end is not None and start >= end:
+            return Response({"error": "Invalid date range"}, status=400)
+
+        booking_status = params.get('status') or None
+        if booking_status is not None and (
+            booking_status not in dict(Booking.STATUS_CHOICES)
+        ):
+            return Response({"error": "Invalid status"}, status=400)
+
+        self.managed_filters = (start, end, booking_status)
+        # Без смешивания с архивом из list() — сразу быстрый путь
+        return super(BookingViewSet, self).list(request)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Архивные брони доступны только для чтения
+            if self.request.method not in permissions.SAFE_METHODS:
+                raise
+            booking = get_object_or_404(
+                self.get_archive_queryset(), pk=self.kwargs['pk']
+            )
+            self.check_object_permissions(self.request, booking)
+            return booking
+
     def perform_create(self, serializer):
         user = self.request.user
         room = serializer.validated_data['room']
         start_date = serializer.validated_data['start_date']
         end_date = serializer.validated_data['end_date']
 
-        days = (end_date - start_date).days
-        base_price = room.price * days
-
-        # Попробуем найти активную скидку
-        discount = Discount.objects.filter(
-            user=user,
-            used=False,
-            expires_at__gt=timezone.now()
-        ).first()
+        # Цена по тем же правилам, что и котировка (GET /quote/)
+        discount = pricing.active_discount(user)
+        quote = pricing.quote(
+            room, start_date, end_date, discount.amount if discount else 0
+        )
 
-        discount_amount = 0
-        discount_applied = False
         if discount:
-            discount_amount = base_price * (Decimal(discount.amount) / 100)
-            base_price -= discount_amount
-            discount_applied = True
             discount.used = True
             discount.save()
 
@@ -273,8 +860,11 @@ class BookingViewSet(viewsets.ModelViewSet):
             user=user,
             status='pending',
             created_at=timezone.now(),
-            total_price=base_price,
-            discount_applied=discount_applied,
+            total_price=quote.total,
+            discount_applied=discount is not None,
+        )
+        transaction.on_commit(
+            lambda: counters.record('bookings', [room.hotel_id])
         )
 
     def update(self, request, *args, **kwargs):
@@ -297,14 +887,20 @@ class BookingViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    IdempotentCreateMixin, FastListMixin, viewsets.ModelViewSet
+):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [OwnerOrReadOnly]
 
     def get_queryset(self):
         hotel_id = self.kwargs['hotel_pk']
-        return Review.objects.filter(booking__room__hotel__id=hotel_id)
+        # Пользователь и отель нужны сериализатору — подтягиваем их
+        # одним JOIN, чтобы не делать запросы на каждый отзыв
+        return Review.objects.filter(
+            booking__room__hotel__id=hotel_id
+        ).select_related('booking__user', 'booking__room__hotel')
 
     def perform_create(self, serializer):
         # Присваиваем пользователю при создании
@@ -312,10 +908,36 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
         serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request, hotel_pk=None):
+        """Количество, средняя оценка и гистограмма 1–5 звёзд."""
+        summary = HotelRating.objects.filter(hotel_id=hotel_pk).first()
+
+        if summary is None:
+            # Отзывов ещё нет — отдаём пустую сводку для существующего отеля
+            summary = HotelRating(hotel=get_object_or_404(Hotel, pk=hotel_pk))
+
+        return Response(
+            {
+                "hotel": summary.hotel_id,
+                "count": summary.count,
+                "average": summary.average,
+                "histogram": summary.histogram,
+            },
+            status=status.HTTP_200_OK
+        )
+
 
 class RouletteView(views.APIView):
     """Рулетка для случайной скидки."""
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'roulette'
+
+    def get_throttles(self):
+        # Ограничиваем только создание скидки, проверка дешёвая
+        if self.request.method != 'POST':
+            return []
+        return super().get_throttles()
 
     def get(self, request, *args, **kwargs):
         """Проверка наличия активной скидки без создания новой."""
@@ -379,10 +1001,17 @@ class RouletteView(views.APIView):
 
 
 class UserAdminViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    # Пользователи, которых удаляют в фоне, уже скрыты
+    queryset = User.objects.exclude(pk__in=Deletion.objects.filter(
+        target='user'
+    ).exclude(status=Deletion.DONE).values('object_id'))
     serializer_class = UserAdminSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
 
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        return deletion_response(deletion.schedule(user, request.user))
+
     def get_permissions(self):
         # Переопределяем метод get_permissions для разных действий
         if self.action == 'toggle_theme':
@@ -426,6 +1055,28 @@ class UserAdminViewSet(viewsets.ModelViewSet):
         )
 
 
+def deletion_response(item):
+    """202: удаление принято, прогресс — по ссылке из Location."""
+    return Response(
+        deletion.as_dict(item),
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('deletion-detail', args=[item.pk])}
+    )
+
+
+class DeletionDetailView(views.APIView):
+    """Прогресс фонового удаления: автору запроса и суперпользователю."""
+    permission_classes = [IsStaff]
+
+    def get(self, request, pk):
+        item = get_object_or_404(Deletion, pk=pk)
+        if item.requested_by_id != request.user.pk and (
+            not request.user.is_superuser
+        ):
+            raise Http404
+        return Response(deletion.as_dict(item))
+
+
 class APIRootView(views.APIView):
     """Отображает все доступные эндпоинты API."""
     def get(self, request):
@@ -476,3 +1127,125 @@ class APIRootView(views.APIView):
         }
 
         return Response(routes)
+
+
+class RequestProfileListView(views.APIView):
+    """Последние профили запросов (см. api/profiling.py), без отчётов."""
+    permission_classes = [IsStaff]
+
+    def get(self, request):
+        profiles = RequestProfile.objects.order_by('-created_at').values(
+            'id', 'user_id', 'method', 'path', 'status_code',
+            'duration_ms', 'sql_ms', 'query_count', 'created_at'
+        )[:50]
+        return Response(list(profiles))
+
+
+class RequestProfileDetailView(views.APIView):
+    """Отчёт профилирования: функции, SQL со стеком, планы запросов."""
+    permission_classes = [IsStaff]
+
+    def get(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        return Response({
+            "id": profile.pk,
+            "user": profile.user_id,
+            "method": profile.method,
+            "path": profile.path,
+            "status_code": profile.status_code,
+            "duration_ms": profile.duration_ms,
+            "sql_ms": profile.sql_ms,
+            "query_count": profile.query_count,
+            "created_at": profile.created_at,
+            **profile.report,
+        })
+
+
+class TokenCreateView(TokenObtainPairView):
+    """Выдача JWT: проверка пароля дорогая, поэтому частота ограничена."""
+    throttle_scope = 'auth'
+
+
+class RateLimitStatsView(views.APIView):
+    """Счётчики ограничения частоты запросов для подбора лимитов."""
+    permission_classes = [IsStaff]
+
+    def get(self, request):
+        # Счётчики этого процесса, ещё лежащие в памяти
+        throttling.stats.flush()
+        totals = {
+            row['kind']: {
+                'clients': row['clients'],
+                'allowed': row['allowed'],
+                'throttled': row['throttled'],
+            }
+            for row in RateLimitBucket.objects.values('kind').annotate(
+                clients=Count('key'),
+                allowed=Sum('allowed'),
+                throttled=Sum('throttled'),
+            ).order_by('kind')
+        }
+        top = list(RateLimitBucket.objects.filter(throttled__gt=0).order_by(
+            '-throttled', 'key'
+        ).values('key', 'allowed', 'throttled')[:20])
+        levels = throttling.levels([row['key'] for row in top])
+        for row in top:
+            row['tokens'] = levels[row['key']]
+
+        return Response({
+            'enabled': settings.RATE_LIMIT_ENABLED,
+            'buckets': settings.RATE_LIMIT_BUCKETS,
+            'costs': settings.RATE_LIMIT_COSTS,
+            'totals': totals,
+            'top': top,
+        })
+
+
+class HotelEventsView(View):
+    """
+    Поток событий доступности номеров отеля (text/event-stream) вместо
+    опроса /hotels/:id/rooms/. Работает только в ASGI-приложении:
+    под WSGI каждый подписчик занимал бы поток целиком.
+    """
+
+    async def get(self, request, hotel_pk):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(
+                'Поток событий доступен только через ASGI', status=501
+            )
+        # Удаляемый отель скрыт так же, как в остальных эндпоинтах
+        if not await Hotel.objects.filter(
+            pk=hotel_pk, is_deleting=False
+        ).aexists():
+            raise Http404
+
+        broker = events.get_broker()
+        if broker.subscriber_count >= settings.EVENTS_MAX_SUBSCRIBERS:
+            response = HttpResponse(status=503)
+            response['Retry-After'] = '30'
+            return response
+
+        response = StreamingHttpResponse(
+            self.stream(broker, broker.subscribe(hotel_pk)),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Иначе nginx копит поток в буфере
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, broker, subscription):
+        try:
+            yield b'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), settings.EVENTS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    # Комментарий держит соединение через прокси
+                    yield b': keepalive\n\n'
+                    continue
+                yield events.encode(event)
+        finally:
+            broker.unsubscribe(subscription)
@@ -0,0 +1,77 @@
+"""
+Микробенчмарк рендеринга JSON: JSONRenderer DRF против ORJSONRenderer.
+
+    python benchmarks/renderers.py [1000 10000 100000]
+"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'checkmate.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.renderers import ORJSONRenderer  # noqa: E402
+
+
+def make_bookings(count):
+    # Сырые типы (Decimal, date, datetime), как в ответах без сериализатора
+    created = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': i,
+            'room': {'id': i % 50, 'hotel': i % 7, 'room_type': 'Стандарт'},
+            'start_date': date(2030, 1, 1) + timedelta(days=i % 300),
+            'end_date': date(2030, 1, 3) + timedelta(days=i % 300),
+            'guests': 2,
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'email': f'user{i}@example.com',
+            'phone': '+70000000000',
+            'discount_applied': bool(i % 2),
+            'total_price': Decimal('1234.50'),
+            'status': 'confirmed',
+            'created_at': created + timedelta(seconds=i),
+            'has_review': False,
+        }
+        for i in range(count)
+    ]
+
+
+def measure(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(sizes):
+    drf, fast = JSONRenderer(), ORJSONRenderer()
+
+    print(f"{'items':>8} {'drf, s':>10} {'orjson, s':>10} {'chunks, s':>10} {'speedup':>8}")
+    for size in sizes:
+        data = make_bookings(size)
+        drf_time, drf_body = measure(lambda: drf.render(data))
+        fast_time, fast_body = measure(lambda: fast.render(data))
+        chunk_time, chunk_body = measure(
+            lambda: b''.join(fast.render_chunks(iter(data), 1000))
+        )
+        assert drf_body == fast_body == chunk_body, 'ответы отличаются'
+        print(
+            f'{size:>8} {drf_time:>10.4f} {fast_time:>10.4f} '
+            f'{chunk_time:>10.4f} {drf_time / fast_time:>7.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
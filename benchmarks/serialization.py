@@ -0,0 +1,80 @@
+"""
+Сравнение обычной сериализации DRF и быстрого пути api.fastpath.
+
+Запуск (база создаётся временная, рабочие данные не затрагиваются):
+
+    python benchmarks/serialization.py [1000 10000 100000]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'checkmate.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.fastpath import RowMapper  # noqa: E402
+from api.models import Country, City, Hotel  # noqa: E402
+from api.serializers import HotelSerializer  # noqa: E402
+
+
+def seed(count):
+    Hotel.objects.all().delete()
+    country, _ = Country.objects.get_or_create(name='Россия')
+    city, _ = City.objects.get_or_create(name='Москва', country=country)
+    Hotel.objects.bulk_create(
+        Hotel(
+            name=f'Отель {i}',
+            city=city,
+            address=f'Улица {i}',
+            description='Описание отеля ' * 20,
+            image=f'hotels/temp_{i % 9 + 1}.jpeg',
+            rating=i % 50 / 10,
+        )
+        for i in range(count)
+    )
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(sizes):
+    renderer = JSONRenderer()
+    queryset = Hotel.objects.select_related('city', 'city__country')
+
+    def slow():
+        return renderer.render(HotelSerializer(queryset.all(), many=True).data)
+
+    def fast():
+        mapper = RowMapper(HotelSerializer(), Hotel)
+        return renderer.render(mapper.map(mapper.values(queryset.all())))
+
+    print(f"{'rows':>8} {'drf, s':>10} {'fast, s':>10} {'speedup':>8}")
+    for size in sizes:
+        seed(size)
+        slow_time, slow_body = measure(slow)
+        fast_time, fast_body = measure(fast)
+        assert slow_body == fast_body, 'ответы отличаются'
+        print(
+            f'{size:>8} {slow_time:>10.3f} {fast_time:>10.3f} '
+            f'{slow_time / fast_time:>7.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    connection.creation.create_test_db(verbosity=0)
+    main(sizes)
@@ -7,5 +7,5 @@ echo "Migrating database"
 python3 manage.py makemigrations
 python3 manage.py migrate
 
-echo "Collecting static files"
+echo "Collecting static files (with precompressed .gz/.br variants)"
 python3 manage.py collectstatic --noinput
\ No newline at end of file
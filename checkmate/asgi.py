@@ -3,6 +3,12 @@ ASGI config for checkmate project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Поток событий доступности (GET /hotels/:id/events/, api/events.py)
+работает только здесь: один процесс держит тысячи простаивающих
+подписчиков в одном event loop. Запуск, например:
+
+    uvicorn checkmate.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
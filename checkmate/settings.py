@@ -14,9 +14,11 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-from dotenv import load_dotenv
+# На Vercel переменные окружения задаются платформой, .env не нужен
+if not os.getenv('VERCEL'):
+    from dotenv import load_dotenv
 
-load_dotenv()
+    load_dotenv()
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,7 +56,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    # 'whitenoise.middleware.WhiteNoiseMiddleware', !
+    # Статика отдаётся сразу в .br/.gz, подготовленных collectstatic
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Сжатие ответов API (Brotli/gzip по Accept-Encoding)
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +67,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Профилирование по X-Profile (только с PROFILING_ENABLED)
+    'api.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'checkmate.urls'
@@ -115,6 +122,18 @@ DATABASES = {
 }
 
 
+# Кэш. С REDIS_URL — общий для всех процессов (нужен пакет redis),
+# иначе — в памяти процесса
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -149,13 +168,151 @@ REST_FRAMEWORK = {
         # 'rest_framework.authentication.SessionAuthentication', !
     ],
 
+    # JSON через orjson; browsable API остаётся для отладки
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     # ? 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # ? 'PAGE_SIZE': 10,
 
     'DEFAULT_FILTER_BACKENDS': [
-        'django_filters.rest_framework.DjangoFilterBackend'
-    ]
+        'django_filters.rest_framework.DjangoFilterBackend',
+        # ?fields= / ?omit= — сужение queryset до нужных колонок
+        'api.filters.SparseFieldsetFilter',
+    ],
+
+    # Корзины токенов; стоимость задаётся throttle_scope вьюхи
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Сколько доверенных прокси перед приложением: IP клиента берётся
+    # из X-Forwarded-For с их стороны. 0 — только REMOTE_ADDR
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+}
+
+# Быстрая сериализация списков через values_list() (api.fastpath)
+FAST_LIST_SERIALIZATION = os.getenv('FAST_LIST_SERIALIZATION', 'true') == 'true'
+
+# Списки длиннее этого числа строк отдаются потоком, частями такого размера
+JSON_STREAM_CHUNK_SIZE = int(os.getenv('JSON_STREAM_CHUNK_SIZE', '1000'))
+
+# Фоновые задачи (api/jobs.py, python manage.py worker)
+# JOBS_EAGER=true — выполнять задачи сразу после коммита, без воркера
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'false') == 'true'
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '1'))
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', '600'))  # секунды
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', '10'))  # секунды
+JOBS_RETENTION_DAYS = 7
+DISCOUNT_RETENTION_DAYS = 30
+
+# Брони, закончившиеся больше стольких дней назад, переносятся в архив
+BOOKING_ARCHIVE_AFTER_DAYS = int(os.getenv('BOOKING_ARCHIVE_AFTER_DAYS', '30'))
+
+# Поиск отелей по расстоянию: радиус по умолчанию и максимальный, км
+GEO_DEFAULT_RADIUS_KM = 5
+GEO_MAX_RADIUS_KM = 200
+
+# Конфигурация полнотекстового поиска PostgreSQL (стемминг)
+SEARCH_CONFIG = 'russian'
+SEARCH_PAGE_SIZE = 20
+# Наибольший limit в поиске
+SEARCH_MAX_LIMIT = 100
+
+# Счётчики популярности отелей (api/counters.py): как часто воркер
+# сбрасывает их из памяти в БД, секунды (0 — только при остановке),
+# размер пачки, окно популярности и срок хранения корзин, дней,
+# и веса просмотров карточки, показов в поиске и броней
+POPULARITY_FLUSH_INTERVAL = float(os.getenv('POPULARITY_FLUSH_INTERVAL', '30'))
+POPULARITY_FLUSH_BATCH_SIZE = 500
+POPULARITY_DAYS = 7
+POPULARITY_RETENTION_DAYS = 90
+POPULARITY_WEIGHTS = {'views': 10, 'impressions': 1, 'bookings': 100}
+# Сброс в конце запроса вместо фонового потока (бессерверный профиль):
+# когда накопилось столько корзин или самой старой столько секунд
+POPULARITY_FLUSH_ON_REQUEST = False
+POPULARITY_FLUSH_MAX_PENDING = 200
+POPULARITY_FLUSH_MAX_AGE = 10
+
+# Размер страницы броней отелей менеджера (GET /bookings/managed/)
+MANAGED_BOOKINGS_PAGE_SIZE = 50
+
+# Справочник городов и отелей в памяти (api/catalog.py): сколько секунд
+# снимок живёт в процессе без перепроверки, если кэш не общий
+CATALOG_MAX_AGE = int(os.getenv('CATALOG_MAX_AGE', '300'))
+
+# События доступности номеров (SSE, api/events.py). local — только
+# внутри процесса; postgres — между процессами через LISTEN/NOTIFY
+EVENTS_BROKER = os.getenv(
+    'EVENTS_BROKER', 'postgres' if os.getenv('LOCAL') == 'false' else 'local'
+)
+EVENTS_QUEUE_SIZE = 100
+EVENTS_KEEPALIVE = 15  # секунды
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', '10000'))
+
+# Профилирование запросов сотрудников по заголовку X-Profile
+# (api/profiling.py): сколько функций и планов запросов попадает в отчёт
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false') == 'true'
+PROFILING_TOP = 30
+PROFILING_EXPLAIN = 3
+PROFILING_RETENTION = timedelta(days=7)
+
+# Снимки планов запросов (python manage.py explain_snapshots)
+PLAN_SNAPSHOT_DIR = BASE_DIR / 'plans'
+
+# Самый длинный период аналитики отелей, дней
+ANALYTICS_MAX_DAYS = 366
+
+# Максимум запросов в одном POST /availability/
+AVAILABILITY_BATCH_LIMIT = 100
+
+# Фоновое удаление (api/deletion.py): строк в пачке (одна короткая
+# транзакция) и пачек за один запуск задачи
+DELETION_BATCH_SIZE = 500
+DELETION_BATCHES_PER_JOB = 20
+# Незавершённое удаление, не продвигавшееся столько времени, ставится
+# заново (задача resume_deletions)
+DELETION_RESUME_AFTER = timedelta(minutes=15)
+
+# Самое длинное проживание в котировке (GET /quote/), ночей
+PRICING_MAX_NIGHTS = 366
+
+# Сколько хранится ответ на запрос с заголовком Idempotency-Key
+IDEMPOTENCY_TTL = timedelta(hours=24)
+
+# Бюджет времени холодного старта, мс (python manage.py coldstart)
+COLD_START_BUDGET_MS = 900
+
+# Начиная с такого числа строк админка показывает оценку количества
+# из статистики PostgreSQL вместо точного COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Ограничение частоты запросов (api/throttling.py).
+# capacity — допустимый всплеск в токенах, refill_rate — токенов в секунду
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true') == 'true'
+RATE_LIMIT_BUCKETS = {
+    'anon': {'capacity': 30, 'refill_rate': 0.5},
+    'user': {'capacity': 60, 'refill_rate': 1.0},
+}
+# Стоимость запроса по throttle_scope вьюхи
+RATE_LIMIT_COSTS = {
+    'search': 3,
+    'availability': 5,
+    'roulette': 10,
+    'auth': 5,
 }
+# Счётчики запросов по клиентам сбрасываются в БД в конце запроса,
+# когда накопилось столько клиентов или самой старой записи столько секунд
+RATE_LIMIT_STATS_FLUSH_MAX_PENDING = 200
+RATE_LIMIT_STATS_FLUSH_MAX_AGE = 10
+# Счётчики клиентов без запросов дольше суток удаляются
+RATE_LIMIT_RETENTION = 24 * 60 * 60  # секунды
 
 
 AUTH_USER_MODEL = 'api.User'
@@ -205,15 +362,26 @@ STATIC_URL = '/staticfiles/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles_build', 'static')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
-# STORAGES = {
-#     "staticfiles": {
-#         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
-#     },
-# }
+# collectstatic сохраняет рядом с файлами сжатые .gz и .br варианты
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
+    },
+}
+
+# Ответы короче этого размера (в байтах) не сжимаются
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+# Качество Brotli для динамических ответов: 4-5 — баланс скорости и степени
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
 
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Наибольший размер картинки из base64 после декодирования, байт
+IMAGE_MAX_SIZE = 5 * 1024 * 1024
 
 
 # Default primary key field type
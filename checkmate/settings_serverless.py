@@ -0,0 +1,66 @@
+"""
+Профиль настроек для бессерверного развёртывания (Vercel).
+
+Каждый холодный старт функции импортирует весь проект, поэтому здесь
+убрано то, что в функции не нужно, но загружается при старте.
+Время старта проверяется командой ``python manage.py coldstart``.
+
+Приложения, которые остаются, и их доля старта (разница медиан
+``coldstart --runs 15`` с приложением и без него, при старте около
+400–430 мс):
+
+- ``django.contrib.admin`` с ``sessions`` и ``messages`` — 20–30 мс.
+  Админка — единственный интерфейс персонала к боевой БД, сессии
+  и сообщения нужны только ей;
+- ``djoser`` — 7–12 мс: регистрация, активация и смена пароля (/auth/);
+- ``django_filters`` — 10–18 мс: фильтр отелей по городу
+  (``filterset_fields`` в ``HotelViewSet``).
+"""
+import os
+import sys
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+# rest_framework.compat при загрузке пробует импортировать requests
+# (нужен только RequestsClient из rest_framework.test) и пакеты схем
+# и browsable API. Один requests с urllib3 и ssl — около 60 мс старта.
+# Загружаем compat сразу, скрыв эти пакеты только на время его импорта:
+# DRF сам обрабатывает ImportError, а остальным модулям (social-auth
+# у djoser) requests по-прежнему доступен.
+DRF_SKIPPED_IMPORTS = (
+    'requests', 'coreapi', 'coreschema', 'uritemplate', 'yaml',
+    'inflection', 'markdown', 'pygments',
+)
+_loaded = {name: sys.modules.get(name) for name in DRF_SKIPPED_IMPORTS}
+sys.modules.update(dict.fromkeys(DRF_SKIPPED_IMPORTS))
+try:
+    import rest_framework.compat  # noqa: E402,F401
+finally:
+    for _name, _module in _loaded.items():
+        if _module is None:
+            del sys.modules[_name]
+        else:
+            sys.modules[_name] = _module
+
+# Только JSON: browsable API тянет шаблоны и рендеринг HTML
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['api.renderers.ORJSONRenderer'],
+    # Перед функцией стоит прокси Vercel: он дописывает адрес клиента
+    # последним в X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1')),
+}
+
+# Отдельного воркера у функции нет: задачи (картинки, рейтинги, удаление)
+# выполняются сразу после коммита транзакции запроса
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'true') == 'true'
+
+# Между запросами функция заморожена: фоновый поток счётчиков
+# популярности не работает, поэтому они сбрасываются в конце запроса
+POPULARITY_FLUSH_INTERVAL = 0
+POPULARITY_FLUSH_ON_REQUEST = True
+
+# Бюджет времени холодного старта (импорт проекта, django.setup()
+# и загрузка URLconf), мс
+COLD_START_BUDGET_MS = 750
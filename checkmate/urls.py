@@ -19,11 +19,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from api.views import TokenCreateView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     # Аутентификация и регистрация
     path('auth/', include('djoser.urls')),
+    # Выдача JWT с ограничением частоты (перекрывает маршрут djoser)
+    path('auth/jwt/create/', TokenCreateView.as_view(), name='jwt-create'),
     path('auth/', include('djoser.urls.jwt')),
 
     # API
@@ -11,7 +11,12 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'checkmate.settings')
+# На Vercel (переменная VERCEL задаётся платформой) — облегчённый профиль
+os.environ.setdefault(
+    'DJANGO_SETTINGS_MODULE',
+    'checkmate.settings_serverless' if os.getenv('VERCEL')
+    else 'checkmate.settings'
+)
 
 application = get_wsgi_application()
 
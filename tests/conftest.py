@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api import catalog, counters, throttling
+from api.jobs import Worker
+from api.models import User, Country, City, Hotel, Room, Booking
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hasher(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalog():
+    # Справочник живёт в памяти процесса, а БД между тестами откатывается
+    catalog.reset()
+
+
+@pytest.fixture(autouse=True)
+def fresh_counters(settings):
+    # Без фонового потока: тесты сбрасывают счётчики сами (counters.buffer)
+    settings.POPULARITY_FLUSH_INTERVAL = 0
+    yield
+    counters.buffer.take()
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    # Корзины лежат в кеше, счётчики — в памяти процесса
+    cache.clear()
+    yield
+    throttling.stats.take()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def run_jobs(db):
+    """Выполняет все готовые фоновые задачи, как это сделал бы воркер."""
+    return Worker(name='test').run_pending
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(
+        email='guest@example.com',
+        username='guest',
+        password='password123'
+    )
+
+
+@pytest.fixture
+def manager(db):
+    return User.objects.create_user(
+        email='manager@example.com',
+        username='manager',
+        password='password123',
+        is_staff=True
+    )
+
+
+@pytest.fixture
+def admin_user(db):
+    return User.objects.create_superuser(
+        email='admin@example.com',
+        username='admin',
+        password='password123'
+    )
+
+
+@pytest.fixture
+def city(db):
+    country = Country.objects.create(name='Россия')
+    return City.objects.create(name='Москва', country=country)
+
+
+@pytest.fixture
+def hotel(city, manager):
+    return Hotel.objects.create(
+        name='Гранд',
+        city=city,
+        address='Тверская, 1',
+        description='Отель в центре',
+        image='hotels/temp.jpeg',
+        manager=manager
+    )
+
+
+@pytest.fixture
+def room(hotel):
+    return Room.objects.create(
+        hotel=hotel,
+        room_type='Стандарт',
+        capacity=2,
+        description='Двухместный номер',
+        price=Decimal('100.00'),
+        image='rooms/temp.jpeg'
+    )
+
+
+@pytest.fixture
+def make_booking(user, room):
+    def make(start=None, nights=2, status='confirmed', **kwargs):
+        start = start or date(2030, 1, 1)
+        defaults = {
+            'user': user,
+            'room': room,
+            'start_date': start,
+            'end_date': start + timedelta(days=nights),
+            'guests': 1,
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'phone': '+70000000000',
+            'total_price': room.price * nights,
+            'status': status,
+        }
+        defaults.update(kwargs)
+        return Booking.objects.create(**defaults)
+    return make
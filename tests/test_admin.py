@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import Booking, Discount, Review
+from api.pagination import EstimatedCountPaginator
+
+
+CHANGELISTS = [
+    'booking', 'review', 'room', 'hotel', 'discount', 'bookingarchive', 'city'
+]
+
+
+def fill(make_booking, user, count):
+    for i in range(count):
+        booking = make_booking(start=date(2030, 1, 1) + timedelta(days=3 * i))
+        Review.objects.create(booking=booking, text='Ок', rating=5)
+        Discount.objects.create(
+            user=user, amount=10, expires_at=timezone.now()
+        )
+
+
+def changelist_queries(client, model):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(f'/admin/api/{model}/')
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', CHANGELISTS)
+def test_admin_changelist_queries_do_not_grow(
+    client, admin_user, make_booking, user, model
+):
+    client.force_login(admin_user)
+    fill(make_booking, user, 2)
+    few = changelist_queries(client, model)
+
+    fill(make_booking, user, 10)
+    assert changelist_queries(client, model) == few
+
+
+@pytest.mark.django_db
+def test_admin_booking_form_does_not_list_rooms(client, admin_user, make_booking):
+    client.force_login(admin_user)
+    booking = make_booking()
+    response = client.get(f'/admin/api/booking/{booking.pk}/change/')
+    assert response.status_code == 200
+    # Номер выбирается автодополнением, пользователь — по id
+    assert 'admin-autocomplete' in response.content.decode()
+    assert 'vForeignKeyRawIdAdminField' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator_counts_exactly_on_sqlite(make_booking):
+    make_booking()
+    paginator = EstimatedCountPaginator(Booking.objects.order_by('pk'), 50)
+    assert paginator.count == 1
@@ -0,0 +1,107 @@
+import io
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from rest_framework.pagination import PageNumberPagination
+
+from api.models import Booking, BookingArchive, Review
+from api.views import BookingViewSet
+
+
+def booking_ids(api_client, user):
+    api_client.force_authenticate(user)
+    return [item['id'] for item in api_client.get('/bookings/').data]
+
+
+@pytest.fixture
+def history(make_booking):
+    old = make_booking(start=date(2020, 1, 1))
+    reviewed = make_booking(start=date(2020, 2, 1))
+    Review.objects.create(booking=reviewed, text='Ок', rating=5)
+    current = make_booking(start=date(2030, 1, 1))
+    return old, reviewed, current
+
+
+@pytest.mark.django_db
+def test_archive_moves_past_bookings(history):
+    old, reviewed, current = history
+
+    moved = BookingArchive.archive(before=date(2025, 1, 1), batch_size=1)
+    assert moved == 1
+
+    assert set(Booking.objects.values_list('pk', flat=True)) == {
+        reviewed.pk, current.pk
+    }
+    archived = BookingArchive.objects.get()
+    assert archived.pk == old.pk
+    assert archived.total_price == old.total_price
+    assert archived.created_at == old.created_at
+
+
+@pytest.mark.django_db
+def test_archive_command(history):
+    out = io.StringIO()
+    call_command('archive_bookings', '--days', '0', stdout=out)
+    assert 'Перенесено в архив: 1' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_api_bookings_history_includes_archive(api_client, user, history):
+    old, reviewed, current = history
+    before = booking_ids(api_client, user)
+
+    BookingArchive.archive(before=date(2025, 1, 1))
+    response = api_client.get('/bookings/')
+    assert [item['id'] for item in response.data] == before
+    archived = next(item for item in response.data if item['id'] == old.pk)
+    assert archived['email'] == user.email
+    assert archived['has_review'] is False
+    assert archived['room']['room_type'] == 'Стандарт'
+
+    response = api_client.get(f'/bookings/{old.pk}/')
+    assert response.status_code == 200
+    assert response.data['start_date'] == '2020-01-01'
+
+    response = api_client.get('/bookings/', {'archived': 'false'})
+    assert old.pk not in [item['id'] for item in response.data]
+
+
+@pytest.mark.django_db
+def test_api_archived_booking_hidden_from_other_users(
+        api_client, manager, history):
+    old = history[0]
+    BookingArchive.archive(before=date(2025, 1, 1))
+
+    api_client.force_authenticate(manager)
+    assert api_client.get('/bookings/').data == []
+    assert api_client.get(f'/bookings/{old.pk}/').status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast', [True, False])
+def test_api_bookings_history_single_query_with_pagination(
+        api_client, user, history, settings, django_assert_num_queries,
+        monkeypatch, fast):
+    settings.FAST_LIST_SERIALIZATION = fast
+    old, reviewed, current = history
+    BookingArchive.archive(before=date(2025, 1, 1))
+    api_client.force_authenticate(user)
+
+    # Текущие и архивные брони — один UNION ALL, без проверки exists()
+    if fast:
+        with django_assert_num_queries(1):
+            response = api_client.get('/bookings/', {'fields': 'room,status'})
+        assert len(response.data) == 3
+
+    class Pagination(PageNumberPagination):
+        page_size = 2
+
+    monkeypatch.setattr(BookingViewSet, 'pagination_class', Pagination)
+    response = api_client.get('/bookings/')
+    assert response.data['count'] == 3
+    assert [item['id'] for item in response.data['results']] == [
+        old.pk, reviewed.pk
+    ]
+    response = api_client.get('/bookings/', {'page': 2})
+    assert [item['id'] for item in response.data['results']] == [current.pk]
@@ -0,0 +1,128 @@
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import availability
+from api.models import Hotel, Room
+
+
+@pytest.fixture
+def rooms(hotel, room, make_booking):
+    suite = Room.objects.create(
+        hotel=hotel, room_type='Люкс', capacity=4, description='',
+        price=300, image='rooms/temp.jpeg'
+    )
+    # Стандарт занят 2030-01-01..03, люкс — 2030-01-05..07
+    make_booking(start=date(2030, 1, 1))
+    make_booking(start=date(2030, 1, 5), room=suite)
+    return room, suite
+
+
+def query(hotel, check_in, check_out, guests=1):
+    return {'hotel': hotel.pk, 'check_in': check_in,
+            'check_out': check_out, 'guests': guests}
+
+
+@pytest.mark.django_db
+def test_batch_availability_matches_room_endpoint(
+    api_client, hotel, rooms, settings
+):
+    settings.RATE_LIMIT_ENABLED = False
+    room, suite = rooms
+    queries = [
+        query(hotel, '2030-01-01', '2030-01-03'),
+        query(hotel, '2030-01-03', '2030-01-05'),
+        query(hotel, '2030-01-02', '2030-01-06'),
+        query(hotel, '2030-01-03', '2030-01-05', guests=3),
+        query(hotel, '2030-01-06', '2030-01-08'),
+    ]
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.post(
+            '/availability/', {'queries': queries}, format='json'
+        )
+    assert response.status_code == 200
+    assert len(ctx.captured_queries) == 1
+
+    results = response.data['results']
+    assert [r['rooms'] for r in results] == [
+        [suite.pk], [room.pk, suite.pk], [], [suite.pk], [room.pk]
+    ]
+
+    for item, result in zip(queries, results):
+        single = api_client.get(f'/hotels/{hotel.pk}/rooms/', {
+            'check_in': item['check_in'],
+            'check_out': item['check_out'],
+            'guests': item['guests'],
+        })
+        assert [r['id'] for r in single.data] == result['rooms']
+        assert result['available'] is bool(result['rooms'])
+
+
+@pytest.mark.django_db
+def test_only_bookings_in_query_windows_are_loaded(
+    hotel, rooms, make_booking, city
+):
+    room, suite = rooms
+    make_booking(start=date(2030, 6, 1))
+    other = Hotel.objects.create(name='Второй', city=city, address='Адрес')
+
+    # Окна января и декабря у разных отелей: июньская бронь и январская
+    # бронь hotel для запроса к other не читаются
+    hotels = availability.load_rooms([
+        {'hotel': hotel.pk, 'check_in': date(2030, 12, 1),
+         'check_out': date(2030, 12, 3), 'guests': 1},
+        {'hotel': hotel.pk, 'check_in': date(2030, 1, 2),
+         'check_out': date(2030, 1, 3), 'guests': 1},
+        {'hotel': other.pk, 'check_in': date(2030, 1, 5),
+         'check_out': date(2030, 1, 6), 'guests': 1},
+    ])
+    assert dict(hotels) == {hotel.pk: [
+        (room.pk, room.capacity, [(date(2030, 1, 1), date(2030, 1, 3))]),
+        (suite.pk, suite.capacity, []),
+    ]}
+
+
+@pytest.mark.django_db
+def test_batch_availability_per_item_errors(api_client, hotel, rooms):
+    queries = [
+        query(hotel, '2030-01-03', '2030-01-01'),
+        query(hotel, '2030-01-03', '2030-01-05'),
+        {'hotel': hotel.pk},
+        query(hotel, 'вчера', '2030-01-05'),
+    ]
+    results = api_client.post(
+        '/availability/', {'queries': queries}, format='json'
+    ).data['results']
+
+    assert 'non_field_errors' in results[0]['errors']
+    assert results[1]['available'] is True
+    assert set(results[2]['errors']) == {'check_in', 'check_out', 'guests'}
+    assert 'check_in' in results[3]['errors']
+
+
+@pytest.mark.django_db
+def test_batch_availability_unknown_hotel(api_client, hotel, rooms):
+    results = api_client.post('/availability/', {'queries': [
+        {'hotel': 999, 'check_in': '2030-01-01', 'check_out': '2030-01-02',
+         'guests': 1},
+    ]}, format='json').data['results']
+    assert results == [{
+        'hotel': 999, 'check_in': date(2030, 1, 1),
+        'check_out': date(2030, 1, 2), 'guests': 1,
+        'available': False, 'rooms': [],
+    }]
+
+
+@pytest.mark.django_db
+def test_batch_availability_bad_body(api_client, settings):
+    assert api_client.post(
+        '/availability/', {'queries': 'x'}, format='json'
+    ).status_code == 400
+
+    settings.AVAILABILITY_BATCH_LIMIT = 2
+    response = api_client.post('/availability/', {'queries': [{}] * 3},
+                               format='json')
+    assert response.status_code == 400
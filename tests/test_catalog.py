@@ -0,0 +1,141 @@
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from api import catalog
+from api.models import City, Country, Hotel
+from api.serializers import HotelSerializer, RoomSerializer
+
+
+@pytest.mark.django_db
+def test_api_cities_from_catalog_match_database(api_client, hotel):
+    Country.objects.create(name='Пустая')
+    City.objects.create(name='Тверь', country=hotel.city.country)
+
+    cached = api_client.get('/cities/').json()
+    fields = 'id,name,country,hotels_count'
+    database = api_client.get('/cities/', {'fields': fields}).json()
+
+    assert cached == sorted(database, key=lambda city: city['id'])
+    assert [city['hotels_count'] for city in cached] == [1, 0]
+
+
+@pytest.mark.django_db
+def test_api_cities_served_without_queries(
+        api_client, hotel, django_assert_num_queries):
+    api_client.get('/cities/')
+
+    with django_assert_num_queries(0):
+        response = api_client.get('/cities/', {'search': 'москва'})
+
+    assert [city['name'] for city in response.json()] == ['Москва']
+
+
+@pytest.mark.django_db
+def test_api_cities_search_by_country(api_client, city):
+    other = Country.objects.create(name='Франция')
+    City.objects.create(name='Париж', country=other)
+
+    response = api_client.get('/cities/', {'search': 'франц'})
+    assert [city['name'] for city in response.json()] == ['Париж']
+
+    response = api_client.get('/cities/', {'search': 'франц москва'})
+    assert response.json() == []
+
+
+@pytest.mark.django_db
+def test_catalog_invalidated_by_signals(api_client, hotel):
+    assert api_client.get('/cities/').json()[0]['hotels_count'] == 1
+
+    Hotel.objects.create(
+        name='Второй', city=hotel.city, address='Арбат, 2',
+        description='', image='hotels/temp.jpeg'
+    )
+    assert api_client.get('/cities/').json()[0]['hotels_count'] == 2
+
+    hotel.city.name = 'Санкт-Петербург'
+    hotel.city.save()
+    assert api_client.get('/cities/').json()[0]['name'] == 'Санкт-Петербург'
+
+    hotel.city.country.delete()
+    assert api_client.get('/cities/').json() == []
+
+
+@pytest.mark.django_db
+def test_catalog_bumped_again_after_commit(
+        city, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        City.objects.create(name='Казань', country=city.country)
+        # Снимок, собранный до коммита, например другим процессом
+        version = catalog.cache.get(catalog.VERSION_KEY)
+        catalog.get()
+
+    assert catalog.cache.get(catalog.VERSION_KEY) != version
+    assert catalog._local['catalog'] is None
+
+
+@pytest.mark.django_db
+def test_catalog_taken_from_shared_cache(city, django_assert_num_queries):
+    catalog.get()
+    # Другой процесс: своего снимка нет, версия та же
+    catalog._local.update(version=None, catalog=None)
+
+    with django_assert_num_queries(0):
+        assert catalog.get().city('Москва').pk == city.pk
+
+
+@pytest.mark.django_db
+def test_slug_fields_resolved_from_catalog(hotel, django_assert_num_queries):
+    city_field = HotelSerializer().fields['city']
+    hotel_field = RoomSerializer().fields['hotel']
+    catalog.get()
+
+    # Только проверка id по первичному ключу
+    with django_assert_num_queries(2):
+        city = city_field.to_internal_value('Москва')
+        assert hotel_field.to_internal_value('Гранд').pk == hotel.pk
+
+    assert city.pk == hotel.city_id
+    assert city.country.name == 'Россия'
+
+
+@pytest.mark.django_db
+def test_slug_field_errors(city):
+    field = HotelSerializer().fields['city']
+    City.objects.create(name='Москва', country=city.country)
+
+    with pytest.raises(ValidationError) as error:
+        field.to_internal_value('Москва')
+    assert error.value.detail == ['Invalid value.']
+
+    with pytest.raises(ValidationError) as error:
+        field.to_internal_value('Атлантида')
+    assert 'не найден' in error.value.detail[0]
+
+
+@pytest.mark.django_db
+def test_slug_field_falls_back_to_database(city):
+    field = HotelSerializer().fields['city']
+    catalog.get()
+    # Город создан в другом процессе: этот снимок о нём не знает
+    other = City.objects.bulk_create(
+        [City(name='Самара', country=city.country)]
+    )[0]
+
+    assert field.to_internal_value('Самара').pk == other.pk
+
+
+@pytest.mark.django_db
+def test_slug_field_rechecks_stale_snapshot(hotel, city):
+    field = RoomSerializer().fields['hotel']
+    catalog.get()
+    # Изменения из другого процесса: сигналы здесь не срабатывают
+    Hotel.objects.filter(pk=hotel.pk).update(name='Старый')
+    renamed = Hotel.objects.bulk_create([Hotel(
+        name='Гранд', city=city, address='Адрес', image='hotels/temp.jpeg'
+    )])[0]
+    assert field.to_internal_value('Гранд').pk == renamed.pk
+
+    Hotel.objects.filter(pk=renamed.pk).update(is_deleting=True)
+    with pytest.raises(ValidationError) as error:
+        field.to_internal_value('Гранд')
+    assert 'не найден' in error.value.detail[0]
@@ -0,0 +1,71 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+
+from api.management.commands.coldstart import parse_importtime
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     django.utils
+import time:       250 |        350 |   django.db
+import time:        40 |         40 |   rest_framework.fields
+import time:        10 |        400 | django
+"""
+
+
+def test_parse_importtime():
+    assert parse_importtime(IMPORTTIME) == {'django': 360, 'rest_framework': 40}
+    assert parse_importtime(IMPORTTIME, by_module=True)['django.db'] == 250
+
+
+def test_coldstart_serverless_profile():
+    out = io.StringIO()
+    call_command(
+        'coldstart', '--profile', 'checkmate.settings_serverless',
+        '--runs', '1', '--top', '100', '--budget', '60000', stdout=out
+    )
+    report = out.getvalue()
+    assert 'Итого:' in report
+    assert '\ndjango ' in report
+
+
+PROBE = """
+import sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+assert 'requests' not in sys.modules and 'PIL' not in sys.modules
+from rest_framework import compat
+assert compat.requests is None
+import requests
+"""
+
+
+def test_serverless_profile_keeps_packages_importable():
+    # requests не загружается при старте, но остаётся доступен
+    # остальным модулям: его используют djoser и social-auth
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'checkmate.settings_serverless',
+        },
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_coldstart_over_budget_fails():
+    with pytest.raises(CommandError, match='превышает бюджет'):
+        call_command(
+            'coldstart', '--runs', '1', '--budget', '1', stdout=io.StringIO()
+        )
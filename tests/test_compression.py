@@ -0,0 +1,68 @@
+import gzip
+
+import brotli
+import pytest
+
+from api.middleware import choose_encoding
+from api.models import Hotel
+
+
+@pytest.fixture
+def many_hotels(hotel):
+    Hotel.objects.bulk_create(
+        Hotel(
+            name=f'Отель {i}',
+            city=hotel.city,
+            address='Тверская, 1',
+            description='Длинное описание отеля ' * 10,
+            image='hotels/temp.jpeg',
+        )
+        for i in range(20)
+    )
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip', 'gzip'),
+    ('br;q=0.5, gzip;q=0.9', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('*', 'br'),
+    ('identity', None),
+    ('', None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header, ('br', 'gzip')) == expected
+
+
+@pytest.mark.django_db
+def test_api_response_compression(client, many_hotels):
+    plain = client.get('/hotels/')
+    assert not plain.has_header('Content-Encoding')
+    assert 'Accept-Encoding' in plain['Vary']
+
+    response = client.get('/hotels/', HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.content) == plain.content
+    assert int(response['Content-Length']) < len(plain.content)
+
+    response = client.get('/hotels/', HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.content) == plain.content
+
+
+@pytest.mark.django_db
+def test_api_small_response_not_compressed(client, city):
+    response = client.get('/cities/', HTTP_ACCEPT_ENCODING='br')
+    assert not response.has_header('Content-Encoding')
+
+
+@pytest.mark.django_db
+def test_api_streaming_response_compression(client, settings, many_hotels):
+    plain = client.get('/hotels/')
+
+    settings.JSON_STREAM_CHUNK_SIZE = 5
+    response = client.get('/hotels/', HTTP_ACCEPT_ENCODING='br')
+    assert response.streaming
+    assert response['Content-Encoding'] == 'br'
+    body = brotli.decompress(b''.join(response.streaming_content))
+    assert body == plain.content
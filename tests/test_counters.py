@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api import counters
+from api.models import Hotel, HotelCounter
+
+
+def writes(queries):
+    return [
+        query['sql'] for query in queries
+        if query['sql'].lstrip().upper().startswith(
+            ('INSERT', 'UPDATE', 'DELETE')
+        )
+    ]
+
+
+def stored(hotel):
+    return list(HotelCounter.objects.filter(hotel=hotel).values_list(
+        'date', 'views', 'impressions', 'bookings'
+    ))
+
+
+@pytest.fixture
+def other_hotel(city):
+    return Hotel.objects.create(name='Второй', city=city, address='Адрес')
+
+
+@pytest.mark.django_db
+def test_view_is_counted_in_memory_and_flushed_in_batch(
+    api_client, hotel, other_hotel
+):
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(3):
+            assert api_client.get(f'/hotels/{hotel.pk}/').status_code == 200
+        api_client.get(f'/hotels/{other_hotel.pk}/')
+    assert writes(queries) == []
+    assert HotelCounter.objects.count() == 0
+
+    with CaptureQueriesContext(connection) as queries:
+        assert counters.buffer.flush() == 2
+    # INSERT недостающих корзин и одно UPDATE на пачку
+    assert len(writes(queries)) == 2
+
+    today = timezone.localdate()
+    assert stored(hotel) == [(today, 3, 0, 0)]
+    assert stored(other_hotel) == [(today, 1, 0, 0)]
+
+    # Повторный сброс прибавляет к существующей корзине
+    counters.record('views', [hotel.pk])
+    counters.record('impressions', [hotel.pk, hotel.pk])
+    counters.buffer.flush()
+    assert stored(hotel) == [(today, 4, 2, 0)]
+    assert counters.buffer.flush() == 0
+
+
+@pytest.mark.django_db
+def test_flush_skips_deleted_hotels(hotel, other_hotel, settings):
+    settings.POPULARITY_FLUSH_BATCH_SIZE = 1
+    counters.record('views', [hotel.pk, other_hotel.pk])
+    other_hotel.delete()
+    assert counters.buffer.flush() == 1
+    assert HotelCounter.objects.get().hotel == hotel
+
+
+@pytest.mark.django_db
+def test_search_and_bookings_are_counted(
+    api_client, user, hotel, room, django_capture_on_commit_callbacks
+):
+    api_client.get('/search/', {
+        'city_id': hotel.city_id, 'check_in': '2030-01-01',
+        'check_out': '2030-01-03', 'guests': 2,
+    })
+    api_client.force_authenticate(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post('/bookings/', {
+            'room': room.pk, 'start_date': '2030-02-01',
+            'end_date': '2030-02-03', 'guests': 1, 'first_name': 'Иван',
+            'last_name': 'Иванов', 'phone': '+70000000000',
+        }, format='json')
+    assert response.status_code == 201
+
+    counters.buffer.flush()
+    assert stored(hotel) == [(timezone.localdate(), 0, 1, 1)]
+
+
+@pytest.mark.django_db
+def test_hotel_list_sorted_by_counters(api_client, hotel, other_hotel):
+    old = timezone.localdate() - timedelta(days=10)
+    HotelCounter.objects.create(hotel=hotel, date=old, views=100)
+    HotelCounter.objects.create(
+        hotel=hotel, date=timezone.localdate(), views=1, bookings=1
+    )
+    HotelCounter.objects.create(
+        hotel=other_hotel, date=timezone.localdate(), views=5
+    )
+
+    def ids(sort):
+        response = api_client.get('/hotels/', {'sort': sort})
+        return [item['id'] for item in response.data]
+
+    assert ids('views') == [other_hotel.pk, hotel.pk]
+    assert ids('bookings') == [hotel.pk, other_hotel.pk]
+    # 1 * 10 + 1 * 100 против 5 * 10
+    assert ids('popularity') == [hotel.pk, other_hotel.pk]
+    assert api_client.get('/hotels/', {'sort': 'name'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_cleanup_removes_old_buckets(hotel, settings):
+    today = timezone.localdate()
+    days = settings.POPULARITY_RETENTION_DAYS + 1
+    HotelCounter.objects.create(hotel=hotel, date=today - timedelta(days=days))
+    HotelCounter.objects.create(hotel=hotel, date=today)
+    counters.cleanup()
+    assert stored(hotel) == [(today, 0, 0, 0)]
+
+
+@pytest.mark.django_db
+def test_flushed_at_request_end_without_thread(
+    api_client, hotel, other_hotel, settings
+):
+    settings.POPULARITY_FLUSH_ON_REQUEST = True
+    settings.POPULARITY_FLUSH_MAX_PENDING = 2
+    settings.POPULARITY_FLUSH_MAX_AGE = 3600
+
+    api_client.get(f'/hotels/{hotel.pk}/')
+    assert HotelCounter.objects.count() == 0
+    # Вторая корзина — порог по размеру
+    api_client.get(f'/hotels/{other_hotel.pk}/')
+    assert HotelCounter.objects.count() == 2
+
+    # Порог по возрасту
+    settings.POPULARITY_FLUSH_MAX_PENDING = 100
+    settings.POPULARITY_FLUSH_MAX_AGE = 0
+    api_client.get(f'/hotels/{hotel.pk}/')
+    assert stored(hotel) == [(timezone.localdate(), 2, 0, 0)]
@@ -0,0 +1,165 @@
+from datetime import date, timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.models import (
+    Booking,
+    Deletion,
+    Discount,
+    Hotel,
+    HotelDailyStats,
+    Review,
+    Room,
+    User,
+)
+
+
+@pytest.fixture
+def bookings(make_booking):
+    items = [make_booking(start=date(2030, 1, 1) + timedelta(days=3 * i))
+             for i in range(5)]
+    Review.objects.create(booking=items[0], text='Хорошо', rating=5)
+    return items
+
+
+@pytest.mark.django_db
+def test_api_hotel_deleted_in_batches(
+        api_client, manager, hotel, room, bookings, run_jobs, settings):
+    settings.DELETION_BATCH_SIZE = 2
+    settings.DELETION_BATCHES_PER_JOB = 2
+    api_client.force_authenticate(manager)
+
+    response = api_client.delete(f'/hotels/{hotel.pk}/')
+    assert response.status_code == 202
+    assert response.data['status'] == 'pending'
+
+    # Отель скрыт сразу, хотя ещё не удалён
+    assert api_client.get(f'/hotels/{hotel.pk}/').status_code == 404
+    assert api_client.get(f'/hotels/{hotel.pk}/rooms/').data == []
+    assert Hotel.objects.filter(pk=hotel.pk).exists()
+
+    assert api_client.delete(f'/hotels/{hotel.pk}/').status_code == 404
+
+    run_jobs()
+    progress = api_client.get(response['Location'])
+    assert progress.data['status'] == 'done'
+    assert progress.data['deleted']['api.Booking'] == 5
+    assert progress.data['deleted']['api.Hotel'] == 1
+    assert not Hotel.objects.filter(pk=hotel.pk).exists()
+    assert not Room.objects.exists()
+    assert not HotelDailyStats.objects.exists()
+
+
+@pytest.mark.django_db
+def test_deletion_resumes_in_next_job(hotel, room, bookings, settings,
+                                      manager):
+    from api import deletion
+
+    settings.DELETION_BATCH_SIZE = 2
+    settings.DELETION_BATCHES_PER_JOB = 1
+    item = deletion.schedule(hotel, manager)
+
+    assert deletion.run(item.pk) is False  # отзыв
+    assert deletion.run(item.pk) is False  # первые две брони
+    # Повторное удаление того же отеля — то же удаление
+    assert deletion.schedule(hotel, manager) == item
+    item.refresh_from_db()
+    assert item.status == Deletion.RUNNING
+    assert Booking.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_api_hotel_deletion_not_run_eagerly(
+        api_client, manager, hotel, room, bookings, settings, run_jobs,
+        django_capture_on_commit_callbacks):
+    settings.JOBS_EAGER = True
+    settings.DELETION_BATCH_SIZE = 2
+    settings.DELETION_BATCHES_PER_JOB = 1
+    api_client.force_authenticate(manager)
+
+    # Даже без воркера запрос только ставит удаление в очередь
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.delete(f'/hotels/{hotel.pk}/')
+    assert response.status_code == 202
+    assert Deletion.objects.get().status == Deletion.PENDING
+    assert Booking.objects.count() == len(bookings)
+
+    # Продолжения тоже идут в очередь, их выполняет тот же запуск воркера
+    run_jobs()
+    assert Deletion.objects.get().status == Deletion.DONE
+    assert not Hotel.objects.filter(pk=hotel.pk).exists()
+    assert not Booking.objects.exists()
+
+
+@pytest.mark.django_db
+def test_stale_deletion_resumed(hotel, room, bookings, manager, run_jobs,
+                                settings):
+    from api import deletion
+    from api.models import Job
+
+    settings.DELETION_BATCH_SIZE = 2
+    settings.DELETION_BATCHES_PER_JOB = 1
+    item = deletion.schedule(hotel, manager)
+    deletion.run(item.pk)
+    # Запрос прервался: продолжения в очереди нет
+    Job.objects.all().delete()
+    assert deletion.resume_stale() == 0
+
+    Deletion.objects.filter(pk=item.pk).update(
+        updated_at=timezone.now() - settings.DELETION_RESUME_AFTER * 2
+    )
+    assert deletion.resume_stale() == 1
+    run_jobs()
+    item.refresh_from_db()
+    assert item.status == Deletion.DONE
+    assert not Hotel.objects.filter(pk=hotel.pk).exists()
+
+
+@pytest.mark.django_db
+def test_api_room_deleted_in_background(
+        api_client, manager, hotel, room, bookings, run_jobs):
+    api_client.force_authenticate(manager)
+    response = api_client.delete(f'/hotels/{hotel.pk}/rooms/{room.pk}/')
+    assert response.status_code == 202
+    assert api_client.get(f'/hotels/{hotel.pk}/rooms/').data == []
+
+    run_jobs()
+    assert not Room.objects.exists()
+    assert Hotel.objects.filter(pk=hotel.pk).exists()
+
+
+@pytest.mark.django_db
+def test_api_user_deleted_in_background(
+        api_client, admin_user, user, bookings, run_jobs):
+    Discount.objects.create(
+        user=user, amount=10, expires_at=timezone.now() + timedelta(days=1)
+    )
+    api_client.force_authenticate(admin_user)
+
+    response = api_client.delete(f'/users/{user.pk}/')
+    assert response.status_code == 202
+    user.refresh_from_db()
+    assert not user.is_active
+    assert api_client.get(f'/users/{user.pk}/').status_code == 404
+
+    run_jobs()
+    assert not User.objects.filter(pk=user.pk).exists()
+    assert not Booking.objects.exists()
+    assert api_client.get(response['Location']).data['status'] == 'done'
+
+
+@pytest.mark.django_db
+def test_api_deletion_visible_to_requester_only(
+        api_client, manager, hotel, admin_user):
+    api_client.force_authenticate(manager)
+    url = api_client.delete(f'/hotels/{hotel.pk}/')['Location']
+
+    other = User.objects.create_user(
+        email='staff@example.com', username='staff', password='password123',
+        is_staff=True
+    )
+    api_client.force_authenticate(other)
+    assert api_client.get(url).status_code == 404
+    api_client.force_authenticate(admin_user)
+    assert api_client.get(url).status_code == 200
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import date
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient
+
+from api import events
+from api.models import Hotel
+
+
+@pytest.fixture
+def broker(settings, monkeypatch):
+    settings.EVENTS_BROKER = 'local'
+    monkeypatch.setattr(events, '_broker', None)
+    return events.get_broker()
+
+
+def collect(broker, hotel_id, action):
+    """События отеля, опубликованные во время action()."""
+    async def scenario():
+        subscription = broker.subscribe(hotel_id)
+        await sync_to_async(action)()
+        await asyncio.sleep(0)
+        received = []
+        while not subscription.queue.empty():
+            received.append(subscription.queue.get_nowait())
+        broker.unsubscribe(subscription)
+        return received
+    return async_to_sync(scenario)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_booking_events(broker, hotel, room, make_booking):
+    period = {'room': room.pk, 'start': '2030-01-01', 'end': '2030-01-03'}
+    booking = None
+
+    def create():
+        nonlocal booking
+        booking = make_booking(start=date(2030, 1, 1), status='pending')
+
+    assert collect(broker, hotel.pk, create) == [
+        {'event': 'booked', **period, 'status': 'pending'}
+    ]
+
+    def confirm():
+        booking.status = 'confirmed'
+        booking.save(update_fields=['status'])
+
+    assert collect(broker, hotel.pk, confirm) == [
+        {'event': 'status', **period, 'status': 'confirmed'}
+    ]
+
+    def move():
+        booking.end_date = date(2030, 1, 5)
+        booking.save()
+
+    assert collect(broker, hotel.pk, move) == [
+        {'event': 'released', **period},
+        {'event': 'booked', **period, 'end': '2030-01-05',
+         'status': 'confirmed'},
+    ]
+
+    assert collect(broker, hotel.pk + 1, booking.save) == []
+    assert collect(broker, hotel.pk, booking.delete) == [
+        {'event': 'released', **period, 'end': '2030-01-05'}
+    ]
+    assert broker.subscriber_count == 0
+
+
+@pytest.mark.django_db
+def test_events_published_only_after_commit(
+        broker, hotel, make_booking, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        assert collect(broker, hotel.pk, make_booking) == []
+    assert len(callbacks) == 1
+
+
+def test_slow_subscriber_gets_reset(broker, settings):
+    settings.EVENTS_QUEUE_SIZE = 2
+
+    async def scenario():
+        subscription = broker.subscribe(1)
+        for i in range(3):
+            broker.publish(1, {'event': 'booked', 'room': i})
+        await asyncio.sleep(0)
+        return subscription.queue.get_nowait(), subscription.queue.empty()
+
+    assert async_to_sync(scenario)() == ({'event': 'reset'}, True)
+
+
+def test_encode():
+    assert events.encode({'event': 'released', 'room': 1}) == (
+        b'event: released\ndata: {"room":1}\n\n'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_hotel_events_stream(broker, hotel, room, make_booking):
+    async def scenario():
+        response = await AsyncClient().get(f'/hotels/{hotel.pk}/events/')
+        assert response['Content-Type'] == 'text/event-stream'
+        stream = aiter(response.streaming_content)
+        assert await anext(stream) == b'retry: 3000\n\n'
+
+        read = asyncio.ensure_future(anext(stream))
+        await sync_to_async(make_booking)(start=date(2030, 1, 1))
+        chunk = await asyncio.wait_for(read, 1)
+        await stream.aclose()
+        return chunk
+
+    chunk = async_to_sync(scenario)()
+    assert chunk.startswith(b'event: booked\ndata: {"room":%d' % room.pk)
+    assert broker.subscriber_count == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_hotel_events_hidden_while_deleting(broker, hotel):
+    Hotel.objects.filter(pk=hotel.pk).update(is_deleting=True)
+
+    async def scenario():
+        return await AsyncClient().get(f'/hotels/{hotel.pk}/events/')
+
+    assert async_to_sync(scenario)().status_code == 404
+    assert broker.subscriber_count == 0
+
+
+@pytest.mark.django_db
+def test_api_hotel_events_require_asgi(api_client, hotel):
+    assert api_client.get(f'/hotels/{hotel.pk}/events/').status_code == 501
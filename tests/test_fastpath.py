@@ -0,0 +1,111 @@
+from datetime import date
+
+import pytest
+from rest_framework import serializers
+
+from api.fastpath import RowMapper, UnsupportedField
+from api.models import City, Review
+
+
+@pytest.fixture
+def catalog(hotel, room, user, make_booking):
+    make_booking(start=date(2030, 1, 1))
+    booking = make_booking(start=date(2030, 2, 1))
+    Review.objects.create(booking=booking, text='Хорошо', rating=4)
+    return hotel
+
+
+def render(api_client, settings, fast, url, params):
+    settings.FAST_LIST_SERIALIZATION = fast
+    response = api_client.get(url, params)
+    assert response.status_code == 200
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    response.render()
+    return response.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, params', [
+    ('/hotels/', {}),
+    ('/hotels/', {'fields': 'id,city'}),
+    ('/hotels/{hotel}/rooms/', {}),
+    ('/hotels/{hotel}/rooms/', {
+        'check_in': '2030-03-01', 'check_out': '2030-03-02', 'guests': 1
+    }),
+    ('/hotels/{hotel}/reviews/', {}),
+    ('/cities/', {}),
+    ('/bookings/', {}),
+    ('/bookings/', {'omit': 'room'}),
+])
+def test_api_fast_list_is_byte_identical(
+        api_client, settings, catalog, user, url, params):
+    api_client.force_authenticate(user)
+    url = url.format(hotel=catalog.pk)
+
+    slow = render(api_client, settings, False, url, params)
+    fast = render(api_client, settings, True, url, params)
+
+    assert fast == slow
+    assert len(fast) > 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', ['/hotels/', '/bookings/'])
+def test_api_fast_list_streams_large_lists(
+        api_client, settings, catalog, user, url):
+    api_client.force_authenticate(user)
+    slow = render(api_client, settings, False, url, {})
+
+    settings.JSON_STREAM_CHUNK_SIZE = 1
+    settings.FAST_LIST_SERIALIZATION = True
+    response = api_client.get(url)
+    assert response.streaming
+    assert response['Content-Type'] == 'application/json'
+    assert b''.join(response.streaming_content) == slow
+
+
+@pytest.mark.django_db
+def test_api_streamed_list_keeps_drf_headers(
+        api_client, settings, catalog, user):
+    api_client.force_authenticate(user)
+    settings.FAST_LIST_SERIALIZATION = True
+    regular = api_client.get('/bookings/')
+    assert not regular.streaming
+
+    # Список больше порога потоковой отдачи
+    settings.JSON_STREAM_CHUNK_SIZE = 1
+    streamed = api_client.get('/bookings/')
+    assert streamed.streaming
+    for header in ('Allow', 'Content-Type'):
+        assert streamed[header] == regular[header]
+    # Vary от DRF; сжатие потока добавляет к нему Accept-Encoding
+    assert streamed['Vary'].startswith(regular['Vary'])
+
+    response = api_client.get('/bookings/', HTTP_ACCEPT='application/xml')
+    assert response.status_code == 406
+
+
+class OverriddenCitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = City
+        fields = ('id', 'name')
+        sparse_sources = {'name': ('name',)}
+        fast_readers = {'name': lambda name: name}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['name'] = data['name'].upper()
+        return data
+
+
+def test_overridden_representation_disables_fast_path():
+    # fast_readers есть, но to_representation ими не повторён
+    with pytest.raises(UnsupportedField):
+        RowMapper(OverriddenCitySerializer(), City)
+
+    class OptedIn(OverriddenCitySerializer):
+        class Meta(OverriddenCitySerializer.Meta):
+            fast_representation = True
+
+    assert RowMapper(OptedIn(), City).columns == ['id', 'name']
@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+def test_api_hotel_list_sparse_fields(api_client, hotel):
+    response = api_client.get('/hotels/', {'fields': 'id,name'})
+    assert response.status_code == 200
+    assert response.data == [{'id': hotel.pk, 'name': hotel.name}]
+
+    with CaptureQueriesContext(connection) as ctx:
+        api_client.get('/hotels/', {'fields': 'id,name'})
+    sql = ctx.captured_queries[0]['sql']
+    assert 'description' not in sql
+    assert 'JOIN' not in sql
+
+
+@pytest.mark.django_db
+def test_api_hotel_list_omit_fields(api_client, hotel):
+    response = api_client.get(
+        '/hotels/', {'omit': 'description,image,latitude,longitude'}
+    )
+    assert set(response.data[0]) == {'id', 'name', 'city', 'address', 'rating'}
+    assert response.data[0]['city'] == {'name': 'Москва', 'country': 'Россия'}
+
+    full = api_client.get('/hotels/')
+    assert set(full.data[0]) == {
+        'id', 'name', 'city', 'address', 'latitude', 'longitude',
+        'description', 'image', 'rating'
+    }
+
+
+@pytest.mark.django_db
+def test_api_bookings_sparse_fields(
+        api_client, user, make_booking, django_assert_num_queries):
+    for i in range(3):
+        make_booking(start=None, nights=1 + i)
+    api_client.force_authenticate(user)
+
+    # Текущие и архивные брони — один запрос (UNION ALL)
+    with django_assert_num_queries(1):
+        response = api_client.get('/bookings/', {'fields': 'id,status'})
+    assert response.data[0] == {'id': response.data[0]['id'], 'status': 'confirmed'}
+
+    # Полный набор полей — тоже без запросов на каждую бронь
+    with django_assert_num_queries(1):
+        response = api_client.get('/bookings/')
+    assert response.data[0]['email'] == user.email
+    assert response.data[0]['has_review'] is False
+    assert response.data[0]['room']['room_type'] == 'Стандарт'
+
+
+@pytest.mark.django_db
+def test_api_search_sparse_fields(api_client, hotel, room, city):
+    response = api_client.get('/search/', {
+        'city_id': city.pk,
+        'check_in': '2030-01-01',
+        'check_out': '2030-01-03',
+        'guests': 2,
+        'fields': 'id,city',
+    })
+    assert response.data == [
+        {'id': hotel.pk, 'city': {'name': 'Москва', 'country': 'Россия'}}
+    ]
@@ -0,0 +1,147 @@
+import pytest
+
+from api import geo
+from api.models import Hotel
+
+
+SEARCH = {'check_in': '2030-01-01', 'check_out': '2030-01-03', 'guests': 1}
+
+
+@pytest.fixture
+def places(hotel, room, city):
+    # Гранд — у Кремля, остальные в 5 и 40 км от него
+    hotel.latitude, hotel.longitude = 55.7520, 37.6175
+    hotel.save()
+    near = Hotel.objects.create(
+        name='Ближний', city=city, address='Адрес',
+        latitude=55.7970, longitude=37.6175
+    )
+    far = Hotel.objects.create(
+        name='Дальний', city=city, address='Адрес',
+        latitude=55.7520, longitude=38.2500
+    )
+    for other in (near, far):
+        other.rooms.create(
+            room_type='Стандарт', capacity=2, description='Номер',
+            price=100, image='rooms/temp.jpeg'
+        )
+    return hotel, near, far
+
+
+def test_encode_known_value():
+    assert geo.encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+
+def test_next_prefix():
+    assert geo.next_prefix('u4p') == 'u4q'
+    assert geo.next_prefix('u4z') == 'u5'
+    assert geo.next_prefix('zz') is None
+
+
+def test_covering_cells_contain_box_points():
+    box = geo.bounding_box(55.75, 37.62, 10)
+    cells = geo.covering_cells(*box)
+    assert len(cells) <= 16
+    for lat in (box[0], 55.75, box[2]):
+        for lon in (box[1], 37.62, box[3]):
+            assert any(geo.encode(lat, lon).startswith(c) for c in cells)
+
+
+def test_bounding_box_wraps_antimeridian():
+    min_lat, min_lon, max_lat, max_lon = geo.bounding_box(65.0, 179.95, 10)
+    assert min_lon > max_lon
+    assert 179 < min_lon < 180 and -180 < max_lon < -179
+    assert geo.split_box(min_lat, min_lon, max_lat, max_lon) == [
+        (min_lat, min_lon, max_lat, 180.0),
+        (min_lat, -180.0, max_lat, max_lon),
+    ]
+
+
+def test_haversine():
+    # Москва — Санкт-Петербург
+    assert geo.haversine(55.7558, 37.6173, 59.9343, 30.3351) == pytest.approx(
+        634, abs=2
+    )
+
+
+@pytest.mark.django_db
+def test_hotel_geohash_saved(places):
+    hotel, _, _ = places
+    assert hotel.geohash == geo.encode(55.7520, 37.6175)
+
+    hotel.latitude = None
+    hotel.save(update_fields=['latitude'])
+    hotel.refresh_from_db()
+    assert hotel.geohash == ''
+
+
+@pytest.mark.django_db
+def test_search_by_radius(api_client, places):
+    hotel, near, far = places
+    response = api_client.get(
+        '/search/',
+        {**SEARCH, 'lat': 55.7520, 'lon': 37.6175, 'radius': 10,
+         'sort': 'distance'}
+    )
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data] == [hotel.pk, near.pk]
+    assert response.data[0]['distance'] == 0
+    assert response.data[1]['distance'] == pytest.approx(5.0, abs=0.05)
+
+
+@pytest.mark.django_db
+def test_search_by_bbox(api_client, places):
+    _, _, far = places
+    response = api_client.get(
+        '/search/', {**SEARCH, 'bbox': '55.7,38.0,55.8,38.5'}
+    )
+    assert [item['id'] for item in response.data] == [far.pk]
+    assert 'distance' not in response.data[0]
+
+
+@pytest.mark.django_db
+def test_search_by_city_still_works(api_client, places, city):
+    response = api_client.get('/search/', {**SEARCH, 'city_id': city.pk})
+    assert len(response.data) == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'lat': 95, 'lon': 37},
+    {'lat': 55, 'lon': 37, 'radius': 1000},
+    {'lat': 55},
+    {'bbox': '1,2,3'},
+    {'city_id': 1, 'sort': 'distance'},
+])
+def test_search_invalid_geo(api_client, params):
+    response = api_client.get('/search/', {**SEARCH, **params})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_requires_area(api_client):
+    response = api_client.get('/search/', SEARCH)
+    assert response.data == {'error': 'Missing required parameters'}
+
+
+@pytest.mark.django_db
+def test_search_across_antimeridian(api_client, hotel, room, city):
+    # Чукотка: отели по обе стороны меридиана 180°, в ~4 км друг от друга
+    hotel.latitude, hotel.longitude = 65.0, 179.96
+    hotel.save()
+    east = Hotel.objects.create(
+        name='Восточный', city=city, address='Адрес',
+        latitude=65.0, longitude=-179.96
+    )
+    east.rooms.create(
+        room_type='Стандарт', capacity=2, description='Номер',
+        price=100, image='rooms/temp.jpeg'
+    )
+
+    response = api_client.get('/search/', {
+        **SEARCH, 'lat': 65.0, 'lon': 179.99, 'radius': 10, 'sort': 'distance'
+    })
+    assert [item['id'] for item in response.data] == [hotel.pk, east.pk]
+
+    response = api_client.get('/search/', {**SEARCH, 'bbox': '64,179,66,-179'})
+    assert {item['id'] for item in response.data} == {hotel.pk, east.pk}
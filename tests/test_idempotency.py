@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.models import Booking, Discount, IdempotencyKey, Review, User
+
+
+@pytest.fixture
+def booking_data(room):
+    return {
+        'room': room.pk,
+        'start_date': '2030-02-01',
+        'end_date': '2030-02-03',
+        'guests': 1,
+        'first_name': 'Иван',
+        'last_name': 'Иванов',
+        'phone': '+70000000000',
+    }
+
+
+def post_booking(api_client, data, key='key-1'):
+    return api_client.post(
+        '/bookings/', data, format='json', HTTP_IDEMPOTENCY_KEY=key
+    )
+
+
+@pytest.mark.django_db
+def test_repeated_key_replays_stored_response(api_client, user, booking_data):
+    api_client.force_authenticate(user)
+    Discount.objects.create(
+        user=user, amount=10, expires_at=timezone.now() + timedelta(days=1)
+    )
+
+    first = post_booking(api_client, booking_data)
+    assert first.status_code == 201
+    assert first.data['discount_applied'] is True
+
+    second = post_booking(api_client, booking_data)
+    assert second.status_code == 201
+    assert second['Idempotent-Replayed'] == 'true'
+    assert second.content == first.content
+    assert Booking.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_replay_from_browser_is_json(api_client, user, booking_data):
+    api_client.force_authenticate(user)
+    first = api_client.post(
+        '/bookings/', booking_data, format='json', HTTP_IDEMPOTENCY_KEY='key-1',
+        HTTP_ACCEPT='text/html'
+    )
+    assert first.status_code == 201
+
+    second = post_booking(api_client, booking_data)
+    assert second['Idempotent-Replayed'] == 'true'
+    assert second['Content-Type'] == 'application/json'
+    assert second.json()['id'] == first.data['id']
+
+
+@pytest.mark.django_db
+def test_key_with_different_payload_rejected(api_client, user, booking_data):
+    api_client.force_authenticate(user)
+    post_booking(api_client, booking_data)
+
+    response = post_booking(api_client, {**booking_data, 'guests': 2})
+    assert response.status_code == 422
+    assert Booking.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_keys_are_per_user(api_client, user, booking_data):
+    other = User.objects.create_user(
+        email='other@example.com', username='other', password='password123'
+    )
+    api_client.force_authenticate(user)
+    post_booking(api_client, booking_data)
+
+    api_client.force_authenticate(other)
+    response = post_booking(
+        api_client, {**booking_data, 'start_date': '2030-03-01',
+                     'end_date': '2030-03-02'}
+    )
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response
+    assert Booking.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_failed_request_can_be_retried(api_client, user, booking_data):
+    api_client.force_authenticate(user)
+    invalid = {**booking_data, 'end_date': '2030-01-01'}
+    assert post_booking(api_client, invalid).status_code == 400
+    assert not IdempotencyKey.objects.exists()
+
+    assert post_booking(api_client, booking_data).status_code == 201
+
+
+@pytest.mark.django_db
+def test_expired_key_runs_again(api_client, user, booking_data):
+    api_client.force_authenticate(user)
+    post_booking(api_client, booking_data)
+    IdempotencyKey.objects.update(expires_at=timezone.now())
+
+    response = post_booking(
+        api_client, {**booking_data, 'start_date': '2030-03-01',
+                     'end_date': '2030-03-02'}
+    )
+    assert response.status_code == 201
+    assert Booking.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_review_creation_is_idempotent(api_client, user, hotel, make_booking):
+    api_client.force_authenticate(user)
+    booking = make_booking()
+    data = {'booking': booking.pk, 'text': 'Отлично', 'rating': 5}
+
+    responses = [
+        api_client.post(
+            f'/hotels/{hotel.pk}/reviews/', data, format='json',
+            HTTP_IDEMPOTENCY_KEY='review-1'
+        )
+        for _ in range(2)
+    ]
+    assert [r.status_code for r in responses] == [201, 201]
+    assert Review.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_without_key_behaves_as_before(api_client, user, booking_data):
+    api_client.force_authenticate(user)
+    api_client.post('/bookings/', booking_data, format='json')
+    assert not IdempotencyKey.objects.exists()
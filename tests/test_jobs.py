@@ -0,0 +1,248 @@
+import base64
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+
+from api import jobs
+from api.models import Job, Hotel, Discount
+
+
+@pytest.fixture
+def flaky_task(monkeypatch):
+    calls = []
+
+    def flaky(value):
+        calls.append(value)
+        raise RuntimeError('сбой')
+
+    monkeypatch.setitem(
+        jobs.registry, 'flaky', jobs.Task('flaky', flaky, max_attempts=2)
+    )
+    return calls
+
+
+def png_data_uri():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.mark.django_db
+def test_jobs_dedup_key_collapses_pending(hotel):
+    first = jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk}, dedup_key='k')
+    second = jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk}, dedup_key='k')
+    assert first.pk == second.pk
+    assert Job.objects.count() == 1
+
+    jobs.enqueue('recompute_hotel_rating', {'hotel_id': 42}, dedup_key='k', replace=True)
+    assert Job.objects.get().kwargs == {'hotel_id': 42}
+
+    # Пока задача выполняется, такую же можно поставить снова
+    jobs.claim('w')
+    jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk}, dedup_key='k')
+    assert Job.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_jobs_claim_is_exclusive(hotel):
+    for i in range(3):
+        jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk})
+
+    first = jobs.claim('a', limit=2)
+    second = jobs.claim('b', limit=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not {job.pk for job in first} & {job.pk for job in second}
+    assert jobs.claim('c') == []
+    assert first[0].locked_by == 'a' and first[0].attempts == 1
+
+
+@pytest.mark.django_db
+def test_jobs_retry_with_backoff_then_fail(flaky_task, run_jobs, settings):
+    settings.JOBS_RETRY_BACKOFF = 10
+    job = jobs.enqueue('flaky', {'value': 1})
+
+    assert run_jobs() == 1
+    job.refresh_from_db()
+    assert job.status == Job.PENDING
+    assert job.run_at > timezone.now() + timedelta(seconds=5)
+    assert 'сбой' in job.last_error
+
+    # Задержка ещё не прошла — воркер задачу не берёт
+    assert run_jobs() == 0
+
+    Job.objects.update(run_at=timezone.now())
+    assert run_jobs() == 1
+    job.refresh_from_db()
+    assert job.status == Job.FAILED
+    assert job.attempts == 2
+    assert flaky_task == [1, 1]
+
+
+def test_jobs_retry_delay_grows():
+    assert [jobs.retry_delay(n).seconds for n in (1, 2, 3)] == [10, 20, 40]
+
+
+@pytest.mark.django_db
+def test_jobs_release_stale(hotel):
+    jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk})
+    [job] = jobs.claim('dead-worker')
+    Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+    jobs.release_stale(timeout=60)
+    job.refresh_from_db()
+    assert job.status == Job.PENDING
+
+
+@pytest.mark.django_db
+def test_jobs_periodic_scheduled_once_per_interval():
+    jobs.schedule_periodic()
+    jobs.schedule_periodic()
+    names = list(Job.objects.values_list('name', flat=True).order_by('name'))
+    assert names == [
+        'archive_bookings', 'cleanup_hotel_counters',
+        'cleanup_idempotency_keys', 'cleanup_jobs',
+        'cleanup_profiles', 'cleanup_rate_limits', 'expire_discounts',
+        'resume_deletions'
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_jobs_worker_command(user):
+
+    Discount.objects.create(
+        user=user, amount=10, expires_at=timezone.now() - timedelta(days=60)
+    )
+    Discount.objects.create(
+        user=user, amount=10, expires_at=timezone.now() + timedelta(days=1)
+    )
+    call_command(
+        'worker', '--burst', stdout=io.StringIO()
+    )
+    assert Discount.objects.count() == 1
+    assert set(Job.objects.values_list('status', flat=True)) == {Job.DONE}
+
+
+@pytest.mark.django_db
+def test_jobs_eager_mode(settings, hotel, django_capture_on_commit_callbacks):
+    settings.JOBS_EAGER = True
+    Hotel.objects.filter(pk=hotel.pk).update(rating=3)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk})
+
+    assert not Job.objects.exists()
+    hotel.refresh_from_db()
+    assert hotel.rating == 0.0
+
+
+@pytest.mark.django_db
+def test_jobs_eager_mode_collapses_and_logs_errors(
+        settings, hotel, monkeypatch, caplog,
+        django_capture_on_commit_callbacks):
+    settings.JOBS_EAGER = True
+    calls = []
+    monkeypatch.setitem(jobs.registry, 'recompute_hotel_rating', jobs.Task(
+        'recompute_hotel_rating', lambda hotel_id: calls.append(hotel_id)
+    ))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(3):
+            jobs.enqueue(
+                'recompute_hotel_rating', {'hotel_id': hotel.pk},
+                dedup_key=f'hotel-rating:{hotel.pk}'
+            )
+    assert calls == [hotel.pk]
+
+    def fail(hotel_id):
+        raise RuntimeError('сбой')
+
+    monkeypatch.setitem(jobs.registry, 'recompute_hotel_rating', jobs.Task(
+        'recompute_hotel_rating', fail
+    ))
+    with django_capture_on_commit_callbacks(execute=True):
+        jobs.enqueue('recompute_hotel_rating', {'hotel_id': hotel.pk})
+    assert 'recompute_hotel_rating' in caplog.text
+
+
+@pytest.mark.django_db
+def test_api_hotel_image_stored_in_background(
+        api_client, manager, city, run_jobs, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    api_client.force_authenticate(manager)
+
+    response = api_client.post('/hotels/', {
+        'name': 'Новый',
+        'city': city.name,
+        'address': 'Невский, 1',
+        'description': 'Описание',
+        'image': png_data_uri(),
+    }, format='json')
+    assert response.status_code == 201
+    assert response.data['image'].endswith('/media/placeholders/hotel_ph.jpg')
+
+    # Запрос ничего не записал: декодирование и запись — в задаче
+    assert Job.objects.get().kwargs['data'] == png_data_uri()
+    assert not any(tmp_path.iterdir())
+
+    assert run_jobs() == 1
+    hotel = Hotel.objects.get(pk=response.data['id'])
+    assert hotel.image.name.startswith('hotels/temp')
+    assert (tmp_path / hotel.image.name).exists()
+
+
+@pytest.mark.django_db
+def test_api_hotel_image_not_kept_when_other_field_fails(
+        api_client, manager, city, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    api_client.force_authenticate(manager)
+
+    response = api_client.post('/hotels/', {
+        'name': 'Новый',
+        'city': 'Атлантида',
+        'address': 'Невский, 1',
+        'description': 'Описание',
+        'image': png_data_uri(),
+    }, format='json')
+    assert response.status_code == 400
+    assert 'city' in response.data
+    assert not Job.objects.exists()
+    assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('image', [
+    'data:image/png;base64,' + base64.b64encode(b'nope').decode(),
+    'data:image/png;base64,не base64',
+    'data:image/png',
+])
+def test_api_hotel_invalid_image_rejected(api_client, manager, city, image):
+    api_client.force_authenticate(manager)
+    response = api_client.post('/hotels/', {
+        'name': 'Новый',
+        'city': city.name,
+        'address': 'Невский, 1',
+        'description': 'Описание',
+        'image': image,
+    }, format='json')
+    assert response.status_code == 400
+    assert 'image' in response.data
+    assert not Hotel.objects.exists()
+    assert not Job.objects.exists()
+
+
+@pytest.mark.django_db
+def test_api_hotel_image_too_large(api_client, manager, city, settings):
+    settings.IMAGE_MAX_SIZE = 10
+    api_client.force_authenticate(manager)
+    response = api_client.post('/hotels/', {
+        'name': 'Новый',
+        'city': city.name,
+        'address': 'Невский, 1',
+        'description': 'Описание',
+        'image': png_data_uri(),
+    }, format='json')
+    assert response.status_code == 400
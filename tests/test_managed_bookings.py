@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from api.models import Hotel, Room, User
+
+
+@pytest.fixture
+def other_room(city):
+    owner = User.objects.create_user(
+        email='owner@example.com', username='owner', password='password123',
+        is_staff=True
+    )
+    hotel = Hotel.objects.create(
+        name='Чужой', city=city, address='Арбат, 2', description='',
+        image='hotels/temp.jpeg', manager=owner
+    )
+    return Room.objects.create(
+        hotel=hotel, room_type='Стандарт', capacity=2, description='',
+        price=Decimal('80.00'), image='rooms/temp.jpeg'
+    )
+
+
+@pytest.mark.django_db
+def test_manager_sees_bookings_of_own_hotels(
+        api_client, manager, make_booking, other_room,
+        django_assert_max_num_queries):
+    late = make_booking(start=date(2030, 1, 10))
+    early = make_booking(start=date(2030, 1, 1), status='pending')
+    make_booking(start=date(2030, 1, 5), room=other_room)
+
+    api_client.force_authenticate(manager)
+    with django_assert_max_num_queries(5):
+        response = api_client.get('/bookings/managed/')
+    assert response.status_code == 200
+    assert response.data['count'] == 2
+    assert [item['id'] for item in response.data['results']] == [
+        early.pk, late.pk
+    ]
+
+
+@pytest.mark.django_db
+def test_managed_bookings_filters(api_client, manager, make_booking):
+    first = make_booking(start=date(2030, 1, 1), nights=3)
+    second = make_booking(start=date(2030, 1, 10), status='pending')
+    make_booking(start=date(2030, 2, 1))
+    api_client.force_authenticate(manager)
+
+    def ids(**params):
+        response = api_client.get('/bookings/managed/', params)
+        return [item['id'] for item in response.data['results']]
+
+    assert ids(start='2030-01-03', end='2030-01-11') == [first.pk, second.pk]
+    assert ids(start='2030-01-03', end='2030-01-11', status='pending') == [
+        second.pk
+    ]
+    assert ids(page_size=1, page=2)[0] == second.pk
+
+
+@pytest.mark.django_db
+def test_managed_bookings_validation(api_client, manager):
+    api_client.force_authenticate(manager)
+    for params in (
+        {'start': '2030-13-01'},
+        {'start': '2030-01-10', 'end': '2030-01-01'},
+        {'status': 'lost'},
+    ):
+        response = api_client.get('/bookings/managed/', params)
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_managed_bookings_require_staff(api_client, user):
+    api_client.force_authenticate(user)
+    assert api_client.get('/bookings/managed/').status_code == 403
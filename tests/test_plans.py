@@ -0,0 +1,54 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api import plans
+
+
+@pytest.fixture
+def snapshots(settings, tmp_path):
+    settings.PLAN_SNAPSHOT_DIR = tmp_path
+    return tmp_path / 'sqlite'
+
+
+@pytest.mark.django_db
+def test_explain_snapshots(snapshots):
+    call_command('explain_snapshots', '--update')
+    assert {path.stem for path in snapshots.iterdir()} == {
+        scenario.name for scenario in plans.SCENARIOS
+    }
+    call_command('explain_snapshots')
+
+    path = snapshots / 'search_city.txt'
+    path.write_text(path.read_text().replace('SEARCH', 'SCAN', 1))
+    with pytest.raises(CommandError, match='search_city: план изменился'):
+        call_command('explain_snapshots', 'search_city')
+
+
+@pytest.mark.django_db
+def test_explain_snapshots_missing(snapshots):
+    with pytest.raises(CommandError, match='нет снимка'):
+        call_command('explain_snapshots', 'rooms', '--hotels', '5')
+
+
+def test_explain_snapshots_unknown_scenario():
+    with pytest.raises(CommandError, match='Неизвестные сценарии: nope'):
+        call_command('explain_snapshots', 'nope')
+
+
+def test_full_scans_resolve_aliases():
+    sql = 'SELECT 1 FROM "api_hotel" WHERE EXISTS(SELECT 1 FROM "api_room" V0)'
+    queries = [(sql, ['SCAN api_hotel', '  SCAN V0', '  SEARCH U0 USING INDEX x'])]
+    assert plans.full_scans(queries) == ['api_hotel', 'api_room']
+    assert plans.full_scans(queries, frozenset({'api_hotel'})) == ['api_room']
+    assert plans.full_scans([(sql, ['SCAN api_city'])]) == []
+
+
+def test_normalize():
+    assert plans.normalize(
+        'SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 5 AND y = \'a\''
+    ) == 'SELECT * FROM t WHERE id IN (?, ...) AND x = ? AND y = ?'
+
+
+@pytest.mark.django_db
+def test_committed_snapshots_are_current():
+    call_command('explain_snapshots')
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from api import pricing
+from api.models import Booking, Discount, RateRule, Room
+
+
+@pytest.fixture
+def rules(hotel, room):
+    # 2030-01-04 — пятница, 2030-01-05 — суббота
+    return [
+        RateRule.objects.create(hotel=hotel, weekdays='45', percent=20),
+        RateRule.objects.create(
+            hotel=hotel, name='Праздники', start_date=date(2030, 1, 1),
+            end_date=date(2030, 1, 3), percent=50
+        ),
+        RateRule.objects.create(
+            hotel=hotel, room=room, min_nights=7, percent=-10
+        ),
+    ]
+
+
+@pytest.mark.django_db
+def test_quote_per_night_rates(rules, room):
+    quote = pricing.quote(room, date(2030, 1, 1), date(2030, 1, 8))
+
+    # 2 праздничные ночи, пятница и суббота, 3 обычные; скидка за неделю
+    assert quote.rates == [
+        (Decimal('100.00'), 3), (Decimal('120.00'), 2), (Decimal('150.00'), 2)
+    ]
+    assert quote.subtotal == Decimal('840.00')
+    assert quote.stay_discount == Decimal(10)
+    assert quote.total == Decimal('756.00')
+
+
+@pytest.mark.django_db
+def test_quote_many_shares_hotel_rules(rules, hotel, room,
+                                       django_assert_num_queries):
+    other = Room.objects.create(
+        hotel=hotel, room_type='Люкс', capacity=2, description='',
+        price=Decimal('200.00'), image='rooms/temp.jpeg'
+    )
+    with django_assert_num_queries(1):
+        quotes = pricing.quote_many(
+            [room, other], date(2030, 1, 4), date(2030, 1, 11), discount=5
+        )
+
+    # Скидка за неделю — только у номера с правилом
+    assert [quote.stay_discount for quote in quotes] == [10, 0]
+    assert quotes[1].subtotal == Decimal('1480.00')
+    assert quotes[1].total == Decimal('1406.00')
+
+
+@pytest.mark.django_db
+def test_quote_without_rules(room):
+    quote = pricing.quote(room, date(2030, 3, 1), date(2030, 3, 3))
+    assert quote.rates == [(Decimal('100.00'), 2)]
+    assert quote.total == Decimal('200.00')
+
+
+@pytest.mark.django_db
+def test_api_quote(api_client, user, rules, hotel, room):
+    Discount.objects.create(
+        user=user, amount=10, expires_at=timezone.now() + timedelta(days=1)
+    )
+    params = {'hotel': hotel.pk, 'check_in': '2030-01-04',
+              'check_out': '2030-01-06'}
+
+    response = api_client.get('/quote/', params)
+    assert response.status_code == 200
+    assert response.json()['results'] == [{
+        'room': room.pk, 'nights': 2,
+        'rates': [{'price': 120.0, 'nights': 2}],
+        'subtotal': 240.0, 'stay_discount': 0.0, 'discount': 0,
+        'total_price': 240.0,
+    }]
+
+    api_client.force_authenticate(user)
+    result = api_client.get('/quote/', params).json()['results'][0]
+    assert result['discount'] == 10
+    assert result['total_price'] == 216.0
+
+
+@pytest.mark.django_db
+def test_api_quote_validation(api_client, room):
+    response = api_client.get(
+        '/quote/', {'check_in': '2030-01-04', 'check_out': '2030-01-06'}
+    )
+    assert response.status_code == 400
+
+    response = api_client.get('/quote/', {
+        'room': room.pk, 'check_in': '2030-01-06', 'check_out': '2030-01-04'
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_booking_charges_quoted_price(api_client, user, rules, room):
+    api_client.force_authenticate(user)
+    dates = {'check_in': '2030-01-01', 'check_out': '2030-01-08'}
+    quoted = api_client.get('/quote/', {'room': room.pk, **dates}).json()
+
+    response = api_client.post('/bookings/', {
+        'room': room.pk, 'start_date': dates['check_in'],
+        'end_date': dates['check_out'], 'guests': 1, 'first_name': 'Иван',
+        'last_name': 'Иванов', 'phone': '+70000000000',
+    }, format='json')
+    assert response.status_code == 201
+    assert Booking.objects.get().total_price == Decimal(
+        str(quoted['results'][0]['total_price'])
+    )
@@ -0,0 +1,74 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import state
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import RequestProfile
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    # В тестах SECRET_KEY из окружения не задан
+    monkeypatch.setattr(state.token_backend, 'signing_key', 'test-key')
+    monkeypatch.setattr(state.token_backend, 'verifying_key', 'test-key')
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING_ENABLED = True
+    settings.RATE_LIMIT_ENABLED = False
+
+
+def jwt_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@pytest.mark.django_db
+def test_profile_recorded_for_staff(profiling, manager, hotel, room):
+    client = jwt_client(manager)
+
+    response = client.get(
+        f'/hotels/{hotel.pk}/rooms/',
+        {'check_in': '2030-01-01', 'check_out': '2030-01-02', 'guests': 1},
+        HTTP_X_PROFILE='1'
+    )
+    assert response.status_code == 200
+    assert response['Server-Timing'].startswith('total;dur=')
+
+    profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+    assert profile.user == manager
+    assert profile.path.startswith(f'/hotels/{hotel.pk}/rooms/')
+    assert profile.query_count == len(profile.report['queries']) > 0
+
+    rooms_query = next(
+        query for query in profile.report['queries']
+        if 'api_room' in query['sql']
+    )
+    assert any('in list' in frame for frame in rooms_query['stack'])
+    assert all(frame.startswith('api/') for frame in rooms_query['stack'])
+    assert profile.report['explain']
+    assert profile.report['functions'][0]['cumulative_ms'] > 0
+
+    detail = client.get(f'/profiles/{profile.pk}/').json()
+    assert detail['queries'] == profile.report['queries']
+    assert client.get('/profiles/').json()[0]['id'] == str(profile.pk)
+
+
+@pytest.mark.django_db
+def test_profile_ignored_for_non_staff(profiling, user, hotel):
+    for client in (APIClient(), jwt_client(user)):
+        response = client.get('/hotels/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response
+
+    assert not RequestProfile.objects.exists()
+    assert jwt_client(user).get('/profiles/').status_code == 403
+
+
+@pytest.mark.django_db
+def test_profiling_disabled_by_default(manager, hotel):
+    response = jwt_client(manager).get('/hotels/', HTTP_X_PROFILE='1')
+    assert 'X-Profile-Id' not in response
+    assert not RequestProfile.objects.exists()
@@ -0,0 +1,58 @@
+import io
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+
+
+PAYLOAD = {
+    'price': Decimal('100.50'),
+    'start_date': date(2030, 1, 1),
+    'created_at': datetime(2030, 1, 1, 12, 30, 0, 123, tzinfo=timezone.utc),
+    'expires_at': datetime(2030, 1, 1, 12, 30, tzinfo=ZoneInfo('Europe/Moscow')),
+    'naive': datetime(2030, 1, 1, 12, 30),
+    'duration': timedelta(hours=1),
+    'detail': gettext_lazy('Not found.'),
+    'text': 'Отель у моря с видом',
+    'histogram': {1: 0, 5: 3},
+    'items': [1, 2.5, None, True, ('a', 'b')],
+}
+
+
+def test_orjson_renderer_matches_drf_output():
+    assert ORJSONRenderer().render(PAYLOAD) == JSONRenderer().render(PAYLOAD)
+    assert ORJSONRenderer().render(None) == b''
+
+
+def test_orjson_renderer_indent_falls_back():
+    rendered = ORJSONRenderer().render(
+        PAYLOAD, 'application/json; indent=4', {}
+    )
+    assert rendered == JSONRenderer().render(
+        PAYLOAD, 'application/json; indent=4', {}
+    )
+
+
+@pytest.mark.parametrize('size', [0, 1, 5, 6, 13])
+def test_orjson_renderer_chunks(size):
+    items = [{'id': i, 'price': Decimal(i)} for i in range(size)]
+    chunks = list(ORJSONRenderer().render_chunks(iter(items), chunk_size=3))
+    assert b''.join(chunks) == JSONRenderer().render(items)
+
+
+def test_orjson_parser():
+    body = '{"guests": 2, "name": "Иван", "price": 10.5}'.encode()
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(
+        io.BytesIO(body)
+    )
+
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"guests": '))
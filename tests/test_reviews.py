@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+
+from api.models import User, Review, HotelRating
+
+
+def make_reviews(make_booking, room, ratings):
+    reviews = []
+    offset = Review.objects.count()
+    for i, rating in enumerate(ratings, start=offset):
+        user = User.objects.create_user(
+            email=f'reviewer{i}@example.com',
+            username=f'reviewer{i}',
+            password='password123'
+        )
+        booking = make_booking(
+            start=date(2030, 1, 1) + timedelta(days=3 * i),
+            user=user
+        )
+        reviews.append(
+            Review.objects.create(booking=booking, text='Ок', rating=rating)
+        )
+    return reviews
+
+
+@pytest.mark.django_db
+def test_api_reviews_list_constant_queries(
+        api_client, hotel, room, make_booking, django_assert_num_queries):
+    make_reviews(make_booking, room, [5, 4, 3])
+    url = f'/hotels/{hotel.pk}/reviews/'
+
+    with django_assert_num_queries(1):
+        response = api_client.get(url)
+    assert response.status_code == 200
+    assert len(response.data) == 3
+
+    make_reviews(make_booking, room, [1] * 5)
+    with django_assert_num_queries(1):
+        response = api_client.get(url)
+    assert len(response.data) == 3 + 5
+    assert response.data[0]['hotel'] == hotel.name
+
+
+@pytest.mark.django_db
+def test_api_reviews_summary(api_client, hotel, room, make_booking, run_jobs):
+    reviews = make_reviews(make_booking, room, [5, 5, 4, 2])
+    # Четыре отзыва одного отеля схлопываются в один пересчёт
+    assert run_jobs() == 1
+
+    response = api_client.get(f'/hotels/{hotel.pk}/reviews/summary/')
+    assert response.status_code == 200
+    assert response.data['count'] == 4
+    assert response.data['average'] == 4.0
+    assert response.data['histogram'] == {'1': 0, '2': 1, '3': 0, '4': 1, '5': 2}
+
+    # Изменение и удаление отзывов поддерживают агрегат
+    reviews[0].rating = 1
+    reviews[0].save()
+    reviews[1].booking.delete()
+    run_jobs()
+
+    summary = HotelRating.objects.get(hotel=hotel)
+    assert (summary.count, summary.total) == (3, 7)
+    assert summary.histogram == {'1': 1, '2': 1, '3': 0, '4': 1, '5': 0}
+    hotel.refresh_from_db()
+    assert hotel.rating == 2.33
+
+    hotel.update_rating()
+    assert HotelRating.objects.get(hotel=hotel).histogram == summary.histogram
+
+
+@pytest.mark.django_db
+def test_api_reviews_summary_empty(api_client, hotel):
+    response = api_client.get(f'/hotels/{hotel.pk}/reviews/summary/')
+    assert response.status_code == 200
+    assert response.data['count'] == 0
+    assert response.data['average'] == 0.0
+
+    response = api_client.get('/hotels/999/reviews/summary/')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_rebuild_hotel_ratings_backfills_existing_reviews(
+        hotel, room, make_booking):
+    # Отзывы, оставленные до появления агрегата: фоновые пересчёты
+    # не выполнялись
+    make_reviews(make_booking, room, [5, 3])
+    assert not HotelRating.objects.exists()
+
+    out = StringIO()
+    call_command('rebuild_hotel_ratings', stdout=out)
+    assert 'Пересчитано отелей: 1' in out.getvalue()
+
+    summary = HotelRating.objects.get(hotel=hotel)
+    assert (summary.count, summary.total) == (2, 8)
+    hotel.refresh_from_db()
+    assert hotel.rating == 4.0
+
+
+@pytest.mark.django_db
+def test_second_review_for_booking_is_validation_error(make_booking):
+    booking = make_booking()
+    Review.objects.create(booking=booking, text='Ок', rating=5)
+    with pytest.raises(ValidationError) as error:
+        Review.objects.create(booking=booking, text='Ещё', rating=1)
+    assert 'booking' in error.value.message_dict
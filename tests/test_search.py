@@ -0,0 +1,252 @@
+import io
+from datetime import date, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from api import counters, search
+from api.models import City, Discount, Hotel, RateRule, Room
+
+
+def make_hotel(city, name, description='', rooms=()):
+    hotel = Hotel.objects.create(
+        name=name, city=city, address='Адрес', description=description
+    )
+    for room_type, description in rooms:
+        Room.objects.create(
+            hotel=hotel, room_type=room_type, capacity=2,
+            description=description, price=100, image='rooms/temp.jpeg'
+        )
+    return hotel
+
+
+def ids(response):
+    return [item['id'] for item in response.data['results']]
+
+
+@pytest.fixture
+def catalog(city):
+    spa = make_hotel(
+        city, 'Спа Резорт', 'Бассейн и сауна',
+        rooms=[('Люкс', 'Вид на море')]
+    )
+    sea = make_hotel(
+        city, 'Прибрежный', 'Тихий отель у моря',
+        rooms=[('Стандарт', 'Сауна на этаже')]
+    )
+    plain = make_hotel(city, 'Центральный', 'Рядом с вокзалом')
+    return spa, sea, plain
+
+
+@pytest.mark.django_db
+def test_search_ranks_name_above_description(api_client, catalog):
+    spa, sea, plain = catalog
+    response = api_client.get('/search/', {'q': 'сауна'})
+    assert response.status_code == 200
+    assert ids(response) == [spa.pk, sea.pk]
+    assert response.data['count'] == 2
+
+
+@pytest.mark.django_db
+def test_search_matches_rooms_and_tracks_changes(api_client, catalog):
+    spa, sea, plain = catalog
+    assert ids(api_client.get('/search/', {'q': 'Люкс'})) == [spa.pk]
+
+    Room.objects.create(
+        hotel=plain, room_type='Люкс', capacity=2,
+        description='', price=100, image='rooms/temp.jpeg'
+    )
+    spa.rooms.all().delete()
+    assert ids(api_client.get('/search/', {'q': 'Люкс'})) == [plain.pk]
+
+    plain.name = 'Вокзальный'
+    plain.save()
+    assert ids(api_client.get('/search/', {'q': 'вокзальный'})) == [plain.pk]
+
+    plain.delete()
+    assert ids(api_client.get('/search/', {'q': 'Люкс'})) == []
+
+
+@pytest.mark.django_db
+def test_search_combines_with_availability(
+    api_client, catalog, hotel, room, make_booking
+):
+    hotel.description = 'Есть сауна'
+    hotel.save()
+    dates = {'check_in': '2030-01-01', 'check_out': '2030-01-03', 'guests': 2}
+
+    response = api_client.get('/search/', {'q': 'сауна', **dates})
+    assert hotel.pk in ids(response)
+
+    make_booking(start=date(2030, 1, 1))
+    response = api_client.get('/search/', {'q': 'сауна', **dates})
+    assert hotel.pk not in ids(response)
+
+
+@pytest.mark.django_db
+def test_search_pagination(api_client, city):
+    for i in range(3):
+        make_hotel(city, f'Хостел {i}')
+    response = api_client.get('/search/', {'q': 'хостел', 'page_size': 2})
+    assert response.data['count'] == 3
+    assert len(response.data['results']) == 2
+    assert response.data['next'] is not None
+
+
+@pytest.mark.django_db
+def test_search_query_special_characters(api_client, catalog):
+    response = api_client.get('/search/', {'q': '"сауна* OR ('})
+    assert response.status_code == 200
+    response = api_client.get('/search/', {'q': '***'})
+    assert response.data['results'] == []
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index(catalog):
+    spa, _, _ = catalog
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+    assert not search.search(Hotel.objects.all(), 'Спа').exists()
+
+    out = io.StringIO()
+    call_command('rebuild_search_index', stdout=out)
+    assert 'Проиндексировано отелей: 3' in out.getvalue()
+    assert list(search.search(Hotel.objects.all(), 'Спа')) == [spa]
+
+
+@pytest.fixture
+def priced(city, make_booking):
+    cheap = make_hotel(city, 'Эконом', rooms=[('Стандарт', ''), ('Люкс', '')])
+    dear = make_hotel(city, 'Люкс Отель', rooms=[('Стандарт', '')])
+    full = make_hotel(city, 'Занятый', rooms=[('Стандарт', '')])
+    Room.objects.filter(hotel=cheap, room_type='Стандарт').update(price=50)
+    Room.objects.filter(hotel=cheap, room_type='Люкс').update(price=500)
+    Room.objects.filter(hotel=dear).update(price=300)
+    Room.objects.filter(hotel=full).update(price=10)
+    Hotel.objects.filter(pk=dear.pk).update(rating=4.5)
+    make_booking(room=full.rooms.get(), start=date(2030, 1, 1))
+    return cheap, dear, full
+
+
+SEARCH_DATES = {'check_in': '2030-01-01', 'check_out': '2030-01-03', 'guests': 2}
+
+
+@pytest.mark.django_db
+def test_search_sort_by_price_with_cheapest_room(api_client, city, priced,
+                                                 hotel):
+    cheap, dear, full = priced
+    response = api_client.get('/search/', {
+        'city_id': city.pk, **SEARCH_DATES, 'sort': 'price', 'limit': 1
+    })
+    assert [item['id'] for item in response.data] == [cheap.pk]
+    room = response.data[0]['cheapest_room']
+    assert room['room_type'] == 'Стандарт'
+    assert room['price'] == 50
+    assert room['total_price'] == 100
+    assert response['Price-Order-Basis'] == 'nightly'
+
+    response = api_client.get('/search/', {
+        'city_id': city.pk, **SEARCH_DATES, 'sort': 'rating'
+    })
+    # Отель с номером из фикстуры make_booking (hotel) — без рейтинга
+    assert [item['id'] for item in response.data] == [
+        dear.pk, hotel.pk, cheap.pk
+    ]
+
+
+@pytest.mark.django_db
+def test_search_sort_by_popularity(api_client, city, priced, hotel):
+    cheap, dear, full = priced
+    api_client.get(f'/hotels/{dear.pk}/')
+    counters.buffer.flush()
+
+    response = api_client.get('/search/', {
+        'city_id': city.pk, **SEARCH_DATES, 'sort': 'popularity'
+    })
+    assert [item['id'] for item in response.data] == [
+        dear.pk, hotel.pk, cheap.pk
+    ]
+    assert response.data[0]['popularity'] == 10
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'sort': 'cheapest'}, {'limit': 0}, {'limit': 'ten'}, {'limit': 1000},
+])
+def test_search_sort_and_limit_validation(api_client, city, params):
+    response = api_client.get('/search/', {
+        'city_id': city.pk, **SEARCH_DATES, **params
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_rooms_in_city(api_client, city, priced, room, user):
+    cheap, dear, full = priced
+    other = City.objects.create(name='Тверь', country=city.country)
+    make_hotel(other, 'Другой город', rooms=[('Стандарт', '')])
+    RateRule.objects.create(hotel=dear, percent=10)
+    Discount.objects.create(
+        user=user, amount=10, expires_at=timezone.now() + timedelta(days=1)
+    )
+    api_client.force_authenticate(user)
+
+    response = api_client.get('/search/rooms/', {
+        'city_id': city.pk, **SEARCH_DATES
+    })
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [item['price'] for item in results] == [50, 100, 300, 500]
+    assert results[1]['id'] == room.pk
+    assert results[1]['hotel'] == {
+        'id': room.hotel_id, 'name': 'Гранд', 'address': 'Тверская, 1',
+        'rating': 0.0,
+    }
+    # 2 ночи: наценка правила отеля и скидка рулетки
+    assert results[1]['total_price'] == 180.0
+    assert results[2]['total_price'] == 594.0
+    assert results[2]['discount'] == 10
+    # Порядок — по цене ночи, а не по цене проживания
+    assert response['Price-Order-Basis'] == 'nightly'
+
+
+@pytest.mark.django_db
+def test_search_rooms_filters_and_sort(api_client, city, priced, room):
+    cheap, dear, full = priced
+    Room.objects.filter(hotel=cheap, room_type='Люкс').update(capacity=4)
+
+    response = api_client.get('/search/rooms/', {
+        'city_id': city.pk, **SEARCH_DATES, 'min_price': 60, 'max_price': 400,
+    })
+    assert [item['price'] for item in response.data['results']] == [100, 300]
+
+    response = api_client.get('/search/rooms/', {
+        'city_id': city.pk, **SEARCH_DATES, 'sort': '-capacity',
+        'page_size': 2,
+    })
+    assert response.data['count'] == 4
+    assert [item['capacity'] for item in response.data['results']] == [4, 2]
+
+    response = api_client.get('/search/rooms/', {
+        'city_id': city.pk, **SEARCH_DATES, 'guests': 3,
+    })
+    assert [item['price'] for item in response.data['results']] == [500]
+
+    response = api_client.get('/search/rooms/', {
+        'city_id': city.pk, **SEARCH_DATES, 'max_capacity': 2, 'sort': '-price'
+    })
+    assert [item['price'] for item in response.data['results']] == [300, 100, 50]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'sort': 'rating'}, {'guests': 0}, {'check_out': '2030-01-01'},
+    {'min_price': 10, 'max_price': 5}, {'max_capacity': 1},
+])
+def test_search_rooms_validation(api_client, city, params):
+    response = api_client.get('/search/rooms/', {
+        'city_id': city.pk, **SEARCH_DATES, **params
+    })
+    assert response.status_code == 400
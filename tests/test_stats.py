@@ -0,0 +1,201 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import stats
+from api.models import Booking, BookingArchive, Hotel, HotelDailyStats, Room
+
+
+def summary(hotel):
+    return list(
+        HotelDailyStats.objects.filter(hotel=hotel).exclude(
+            rooms_sold=0, revenue=0
+        ).order_by('date').values_list('date', 'rooms_sold', 'revenue')
+    )
+
+
+def test_split_keeps_total():
+    first, rest = stats.split(Decimal('100.00'), 3)
+    assert (first, rest) == (Decimal('33.34'), Decimal('33.33'))
+    assert first + rest * 2 == Decimal('100.00')
+
+
+@pytest.mark.django_db
+def test_summary_follows_bookings(hotel, make_booking):
+    booking = make_booking(
+        start=date(2030, 1, 1), nights=3, total_price=Decimal('100.00')
+    )
+    assert summary(hotel) == [
+        (date(2030, 1, 1), 1, Decimal('33.34')),
+        (date(2030, 1, 2), 1, Decimal('33.33')),
+        (date(2030, 1, 3), 1, Decimal('33.33')),
+    ]
+
+    booking.end_date = date(2030, 1, 3)
+    booking.total_price = Decimal('90.00')
+    booking.save()
+    assert summary(hotel) == [
+        (date(2030, 1, 1), 1, Decimal('45.00')),
+        (date(2030, 1, 2), 1, Decimal('45.00')),
+    ]
+
+    booking.status = 'canceled'
+    booking.save(update_fields=['status'])
+    assert summary(hotel) == []
+
+    booking.status = 'confirmed'
+    booking.save()
+    booking.delete()
+    assert summary(hotel) == []
+
+
+@pytest.mark.django_db
+def test_summary_unchanged_by_unrelated_updates(
+        hotel, make_booking, django_assert_num_queries):
+    booking = make_booking()
+
+    with django_assert_num_queries(1):
+        booking.phone = '+71111111111'
+        booking.save(update_fields=['phone'])
+
+
+@pytest.mark.django_db
+def test_summary_uses_loaded_state(hotel, room, make_booking):
+    make_booking(start=date(2030, 1, 1), nights=2, total_price=Decimal('80'))
+    booking = Booking.objects.select_related('room').get()
+    booking.total_price = Decimal('60')
+
+    with CaptureQueriesContext(connection) as queries:
+        booking.save()
+    # Прежнее состояние — из снимка при загрузке, а не повторным SELECT
+    assert not [
+        query for query in queries
+        if query['sql'].startswith('SELECT') and 'api_booking' in query['sql']
+    ]
+    assert summary(hotel) == [
+        (date(2030, 1, 1), 1, Decimal('30.00')),
+        (date(2030, 1, 2), 1, Decimal('30.00')),
+    ]
+
+    # Повторное сохранение считает дельту от сохранённого, а не загруженного
+    booking.total_price = Decimal('40')
+    booking.save()
+    assert summary(hotel)[0] == (date(2030, 1, 1), 1, Decimal('20.00'))
+
+    # С отложенными полями состояние читается из БД
+    deferred = Booking.objects.only('pk', 'status').get()
+    deferred.status = 'canceled'
+    deferred.save()
+    assert summary(hotel) == []
+
+
+@pytest.mark.django_db
+def test_rebuild_matches_incremental(hotel, room, user, make_booking):
+    make_booking(start=date(2030, 1, 1), nights=3, total_price=Decimal('100'))
+    make_booking(start=date(2030, 1, 1), nights=3, total_price=Decimal('100'))
+    make_booking(start=date(2030, 1, 2), nights=1, total_price=Decimal('70'))
+    make_booking(start=date(2030, 1, 5), status='canceled')
+    BookingArchive.objects.create(
+        id=1000, user=user, room=room,
+        start_date=date(2029, 12, 30), end_date=date(2030, 1, 1), guests=1,
+        first_name='Иван', last_name='Иванов', phone='+70000000000',
+        total_price=Decimal('50'), status='confirmed',
+        created_at='2029-12-01T00:00:00Z'
+    )
+    incremental = summary(hotel)
+
+    call_command('rebuild_hotel_stats', stdout=StringIO())
+
+    archived = [
+        (date(2029, 12, 30), 1, Decimal('25.00')),
+        (date(2029, 12, 31), 1, Decimal('25.00')),
+    ]
+    assert summary(hotel) == archived + incremental
+
+
+@pytest.mark.django_db
+def test_api_hotel_analytics(api_client, hotel, room, make_booking, manager):
+    Room.objects.create(
+        hotel=hotel, room_type='Люкс', capacity=2, description='',
+        price=Decimal('200.00'), image='rooms/temp.jpeg'
+    )
+    make_booking(start=date(2030, 1, 31), nights=2, total_price=Decimal('300'))
+    api_client.force_authenticate(manager)
+
+    response = api_client.get(
+        f'/hotels/{hotel.pk}/analytics/',
+        {'start': '2030-01-30', 'end': '2030-02-01'}
+    )
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'date': '2030-01-30', 'rooms_sold': 0, 'revenue': '0.00',
+         'occupancy': 0.0, 'adr': None},
+        {'date': '2030-01-31', 'rooms_sold': 1, 'revenue': '150.00',
+         'occupancy': 0.5, 'adr': '150.00'},
+        {'date': '2030-02-01', 'rooms_sold': 1, 'revenue': '150.00',
+         'occupancy': 0.5, 'adr': '150.00'},
+    ]
+
+    response = api_client.get(
+        f'/hotels/{hotel.pk}/analytics/',
+        {'start': '2030-01-30', 'end': '2030-02-01', 'period': 'month'}
+    )
+    assert [
+        (row['month'], row['rooms_sold'], row['revenue'], row['occupancy'])
+        for row in response.json()['results']
+    ] == [('2030-01', 1, '150.00', 0.25), ('2030-02', 1, '150.00', 0.5)]
+
+    response = api_client.get(
+        '/analytics/', {'start': '2030-01-01', 'end': '2030-01-31'}
+    )
+    assert response.json()['results'] == [{
+        'hotel': hotel.pk, 'name': hotel.name, 'rooms_sold': 1,
+        'revenue': '150.00', 'occupancy': round(1 / 62, 4), 'adr': '150.00',
+    }]
+
+    # Удаляемый номер из номерного фонда исключается
+    Room.objects.filter(room_type='Люкс').update(is_deleting=True)
+    response = api_client.get(
+        f'/hotels/{hotel.pk}/analytics/',
+        {'start': '2030-01-31', 'end': '2030-01-31'}
+    )
+    assert response.json()['results'][0]['occupancy'] == 1.0
+    response = api_client.get(
+        '/analytics/', {'start': '2030-01-01', 'end': '2030-01-31'}
+    )
+    assert response.json()['results'][0]['occupancy'] == round(1 / 31, 4)
+
+
+@pytest.mark.django_db
+def test_api_analytics_only_for_hotel_manager(
+        api_client, hotel, user, admin_user):
+    other = type(user).objects.create_user(
+        email='other@example.com', username='other',
+        password='password123', is_staff=True
+    )
+    url = f'/hotels/{hotel.pk}/analytics/'
+
+    api_client.force_authenticate(user)
+    assert api_client.get(url).status_code == 403
+
+    api_client.force_authenticate(other)
+    assert api_client.get(url).status_code == 403
+    assert api_client.get('/analytics/').json()['results'] == []
+
+    api_client.force_authenticate(admin_user)
+    assert api_client.get(url).status_code == 200
+    assert api_client.get(url, {'start': '2030-02-01', 'end': '2030-01-01'}) \
+        .status_code == 400
+    assert api_client.get(url, {'period': 'year'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_hotel_delete_cascades_with_summary(hotel, make_booking):
+    make_booking()
+    Hotel.objects.filter(pk=hotel.pk).delete()
+    assert not HotelDailyStats.objects.exists()
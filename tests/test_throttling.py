@@ -0,0 +1,163 @@
+import pytest
+from django.core.cache import cache
+
+from api import throttling
+from api.models import RateLimitBucket
+
+
+SEARCH = {'check_in': '2030-01-01', 'check_out': '2030-01-03', 'guests': 1,
+          'city_id': 1}
+
+
+@pytest.fixture
+def small_buckets(settings):
+    settings.RATE_LIMIT_BUCKETS = {
+        'anon': {'capacity': 6, 'refill_rate': 0.5},
+        'user': {'capacity': 10, 'refill_rate': 1.0},
+    }
+    settings.RATE_LIMIT_COSTS = {'search': 3, 'roulette': 10, 'auth': 5}
+
+
+@pytest.mark.django_db
+def test_consume_token_bucket():
+    bucket = {'capacity': 10, 'refill_rate': 1.0}
+    waits = [
+        throttling.consume('anon:1', 'anon', 3, now=100, **bucket)
+        for _ in range(4)
+    ]
+    assert waits == [0, 0, 0, pytest.approx(2.0)]
+
+    # За 2 секунды накопилось ровно на ещё один запрос
+    assert throttling.consume('anon:1', 'anon', 3, now=102, **bucket) == 0
+    # Ёмкость не превышается, сколько бы клиент ни ждал
+    throttling.consume('anon:1', 'anon', 3, now=10_000, **bucket)
+    state = cache.get(throttling.CACHE_KEY % 'anon:1')
+    assert state == (pytest.approx(7), 10_000)
+
+    # Запросы в БД не пишутся, пока счётчики не сброшены
+    assert not RateLimitBucket.objects.exists()
+    assert throttling.stats.flush() == 1
+    counters = RateLimitBucket.objects.values(
+        'allowed', 'throttled', 'updated_at'
+    ).get()
+    assert counters == {'allowed': 5, 'throttled': 1, 'updated_at': 10_000}
+
+    throttling.consume('anon:1', 'anon', 3, now=10_001, **bucket)
+    throttling.stats.flush()
+    assert RateLimitBucket.objects.values_list('allowed', flat=True).get() == 6
+
+
+@pytest.mark.django_db
+def test_stats_flushed_at_request_end(api_client, small_buckets, settings):
+    settings.RATE_LIMIT_STATS_FLUSH_MAX_PENDING = 2
+    api_client.get('/search/', SEARCH, REMOTE_ADDR='10.0.0.1')
+    assert not RateLimitBucket.objects.exists()
+
+    api_client.get('/search/', SEARCH, REMOTE_ADDR='10.0.0.2')
+    assert RateLimitBucket.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_search_throttled_per_ip(api_client, small_buckets):
+    statuses = [
+        api_client.get('/search/', SEARCH, REMOTE_ADDR='10.0.0.1').status_code
+        for _ in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+
+    response = api_client.get('/search/', SEARCH, REMOTE_ADDR='10.0.0.1')
+    assert response.status_code == 429
+    assert int(response['Retry-After']) == 6
+
+    other = api_client.get('/search/', SEARCH, REMOTE_ADDR='10.0.0.2')
+    assert other.status_code == 200
+
+
+@pytest.mark.django_db
+def test_forwarded_for_is_trusted_only_behind_proxy(
+    api_client, small_buckets, settings
+):
+    def search(forwarded):
+        return api_client.get(
+            '/search/', SEARCH, REMOTE_ADDR='10.0.0.1',
+            HTTP_X_FORWARDED_FOR=forwarded
+        ).status_code
+
+    # Без прокси подставленный клиентом заголовок не даёт новых корзин
+    statuses = [search(f'1.2.3.{n}, ' + 'x' * 200) for n in range(3)]
+    assert statuses == [200, 200, 429]
+    throttling.stats.flush()
+    assert RateLimitBucket.objects.count() == 1
+
+    # За одним прокси берётся последний адрес — его дописал прокси
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+    statuses = [search(f'1.2.3.{n}, 10.0.0.7') for n in range(3)]
+    assert statuses == [200, 200, 429]
+    throttling.stats.flush()
+    key = RateLimitBucket.objects.exclude(
+        key=throttling.bucket_key('anon', '10.0.0.1')
+    ).get().key
+    assert key == throttling.bucket_key('anon', '10.0.0.7')
+    assert len(key) == len('anon:') + 40
+
+
+@pytest.mark.django_db
+def test_roulette_only_post_is_throttled(api_client, user, small_buckets):
+    api_client.force_authenticate(user)
+    for _ in range(3):
+        assert api_client.get('/discounts/roulette/').status_code == 204
+
+    assert api_client.post('/discounts/roulette/').status_code == 201
+    # Скидка уже есть (400), но токены тоже закончились
+    assert api_client.post('/discounts/roulette/').status_code == 429
+
+
+@pytest.mark.django_db
+def test_jwt_create_throttled(api_client, user, small_buckets):
+    credentials = {'email': user.email, 'password': 'wrong'}
+    statuses = [
+        api_client.post('/auth/jwt/create/', credentials).status_code
+        for _ in range(2)
+    ]
+    assert statuses == [401, 429]
+
+
+@pytest.mark.django_db
+def test_rate_limit_disabled(api_client, small_buckets, settings):
+    settings.RATE_LIMIT_ENABLED = False
+    for _ in range(5):
+        assert api_client.get('/search/', SEARCH).status_code == 200
+    assert not throttling.stats.take()
+
+
+@pytest.mark.django_db
+def test_rate_limit_stats(api_client, user, manager, small_buckets):
+    for _ in range(3):
+        api_client.get('/search/', SEARCH, REMOTE_ADDR='10.0.0.1')
+
+    api_client.force_authenticate(user)
+    assert api_client.get('/ratelimits/').status_code == 403
+
+    api_client.force_authenticate(manager)
+    data = api_client.get('/ratelimits/').data
+    assert data['totals'] == {
+        'anon': {'clients': 1, 'allowed': 2, 'throttled': 1}
+    }
+    assert data['top'] == [{
+        'key': throttling.bucket_key('anon', '10.0.0.1'),
+        'allowed': 2,
+        'throttled': 1,
+        'tokens': pytest.approx(0, abs=0.1),
+    }]
+
+
+@pytest.mark.django_db
+def test_cleanup_removes_idle_buckets():
+    bucket = {'capacity': 10, 'refill_rate': 1.0}
+    throttling.consume('anon:old', 'anon', 1, now=0, **bucket)
+    throttling.consume('anon:new', 'anon', 1, **bucket)
+    throttling.stats.flush()
+    throttling.cleanup(max_idle=3600)
+    assert list(RateLimitBucket.objects.values_list('key', flat=True)) == [
+        'anon:new'
+    ]